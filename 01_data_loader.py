@@ -1,15 +1,18 @@
-import json
 import pandas as pd
 import numpy as np
 import os
-import math
 import glob
+from session_store import iter_trial_chunks, resolve_source
+from device_norm import device_signature, signature_key, normalize_positions
+from text_entry import typing_metrics
+from participant_registry import participant_key
+from order_effects import sequences_frame, attach_order
 
 # ==========================================
 # 1. 설정 및 준비
 # ==========================================
-DATA_DIR = './data'      # JSON 파일이 있는 폴더
-RESULT_DIR = './results' # 결과를 저장할 폴더
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')        # JSON 파일이 있는 폴더
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')  # 결과를 저장할 폴더
 
 if not os.path.exists(RESULT_DIR):
     os.makedirs(RESULT_DIR)
@@ -18,79 +21,97 @@ if not os.path.exists(RESULT_DIR):
 # 2. 데이터 로딩 함수
 # ==========================================
 def load_and_process_data(data_dir):
-    json_pattern = os.path.join(data_dir, '*.json')
-    file_list = glob.glob(json_pattern)
-
-    if not file_list:
+    # './data.himpack' 아카이브가 있으면 JSON 폴더 대신 아카이브에서 읽음
+    source = resolve_source(data_dir)
+    if os.path.isdir(source) and not glob.glob(os.path.join(source, '*.json')):
         print(f"❌ 오류: '{data_dir}' 폴더에 .json 파일이 없습니다. 파일 위치를 확인하세요.")
         return None, None
 
-    print(f"📂 총 {len(file_list)}개의 데이터 파일을 찾았습니다.")
-
-    all_trials = []
     user_metadata = []
-
-    for file_path in file_list:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            participant_id = data['participant']['name']
-
-            # 1) 개인화 정보 (Reachable Radius) 추출
-            radius = np.nan
-            if data.get('circleData'):
-                radius = data['circleData']['radius']
-
-            user_metadata.append({
-                'Participant': participant_id,
-                'Radius': radius
-            })
-
-            # 2) 실험 데이터 추출
-            for exp in data['experiments']:
-                condition = exp['condition']
-
-                for trial in exp['trials']:
-                    # Search Time = 전체 시간 - 타이핑 시간
-                    completion_time = trial['completionTime']
-                    typing_time = trial['typingTime']
-                    search_time = completion_time - typing_time
-
-                    # Offset (정확도) 계산
-                    # buttonPosition은 항상 있지만, buttonTouchPosition은 없을 수도 있음(오류 등)
-                    btn_pos = trial['buttonPosition']
-                    touch_pos = trial.get('buttonTouchPosition')
-
-                    offset = np.nan
-                    if touch_pos:
-                        # 유클리드 거리 공식: sqrt((x1-x2)^2 + (y1-y2)^2)
-                        dx = btn_pos['x'] - touch_pos['x']
-                        dy = btn_pos['y'] - touch_pos['y']
-                        offset = math.sqrt(dx**2 + dy**2)
-
-                    # 타겟의 Y 위치 (상단/중단/하단 분석용)
-                    target_y = btn_pos['y']
-
-                    all_trials.append({
-                        'Participant': participant_id,
-                        'Condition': condition,
-                        'Trial_Order': trial['trial'],
-                        'SearchTime': search_time,
-                        'TypingTime': typing_time,
-                        'CompletionTime': completion_time,
-                        'Offset': offset,
-                        'Error': 1 if trial['error'] else 0,
-                        'Target_Y': target_y,
-                        'Reachable_Radius': radius
-                    })
-
-        except Exception as e:
-            print(f"⚠️ 경고: {file_path} 처리 중 오류 발생 - {e}")
-
-    df_trials = pd.DataFrame(all_trials)
+    signatures = {}  # Device 키 -> 시그니처 튜플 (mm 변환 계수 캐시 키)
+    sessions = []    # 세션 메타 (스트리밍 중에도 계속 채워지므로 청크를 다 읽은 뒤 experiments[].order 사용)
+
+    def session_context(data):
+        # 세션(참가자)마다 한 번 호출: 모든 시행 행에 붙일 참가자/기기/개인화 정보
+        # 설문·순위 테이블과의 조인 키 (participant_registry.participant_key)
+        join_key, participant_id = participant_key(data['participant'])
+
+        # 기기 시그니처 (화면/뷰포트 크기, devicePixelRatio) - 좌표 정규화용
+        signature = device_signature(data.get('deviceInfo'))
+        device = signature_key(signature)
+        signatures[device] = signature
+
+        # 1) 개인화 정보 (Reachable Radius) 추출
+        radius = np.nan
+        circle_x, circle_y = np.nan, np.nan
+        if data.get('circleData'):
+            radius = data['circleData']['radius']
+            circle_x = data['circleData']['circleCenter']['x']
+            circle_y = data['circleData']['circleCenter']['y']
+
+        sessions.append(data)
+        user_metadata.append({
+            'Participant_ID': join_key,
+            'Participant': participant_id,
+            'Device': device,
+            'Radius': radius
+        })
+        return {'Participant_ID': join_key, 'Participant': participant_id, 'Reachable_Radius': radius,
+                'Device': device, 'Circle_X': circle_x, 'Circle_Y': circle_y}
+
+    # 2) 실험 데이터 추출: 파일을 스트리밍으로 읽어 고정 크기 시행 청크 단위로 계산
+    # (캘리브레이션 포인트는 읽는 즉시 버리므로 세션 길이와 무관하게 청크 크기만큼의 메모리만 사용)
+    chunks = []
+    for chunk in iter_trial_chunks(data_dir, context=session_context):
+        # Search Time = 전체 시간 - 타이핑 시간
+        completion_time = chunk['completionTime']
+        typing_time = chunk['typingTime']
+
+        # Offset (정확도) 계산
+        # buttonPosition은 항상 있지만, buttonTouchPosition은 없을 수도 있음(오류 등) -> NaN
+        # 유클리드 거리 공식: sqrt((x1-x2)^2 + (y1-y2)^2)
+        dx = chunk['button_x'] - chunk['touch_x']
+        dy = chunk['button_y'] - chunk['touch_y']
+
+        chunks.append(pd.DataFrame({
+            'Participant_ID': chunk['Participant_ID'],
+            'Participant': chunk['Participant'],
+            'Condition': chunk['condition'],
+            'Trial_Order': chunk['trial'],
+            'SearchTime': completion_time - typing_time,
+            'TypingTime': typing_time,
+            'CompletionTime': completion_time,
+            'Offset': np.sqrt(dx**2 + dy**2),
+            'Error': chunk['error'].astype(bool).astype(int),
+            'Target_Y': chunk['button_y'],  # 타겟의 Y 위치 (상단/중단/하단 분석용)
+            'Target_String': chunk['targetString'],
+            'User_Input': chunk['userInput'],
+            'Reachable_Radius': chunk['Reachable_Radius'],
+            'Device': chunk['Device'],
+            'Button_X': chunk['button_x'],
+            'Button_Y': chunk['button_y'],
+            'Touch_X': chunk['touch_x'],
+            'Touch_Y': chunk['touch_y'],
+            'Circle_X': chunk['Circle_X'],
+            'Circle_Y': chunk['Circle_Y']
+        }))
+
+    n_files = len(user_metadata)
+    print(f"📂 총 {n_files}개의 데이터 파일을 찾았습니다. ({source})")
+
+    df_trials = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
     df_users = pd.DataFrame(user_metadata)
 
+    # 기기마다 다른 px 좌표를 mm / 뷰포트 비율 좌표로 한 번에 변환 (이후 분석은 이 값을 비교)
+    if not df_trials.empty:
+        df_trials = normalize_positions(df_trials, signatures=signatures)
+        df_trials['Offset_mm'] = df_trials['Offset'] * df_trials['mm_per_px']
+        df_trials['Reachable_Radius_mm'] = df_trials['Reachable_Radius'] * df_trials['mm_per_px']
+        # 편집 거리 / 남은 오류율 / 초당 문자 수 (전체 시행 일괄 계산)
+        df_trials = typing_metrics(df_trials)
+        # 조건의 진행 위치 / 직전 조건 (experiments[].order) - 순서 효과 공변량 (같은 패스에서 모은 메타 사용)
+        df_trials = attach_order(df_trials, sequences_frame(sessions))
+
     return df_trials, df_users
 
 # ==========================================
@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
@@ -8,8 +7,8 @@ import os
 # ==========================================
 # 1. 설정 및 데이터 로드
 # ==========================================
-DATA_PATH = './results/processed_data.csv'
-RESULT_DIR = './results'
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+DATA_PATH = os.path.join(RESULT_DIR, 'processed_data.csv')
 
 # 한글 폰트 설정 (Mac: AppleGothic, Windows: Malgun Gothic)
 import platform
@@ -25,36 +24,51 @@ df = pd.read_csv(DATA_PATH)
 # ==========================================
 # 2. 통계 검정 함수 정의
 # ==========================================
+# 모든 지표/조건 쌍을 한 번에 검정 (피험자 피벗은 1회만 생성)
+from batch_stats import trials_to_long, run_batch_tests, TRIAL_METRICS
+from learning_curve import fit_learning_curves
+
+stats_table = run_batch_tests(trials_to_long(df, TRIAL_METRICS))
+stats_table.to_csv(os.path.join(RESULT_DIR, 'stats_results_trials.csv'), index=False, encoding='utf-8-sig')
+
+# 실험 순서(진행 위치 / 직전 조건) 효과를 공변량으로 뺀 값으로 같은 검정 반복
+stats_table_adj = None
+if 'Session_Position' in df.columns:
+    from order_effects import order_adjusted
+    stats_table_adj = run_batch_tests(order_adjusted(trials_to_long(df, TRIAL_METRICS), df))
+    stats_table_adj.to_csv(os.path.join(RESULT_DIR, 'stats_results_trials_order_adjusted.csv'), index=False,
+                           encoding='utf-8-sig')
+
 def perform_stats(data, metric, group_col='Condition'):
     print(f"\n[{metric} 분석]")
-    conditions = data[group_col].unique()
 
     # 기술 통계
     desc = data.groupby(group_col)[metric].agg(['mean', 'std', 'median'])
     print(desc)
 
-    # 피험자별 평균 데이터 생성 (대응 표본 검정을 위해)
-    df_pivot = data.pivot_table(index='Participant', columns=group_col, values=metric, aggfunc='mean')
+    res = stats_table[stats_table['Metric'] == metric]
 
     # 1. 정규성 검정 (Shapiro-Wilk)
     print("- 정규성 검정 (p < 0.05면 정규성 위반):")
-    for cond in conditions:
-        stat, p = stats.shapiro(df_pivot[cond])
-        print(f"  {cond}: p={p:.4f}")
+    for _, r in res[res['Test'] == 'shapiro'].iterrows():
+        print(f"  {r['Condition_1']}: p={r['p']:.4f}")
 
     # 2. 통계 검정 (Wilcoxon Signed-Rank Test - 비모수 검정, N=14 소표본에 적합)
-    print("- Wilcoxon Signed-Rank Test (대응 표본):")
-    pairs = [('fixed', 'adaptive'), ('adaptive', 'bottom-right')]
-
+    print("- Wilcoxon Signed-Rank Test (대응 표본, Holm 보정):")
     stats_results = []
-    for c1, c2 in pairs:
-        stat, p = stats.wilcoxon(df_pivot[c1], df_pivot[c2])
-        stars = "*" if p < 0.05 else "ns"
-        if p < 0.01: stars = "**"
-        if p < 0.001: stars = "***"
-
-        print(f"  {c1} vs {c2}: Statistic={stat:.1f}, p={p:.4f} ({stars})")
-        stats_results.append({'pair': f"{c1}-{c2}", 'p': p})
+    for _, r in res[res['Test'] == 'wilcoxon'].iterrows():
+        c1, c2 = r['Condition_1'], r['Condition_2']
+        print(f"  {c1} vs {c2}: Statistic={r['Statistic']:.1f}, p={r['p']:.4f}, "
+              f"p_holm={r['p_holm']:.4f} ({r['Significance']})")
+        stats_results.append({'pair': f"{c1}-{c2}", 'p': r['p'], 'p_holm': r['p_holm']})
+
+    if stats_table_adj is not None:
+        print("- 순서 효과(진행 위치 / 직전 조건) 보정 후:")
+        adj = stats_table_adj[(stats_table_adj['Metric'] == metric) & (stats_table_adj['Test'] != 'shapiro')]
+        for _, r in adj.iterrows():
+            label = 'Friedman' if r['Test'] == 'friedman' else f"{r['Condition_1']} vs {r['Condition_2']}"
+            p_ref = r['p'] if r['Test'] == 'friedman' else r['p_holm']
+            print(f"  {label}: p={p_ref:.4f} ({r['Significance']})")
 
     return stats_results
 
@@ -83,6 +97,12 @@ print("="*40)
 learning_curve = df.pivot_table(index='Trial_Order', columns='Condition', values='SearchTime')
 print(learning_curve)
 
+# 참가자 x 조건별 거듭제곱/지수 학습 곡선 (일괄 적합) -> 조건별 중앙값
+curve_fits = fit_learning_curves(df, ['Participant', 'Condition'])
+curve_fits.to_csv(os.path.join(RESULT_DIR, 'learning_curve_fits.csv'), index=False, encoding='utf-8-sig')
+print("\n[학습 곡선 적합 (참가자별 중앙값): 점근값 / 학습률 / 안정화 시행]")
+print(curve_fits.groupby(['Model', 'Condition'])[['Asymptote', 'Learning_Rate', 'Stable_Trial']].median().round(2))
+
 
 # ==========================================
 # 5. 개인화 필요성 분석 (RQ3: Personalization)
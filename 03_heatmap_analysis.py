@@ -3,13 +3,15 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import os
-import json
-import glob
 import math
+from session_store import iter_trial_chunks
+from device_norm import device_signature, device_transform
+from scipy import stats
+from matplotlib.patches import Ellipse
 
 # 1. 데이터 로드 (JSON에서 직접 좌표 데이터 추출 필요)
-DATA_DIR = './data'
-RESULT_DIR = './results'
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
 
 # 폰트 설정
 import platform
@@ -20,39 +22,101 @@ elif platform.system() == 'Windows':
 plt.rc('axes', unicode_minus=False)
 
 def extract_touch_coordinates(data_dir):
-    json_pattern = os.path.join(data_dir, '*.json')
-    file_list = glob.glob(json_pattern)
-
-    touch_points = []
-
-    for file_path in file_list:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        for exp in data['experiments']:
-            condition = exp['condition']
-            for trial in exp['trials']:
-                btn_pos = trial['buttonPosition']
-                touch_pos = trial.get('buttonTouchPosition')
-
-                if touch_pos:
-                    # 버튼 중심을 (0,0)으로 기준 잡기 (Relative Coordinates)
-                    # dx: 터치점 - 버튼중심
-                    dx = touch_pos['x'] - btn_pos['x']
-                    dy = touch_pos['y'] - btn_pos['y']
-
-                    # 버튼 크기 (반지름 약 40px 가정, 시각화용)
-                    touch_points.append({
-                        'Condition': condition,
-                        'Delta_X': dx,
-                        'Delta_Y': dy
-                    })
-
-    return pd.DataFrame(touch_points)
+    def session_context(data):
+        # 기기별 px -> mm 계수 (기기가 달라도 같은 물리 크기로 비교)
+        return {'Participant': data['participant']['name'],
+                'mm_per_px': device_transform(device_signature(data.get('deviceInfo')))['mm_per_px']}
+
+    frames = []
+    # 파일을 스트리밍으로 읽어 시행 청크 단위로 계산 (캘리브레이션 포인트는 메모리에 올리지 않음)
+    for chunk in iter_trial_chunks(data_dir, context=session_context):
+        # 터치 좌표가 없는 시행(오류 등)은 제외
+        chunk = chunk[chunk['touch_x'].notna() & chunk['touch_y'].notna()]
+
+        # 버튼 중심을 (0,0)으로 기준 잡기 (Relative Coordinates)
+        # dx: 터치점 - 버튼중심
+        dx = chunk['touch_x'] - chunk['button_x']
+        dy = chunk['touch_y'] - chunk['button_y']
+
+        # 버튼 크기 (반지름 약 40px 가정, 시각화용)
+        frames.append(pd.DataFrame({
+            'Participant': chunk['Participant'],
+            'Condition': chunk['condition'],
+            'Delta_X': dx,
+            'Delta_Y': dy,
+            'Delta_X_mm': dx * chunk['mm_per_px'],
+            'Delta_Y_mm': dy * chunk['mm_per_px']
+        }))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+# 95% 신뢰 타원 스케일 (자유도 2 카이제곱 분위수)과 유효 타깃 폭 계수 (Fitts' law, 4.133 x SD)
+CHI2_95_2D = stats.chi2.ppf(0.95, df=2)
+WE_FACTOR = 4.133
+
+# 히트맵 창 크기와 버튼 반지름 (iPhone 16 기준 ±100px, 40px 를 mm로 환산)
+HEATMAP_HALF_MM = 17
+BUTTON_RADIUS_MM = 6.6
+
+def offset_ellipses(df, group_cols, x_col='Delta_X_mm', y_col='Delta_Y_mm'):
+    # 그룹별 1·2차 모멘트를 bincount 한 번씩으로 집계 (그룹 루프 없음)
+    codes, groups = pd.MultiIndex.from_frame(df[group_cols]).factorize()
+    dx = df[x_col].to_numpy(dtype=float)
+    dy = df[y_col].to_numpy(dtype=float)
+
+    def g_sum(v):
+        return np.bincount(codes, weights=v, minlength=len(groups))
+
+    n = g_sum(np.ones_like(dx))
+    mean_x, mean_y = g_sum(dx) / n, g_sum(dy) / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 표본 공분산 (ddof=1)
+        var_x = (g_sum(dx * dx) - n * mean_x ** 2) / (n - 1)
+        var_y = (g_sum(dy * dy) - n * mean_y ** 2) / (n - 1)
+        cov_xy = (g_sum(dx * dy) - n * mean_x * mean_y) / (n - 1)
+
+    # (G, 2, 2) 공분산 행렬을 쌓아서 eigh 한 번에 분해
+    cov = np.stack([np.stack([var_x, cov_xy], -1), np.stack([cov_xy, var_y], -1)], -2)
+    valid = n >= 3
+    eigvals = np.full((len(groups), 2), np.nan)
+    eigvecs = np.full((len(groups), 2, 2), np.nan)
+    if valid.any():
+        eigvals[valid], eigvecs[valid] = np.linalg.eigh(cov[valid])
+    eigvals = np.clip(eigvals, 0, None)
+
+    # eigh는 고유값 오름차순이므로 마지막이 장축
+    major_vec = eigvecs[:, :, 1]
+
+    result = pd.DataFrame(list(groups), columns=group_cols)
+    result['N'] = n.astype(int)
+    result['Bias_X'] = mean_x
+    result['Bias_Y'] = mean_y
+    result['Bias_Norm'] = np.hypot(mean_x, mean_y)
+    result['Var_X'] = var_x
+    result['Var_Y'] = var_y
+    result['Cov_XY'] = cov_xy
+    result['Ellipse_Major'] = np.sqrt(CHI2_95_2D * eigvals[:, 1])  # 반장축 (mm)
+    result['Ellipse_Minor'] = np.sqrt(CHI2_95_2D * eigvals[:, 0])  # 반단축 (mm)
+    result['Ellipse_Angle'] = np.degrees(np.arctan2(major_vec[:, 1], major_vec[:, 0]))
+    result['We_X'] = WE_FACTOR * np.sqrt(var_x)
+    result['We_Y'] = WE_FACTOR * np.sqrt(var_y)
+    # 2D 유효 폭: 두 축 분산의 평균을 사용
+    result['We_2D'] = WE_FACTOR * np.sqrt((var_x + var_y) / 2)
+    return result
 
 print("🔄 좌표 데이터 추출 중...")
 df_coords = extract_touch_coordinates(DATA_DIR)
 
+# 2-0. 참가자 x 조건 / 조건별 편향 벡터 및 95% 타원 계산
+print("📐 터치 편향 벡터 및 공분산 타원 계산 중...")
+df_ellipse = offset_ellipses(df_coords, ['Participant', 'Condition'])
+df_ellipse_cond = offset_ellipses(df_coords, ['Condition'])
+
+ellipse_path = os.path.join(RESULT_DIR, 'touch_offset_ellipses.csv')
+df_ellipse.to_csv(ellipse_path, index=False, encoding='utf-8-sig')
+print(df_ellipse_cond.round(2).to_string(index=False))
+print(f"💾 참가자 x 조건 타원 테이블 저장 완료: {ellipse_path}")
+
 # 2. 히트맵 시각화 (KDE Plot)
 print("🎨 터치 히트맵 생성 중...")
 
@@ -73,29 +137,39 @@ for i, cond in enumerate(conditions):
     # 중심점(0,0) 표시
     plt.scatter(0, 0, s=200, c='black', marker='+', label='Button Center')
 
-    # 버튼 영역 표시 (반지름 40px 원)
-    circle = plt.Circle((0, 0), 40, color='gray', fill=False, linestyle='--', linewidth=2)
+    # 버튼 영역 표시 (반지름 40px 원, mm 환산)
+    circle = plt.Circle((0, 0), BUTTON_RADIUS_MM, color='gray', fill=False, linestyle='--', linewidth=2)
     plt.gca().add_patch(circle)
 
     # 밀도 그래프 그리기 (터치가 집중된 곳)
     # fill=True, levels=10 등으로 등고선 표현
     try:
         sns.kdeplot(
-            data=subset, x='Delta_X', y='Delta_Y',
+            data=subset, x='Delta_X_mm', y='Delta_Y_mm',
             cmap=colors[cond], fill=True, alpha=0.7, thresh=0.1
         )
         # 실제 점들도 작게 찍어주기 (산포도)
-        plt.scatter(subset['Delta_X'], subset['Delta_Y'], s=10, c='black', alpha=0.2)
+        plt.scatter(subset['Delta_X_mm'], subset['Delta_Y_mm'], s=10, c='black', alpha=0.2)
     except:
         print(f"⚠️ {cond} 조건의 데이터가 너무 적거나 퍼져있어서 KDE를 그릴 수 없습니다. 산포도만 그립니다.")
-        plt.scatter(subset['Delta_X'], subset['Delta_Y'], s=20, c='blue', alpha=0.5)
+        plt.scatter(subset['Delta_X_mm'], subset['Delta_Y_mm'], s=20, c='blue', alpha=0.5)
+
+    # 참가자별 95% 타원 (얇은 선)과 조건 전체 타원 (굵은 선), 평균 편향 벡터
+    for _, e in df_ellipse[df_ellipse['Condition'] == cond].dropna(subset=['Ellipse_Major']).iterrows():
+        plt.gca().add_patch(Ellipse((e['Bias_X'], e['Bias_Y']), 2 * e['Ellipse_Major'], 2 * e['Ellipse_Minor'],
+                                    angle=e['Ellipse_Angle'], fill=False, color='dimgray', linewidth=0.6, alpha=0.5))
+    for _, e in df_ellipse_cond[df_ellipse_cond['Condition'] == cond].iterrows():
+        plt.gca().add_patch(Ellipse((e['Bias_X'], e['Bias_Y']), 2 * e['Ellipse_Major'], 2 * e['Ellipse_Minor'],
+                                    angle=e['Ellipse_Angle'], fill=False, color='black', linewidth=2))
+        plt.annotate('', xy=(e['Bias_X'], e['Bias_Y']), xytext=(0, 0),
+                     arrowprops=dict(arrowstyle='->', color='black', lw=2))
 
     plt.title(titles[cond], fontsize=14, fontweight='bold')
-    plt.xlim(-100, 100)  # 버튼 중심 기준 좌우 100px
-    plt.ylim(-100, 100)  # 버튼 중심 기준 상하 100px
-    plt.xlabel('Horizontal Offset (px)')
+    plt.xlim(-HEATMAP_HALF_MM, HEATMAP_HALF_MM)  # 버튼 중심 기준 좌우 (약 100px)
+    plt.ylim(-HEATMAP_HALF_MM, HEATMAP_HALF_MM)  # 버튼 중심 기준 상하 (약 100px)
+    plt.xlabel('Horizontal Offset (mm)')
     if i == 0:
-        plt.ylabel('Vertical Offset (px)')
+        plt.ylabel('Vertical Offset (mm)')
     else:
         plt.ylabel('')
 
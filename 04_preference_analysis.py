@@ -1,17 +1,19 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import os
+from batch_stats import adjust_pvalues, significance_stars
+from perm_stats import friedman_permutation
+from participant_registry import build_registry, load_survey, report_unmatched, ordinal_to_condition, ORDER_COLS
 
 # ==========================================
 # 1. 설정 및 데이터 로드
 # ==========================================
 # 파일 경로 (실제 파일 위치에 맞게 수정하세요)
-SURVEY_PATH = './사후 설문 정리.csv'
-PROCESS_PATH = './results/processed_data.csv'
-RESULT_DIR = './results'
+SURVEY_PATH = os.environ.get('HIM_SURVEY_PATH', './사후 설문 정리.csv')
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
 
 # 한글 폰트 설정
 import platform
@@ -23,9 +25,10 @@ plt.rc('axes', unicode_minus=False)
 
 print("🔄 데이터 로드 중...")
 try:
-    # 인코딩 에러 방지를 위해 engine='python' 사용
-    df_survey = pd.read_csv(SURVEY_PATH)
-    df_process = pd.read_csv(PROCESS_PATH)
+    # 참가자 레지스트리 (studentId 기준, 세션 로그의 실제 실험 순서 포함)
+    registry = build_registry(DATA_DIR)
+    # 설문 이름을 정규화해 레지스트리와 한 번에 조인
+    df_survey, unmatched = load_survey(registry, SURVEY_PATH)
 except Exception as e:
     print(f"❌ 데이터 로드 실패: {e}")
     exit()
@@ -34,55 +37,30 @@ except Exception as e:
 # 2. 데이터 전처리 (순위 데이터 생성)
 # ==========================================
 print("🔄 데이터 매핑 중...")
+report_unmatched(unmatched, '설문')
 
-# 2-1. 참가자별 실험 순서 추출 (processed_data.csv 이용)
-# 예: 홍길동 -> ['fixed', 'adaptive', 'bottom-right']
-condition_orders = {}
-for p in df_process['Participant'].unique():
-    # 참가자의 데이터를 Trial_Order 순으로 정렬하여 조건 추출
-    p_data = df_process[df_process['Participant'] == p].sort_values('Trial_Order')
-    # 중복 제거하면서 순서 유지
-    conds = []
-    for c in p_data['Condition']:
-        if c not in conds:
-            conds.append(c)
-    condition_orders[p] = conds
-
-# 2-2. 설문 응답을 실제 조건으로 변환하여 순위 데이터프레임 생성
-rank_rows = []
-col_name = '1. 성함'
+# 설문 응답("첫 번째" 등)을 실제 조건으로 변환하여 순위 데이터프레임 생성
 col_1st = '7. [종합 순위] 실제 실생활에서 사용하고 싶은 방식을 순서대로 선택해주세요. [1순위]'
 col_2nd = '7. [종합 순위] 실제 실생활에서 사용하고 싶은 방식을 순서대로 선택해주세요. [2순위]'
 col_3rd = '7. [종합 순위] 실제 실생활에서 사용하고 싶은 방식을 순서대로 선택해주세요. [3순위]'
 
-for idx, row in df_survey.iterrows():
-    name = row[col_name]
-    if name not in condition_orders:
-        continue
-
-    order = condition_orders[name] # 실험 순서 리스트
-
-    # 설문지의 "첫 번째", "두 번째"를 실제 조건명으로 매핑
-    map_dict = {'첫 번째': order[0], '두 번째': order[1], '세 번째': order[2]}
-
-    choice_1 = map_dict.get(row[col_1st]) # 1위로 뽑은 조건
-    choice_2 = map_dict.get(row[col_2nd]) # 2위로 뽑은 조건
-    choice_3 = map_dict.get(row[col_3rd]) # 3위로 뽑은 조건
-
-    # 랭크 딕셔너리 생성 (Condition: Rank)
-    ranks = {}
-    if choice_1: ranks[choice_1] = 1
-    if choice_2: ranks[choice_2] = 2
-    if choice_3: ranks[choice_3] = 3
-
-    rank_rows.append({
-        'Participant': name,
-        'fixed': ranks.get('fixed'),
-        'adaptive': ranks.get('adaptive'),
-        'bottom-right': ranks.get('bottom-right')
-    })
+orders = df_survey[ORDER_COLS].to_numpy()
+df_choice = pd.DataFrame({
+    'Participant_ID': df_survey['Participant_ID'],
+    'Participant': df_survey['Participant'],
+    1: ordinal_to_condition(df_survey[col_1st], orders), # 1위로 뽑은 조건
+    2: ordinal_to_condition(df_survey[col_2nd], orders), # 2위로 뽑은 조건
+    3: ordinal_to_condition(df_survey[col_3rd], orders), # 3위로 뽑은 조건
+})
 
-df_rank = pd.DataFrame(rank_rows)
+# (참가자, 순위, 조건) long 포맷 -> 조건별 순위 wide 포맷
+df_rank = (df_choice.melt(id_vars=['Participant_ID', 'Participant'], var_name='Rank', value_name='Condition')
+           .dropna(subset=['Condition'])
+           .astype({'Rank': float})
+           .pivot_table(index=['Participant_ID', 'Participant'], columns='Condition', values='Rank', aggfunc='first')
+           .reindex(columns=['fixed', 'adaptive', 'bottom-right'])
+           .reset_index())
+df_rank.columns.name = None
 print(f"✅ 총 {len(df_rank)}명의 순위 데이터 생성 완료")
 
 # ==========================================
@@ -98,9 +76,16 @@ stat, p_value = stats.friedmanchisquare(
     df_rank['bottom-right']
 )
 
+# 소표본(N=14)·동순위에 대해 점근 카이제곱 대신 정확 순열 p값도 함께 보고
+_, p_exact = friedman_permutation(df_rank[['fixed', 'adaptive', 'bottom-right']].to_numpy())
+
 print(f"[Friedman Test]")
 print(f"- Chi-square: {stat:.3f}")
-print(f"- P-value: {p_value:.4f}")
+print(f"- P-value: {p_value:.4f} (exact permutation p={p_exact:.4f})")
+
+# 보고서용 검정 결과 테이블 (batch_stats.run_batch_tests 와 같은 컬럼 구성)
+test_rows = [{'Metric': 'Rank', 'Test': 'friedman', 'N': len(df_rank), 'Statistic': stat,
+              'p': p_value, 'p_exact': p_exact}]
 
 mean_ranks = df_rank[['fixed', 'adaptive', 'bottom-right']].mean()
 print("\n[Mean Ranks] (낮을수록 선호도 높음)")
@@ -109,23 +94,33 @@ print(mean_ranks.sort_values())
 # 3-2. Post-hoc Analysis (Wilcoxon with Bonferroni)
 if p_value < 0.05:
     print("\n[Post-hoc: Wilcoxon Signed-Rank Test]")
-    print("(Bonferroni corrected alpha = 0.05 / 3 = 0.017)")
+    print("(Holm corrected, alpha = 0.05)")
 
     pairs = [('fixed', 'adaptive'), ('fixed', 'bottom-right'), ('adaptive', 'bottom-right')]
     sig_pairs = []
 
-    for c1, c2 in pairs:
-        w_stat, w_p = stats.wilcoxon(df_rank[c1], df_rank[c2])
-        # Bonferroni correction 적용한 유의성 판단
-        is_sig = w_p < (0.05 / 3)
-        star = "**" if is_sig else "ns"
-        print(f"- {c1} vs {c2}: p={w_p:.4f} ({star})")
+    w_res = [stats.wilcoxon(df_rank[c1], df_rank[c2]) for c1, c2 in pairs]
+    w_ps = [r[1] for r in w_res]
+    # 세 비교를 하나의 family로 보고 Holm 보정 (batch_stats.py와 동일 기준)
+    w_ps_holm = adjust_pvalues(w_ps, 'holm')
+
+    for (c1, c2), w, w_p, w_p_adj in zip(pairs, w_res, w_ps, w_ps_holm):
+        is_sig = w_p_adj < 0.05
+        star = significance_stars(w_p_adj)
+        print(f"- {c1} vs {c2}: p={w_p:.4f}, p_holm={w_p_adj:.4f} ({star})")
+        test_rows.append({'Metric': 'Rank', 'Test': 'wilcoxon', 'Condition_1': c1, 'Condition_2': c2,
+                          'N': len(df_rank), 'Statistic': w[0], 'p': w_p, 'p_holm': w_p_adj,
+                          'Significance': star})
 
         if is_sig:
-            sig_pairs.append((c1, c2, w_p))
+            sig_pairs.append((c1, c2, w_p_adj))
 else:
     print("\n👉 프리드먼 검정 결과가 유의하지 않아 사후 검정을 생략합니다.")
 
+pd.DataFrame(test_rows, columns=['Metric', 'Test', 'Condition_1', 'Condition_2', 'N', 'Statistic', 'p',
+                                 'p_exact', 'p_holm', 'Significance']) \
+    .to_csv(os.path.join(RESULT_DIR, 'preference_tests.csv'), index=False, encoding='utf-8-sig')
+
 # ==========================================
 # 4. 시각화 (Mean Rank Bar Plot)
 # ==========================================
@@ -172,7 +167,7 @@ if p_value < 0.05:
             x1, x2 = 0, 1
             y, h = 2.8, 0.1
             ax.plot([x1, x1, x2, x2], [y, y+h, y+h, y], lw=1.5, c='k')
-            ax.text((x1+x2)*.5, y+h, "**", ha='center', va='bottom', color='k', fontsize=12)
+            ax.text((x1+x2)*.5, y+h, significance_stars(pair[2]), ha='center', va='bottom', color='k', fontsize=12)
 
 plt.tight_layout()
 save_path = os.path.join(RESULT_DIR, 'Fig8_Preference_Ranks.png')
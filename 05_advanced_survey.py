@@ -2,16 +2,15 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
-import json
-import glob
+from participant_registry import build_registry, load_survey, report_unmatched, ORDER_COLS
 import platform
 
 # ==========================================
 # 1. 설정 및 데이터 로드
 # ==========================================
-SURVEY_PATH = './사후 설문 정리.csv'
-JSON_DIR = './data'
-RESULT_DIR = './results'
+SURVEY_PATH = os.environ.get('HIM_SURVEY_PATH', './사후 설문 정리.csv')
+JSON_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
 
 if not os.path.exists(RESULT_DIR):
     os.makedirs(RESULT_DIR)
@@ -24,39 +23,27 @@ elif platform.system() == 'Windows':
 plt.rc('axes', unicode_minus=False)
 
 # ==========================================
-# 2. JSON에서 참가자별 실험 순서 추출
+# 2. 참가자 레지스트리 (studentId 기준, 실험 순서 포함)
 # ==========================================
 print("🔄 실험 순서 데이터 추출 중...")
 
-participant_orders = {}
+registry = build_registry(JSON_DIR)
 
-json_files = glob.glob(os.path.join(JSON_DIR, '*.json'))
-for jf in json_files:
-    try:
-        with open(jf, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            name = data['participant']['name'].strip()
-
-            orders = []
-            for exp in data['experiments']:
-                orders.append(exp['condition'])
-
-            participant_orders[name] = orders
-    except Exception as e:
-        print(f"⚠️ JSON 로드 에러 ({jf}): {e}")
-
-print(f"✅ 총 {len(participant_orders)}명의 순서 정보 확보")
+print(f"✅ 총 {len(registry)}명의 순서 정보 확보")
 
 # ==========================================
 # 3. 설문 데이터 로드 및 매핑
 # ==========================================
 try:
-    df_raw = pd.read_csv(SURVEY_PATH)
-    print(f"✅ 설문 파일 로드 성공: {len(df_raw)}명 응답")
+    df_raw, unmatched = load_survey(registry, SURVEY_PATH)
+    print(f"✅ 설문 파일 로드 성공: {len(df_raw) + len(unmatched)}명 응답")
 except Exception as e:
     print(f"❌ 설문 CSV 파일을 찾을 수 없습니다: {e}")
     exit()
 
+# 로그(JSON)와 매칭되지 않은 응답은 건너뛰지 않고 목록으로 보고
+report_unmatched(unmatched, '설문')
+
 mapped_data = []
 
 # 설문지 문항 키워드 매핑 (CSV 컬럼명 -> 코드용 변수명)
@@ -74,16 +61,10 @@ ordinal_map_q = {4: 0, 5: 1, 6: 2}
 print("🔄 설문 데이터 매핑 중...")
 
 for idx, row in df_raw.iterrows():
-    # '1. 성함' 컬럼 사용
-    name = str(row.get('1. 성함', '')).strip()
-
-    if not name or name not in participant_orders:
-        if name: print(f"⚠️ 경고: 참가자 '{name}'의 로그(JSON)를 찾을 수 없어 제외합니다.")
-        continue
-
-    order = participant_orders[name] # 예: ['fixed', 'adaptive', 'bottom-right']
+    name = row['Participant']
+    order = [row[c] for c in ORDER_COLS] # 예: ['fixed', 'adaptive', 'bottom-right']
 
-    p_data = {'Participant': name}
+    p_data = {'Participant_ID': row['Participant_ID'], 'Participant': name}
 
     # 1. 주관적 점수 매핑 (Q4~Q6)
     for col in df_raw.columns:
@@ -1,16 +1,17 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import os
 from math import pi
+from batch_stats import adjust_pvalues, significance_stars
+from perm_stats import friedman_permutation
 
 # ==========================================
 # 1. 설정 및 데이터 로드
 # ==========================================
-SURVEY_PATH = './사후 설문 정리.csv'  # 파일명 확인 필요
-RESULT_DIR = './results'
+SURVEY_PATH = os.environ.get('HIM_SURVEY_PATH', './사후 설문 정리.csv')  # 파일명 확인 필요
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
 
 # 한글 폰트 설정
 import platform
@@ -58,7 +59,7 @@ for metric_eng, metric_kor in metrics.items():
 # 사용자가 올린 'mapped_survey_data_check.csv'가 있다면 그걸 쓰는 게 베스트입니다.
 # 여기서는 'mapped_survey_data_check.csv' 구조를 가정하고 작성합니다.
 
-MAPPED_DATA_PATH = './results/mapped_survey_data_check.csv'
+MAPPED_DATA_PATH = os.path.join(RESULT_DIR, 'mapped_survey_data_check.csv')
 if os.path.exists(MAPPED_DATA_PATH):
     df_mapped = pd.read_csv(MAPPED_DATA_PATH)
 else:
@@ -78,6 +79,7 @@ metrics_cols = {
 # 결과 저장용 리스트
 radar_means = {'fixed': [], 'adaptive': [], 'bottom-right': []}
 radar_labels = []
+test_rows = []  # 보고서용 검정 결과 테이블 (batch_stats.run_batch_tests 와 같은 컬럼 구성)
 
 for metric, cols in metrics_cols.items():
     print(f"\n📊 [{metric}] 분석 결과 (1: 긍정/부정 확인 필요)")
@@ -97,15 +99,25 @@ for metric, cols in metrics_cols.items():
 
     # 2. Friedman Test
     stat, p = stats.friedmanchisquare(data['Fixed'], data['Adaptive'], data['Bottom-Right'])
-    print(f"  👉 Friedman Test: Chi2={stat:.3f}, p={p:.4f}")
+    # 7점 척도 동순위가 많으므로 정확 순열 p값도 함께 보고
+    _, p_exact = friedman_permutation(data.to_numpy())
+    print(f"  👉 Friedman Test: Chi2={stat:.3f}, p={p:.4f} (exact permutation p={p_exact:.4f})")
+    test_rows.append({'Metric': metric, 'Test': 'friedman', 'N': len(data), 'Statistic': stat,
+                      'p': p, 'p_exact': p_exact})
 
     if p < 0.05:
         print("     (유의미한 차이 발견! 사후 검정 진행)")
         pairs = [('Fixed', 'Adaptive'), ('Adaptive', 'Bottom-Right'), ('Fixed', 'Bottom-Right')]
-        for c1, c2 in pairs:
-            w_stat, w_p = stats.wilcoxon(data[c1], data[c2])
-            sig = "**" if w_p < 0.017 else ("*" if w_p < 0.05 else "ns")
-            print(f"     - {c1} vs {c2}: p={w_p:.4f} ({sig})")
+        w_res = [stats.wilcoxon(data[c1], data[c2]) for c1, c2 in pairs]
+        w_ps = [r[1] for r in w_res]
+        # 세 비교를 하나의 family로 보고 Holm 보정 (batch_stats.py와 동일 기준)
+        w_ps_holm = adjust_pvalues(w_ps, 'holm')
+        for (c1, c2), w, w_p, w_p_adj in zip(pairs, w_res, w_ps, w_ps_holm):
+            sig = significance_stars(w_p_adj)
+            print(f"     - {c1} vs {c2}: p={w_p:.4f}, p_holm={w_p_adj:.4f} ({sig})")
+            test_rows.append({'Metric': metric, 'Test': 'wilcoxon', 'Condition_1': c1, 'Condition_2': c2,
+                              'N': len(data), 'Statistic': w[0], 'p': w_p, 'p_holm': w_p_adj,
+                              'Significance': sig})
 
     # 3. Box Plot 시각화
     plt.figure(figsize=(6, 5))
@@ -117,6 +129,10 @@ for metric, cols in metrics_cols.items():
     plt.savefig(f"{RESULT_DIR}/Fig_TLX_{metric.replace(' ', '_')}.png", dpi=300)
     print(f"  ✅ 그래프 저장 완료: Fig_TLX_{metric.replace(' ', '_')}.png")
 
+pd.DataFrame(test_rows, columns=['Metric', 'Test', 'Condition_1', 'Condition_2', 'N', 'Statistic', 'p',
+                                 'p_exact', 'p_holm', 'Significance']) \
+    .to_csv(os.path.join(RESULT_DIR, 'tlx_tests.csv'), index=False, encoding='utf-8-sig')
+
 # ==========================================
 # 4. 레이더 차트 (종합 비교)
 # ==========================================
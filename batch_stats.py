@@ -0,0 +1,175 @@
+import pandas as pd
+import numpy as np
+from scipy import stats
+from itertools import combinations
+import os
+
+# ==========================================
+# 1. 설정
+# ==========================================
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+PROCESS_PATH = os.path.join(RESULT_DIR, 'processed_data.csv')
+MAPPED_PATH = os.path.join(RESULT_DIR, 'mapped_survey_data_check.csv')
+
+CONDITIONS = ['fixed', 'adaptive', 'bottom-right']
+CONDITION_PAIRS = list(combinations(CONDITIONS, 2))
+
+# 시행(trial) 단위 지표와 참가자 단위(설문) 지표
+TRIAL_METRICS = ['SearchTime', 'Offset', 'TypingTime', 'Error']
+SURVEY_METRICS = ['Physical_Effort', 'Accessibility', 'Grip_Instability', 'Rank']
+
+# ==========================================
+# 2. Long 포맷 변환 (Participant, Condition, Metric, Value)
+# ==========================================
+def trials_to_long(df, metrics=TRIAL_METRICS, group_col='Condition'):
+    long_df = df.melt(id_vars=['Participant', group_col], value_vars=metrics,
+                      var_name='Metric', value_name='Value')
+    return long_df.rename(columns={group_col: 'Condition'})
+
+
+def mapped_to_long(df_mapped, metrics=SURVEY_METRICS, conditions=CONDITIONS):
+    # 'fixed_Accessibility' 처럼 '{조건}_{지표}' 형태의 컬럼을 펼침
+    value_cols = [f'{c}_{m}' for c in conditions for m in metrics if f'{c}_{m}' in df_mapped.columns]
+    long_df = df_mapped.melt(id_vars=['Participant'], value_vars=value_cols,
+                             var_name='Column', value_name='Value')
+    split = long_df['Column'].str.split('_', n=1, expand=True)
+    long_df['Condition'] = split[0]
+    long_df['Metric'] = split[1]
+    long_df['Value'] = pd.to_numeric(long_df['Value'], errors='coerce')
+    return long_df[['Participant', 'Condition', 'Metric', 'Value']]
+
+# ==========================================
+# 3. 참가자 × 조건 × 지표 3차원 배열 (피벗 1회)
+# ==========================================
+def build_wide_array(long_df, metrics=None, conditions=CONDITIONS, aggfunc='mean'):
+    if metrics is None:
+        metrics = list(pd.unique(long_df['Metric']))
+
+    wide = long_df.pivot_table(index='Participant', columns=['Metric', 'Condition'],
+                               values='Value', aggfunc=aggfunc)
+    wide = wide.reindex(columns=pd.MultiIndex.from_product([metrics, conditions]))
+
+    # (P, M*C) -> (P, M, C) -> (P, C, M)
+    arr = wide.to_numpy(dtype=float).reshape(len(wide), len(metrics), len(conditions))
+    return wide.index, arr.transpose(0, 2, 1), list(metrics)
+
+# ==========================================
+# 4. 다중비교 보정 (Holm / Benjamini-Hochberg, 마지막 축 기준)
+# ==========================================
+def adjust_pvalues(p, method='holm'):
+    p = np.asarray(p, dtype=float)
+    m = np.sum(~np.isnan(p), axis=-1, keepdims=True)
+
+    # NaN은 정렬 시 맨 뒤로 보내고, 결과에서도 NaN으로 유지
+    order = np.argsort(np.where(np.isnan(p), np.inf, p), axis=-1)
+    p_sorted = np.take_along_axis(p, order, axis=-1)
+    rank = np.arange(1, p.shape[-1] + 1)
+
+    if method == 'holm':
+        adj = np.fmax.accumulate((m - rank + 1) * p_sorted, axis=-1)
+    elif method == 'bh':
+        adj = (m / rank) * p_sorted
+        adj = np.fmin.accumulate(adj[..., ::-1], axis=-1)[..., ::-1]
+    elif method == 'bonferroni':
+        adj = m * p_sorted
+    else:
+        raise ValueError(f"지원하지 않는 보정 방법입니다: {method}")
+
+    adj = np.minimum(adj, 1.0)
+    adj[np.isnan(p_sorted)] = np.nan
+
+    out = np.empty_like(adj)
+    np.put_along_axis(out, order, adj, axis=-1)
+    return out
+
+
+def significance_stars(p):
+    if pd.isna(p):
+        return 'nan'
+    if p < 0.001: return '***'
+    if p < 0.01: return '**'
+    if p < 0.05: return '*'
+    return 'ns'
+
+# ==========================================
+# 5. 일괄 검정 (Shapiro / Wilcoxon / Friedman)
+# ==========================================
+def run_batch_tests(long_df, metrics=None, conditions=CONDITIONS, pairs=None, aggfunc='mean'):
+    participants, arr, metrics = build_wide_array(long_df, metrics, conditions, aggfunc)
+    if pairs is None:
+        pairs = list(combinations(conditions, 2))
+    cond_idx = {c: i for i, c in enumerate(conditions)}
+    n_valid = np.sum(~np.isnan(arr), axis=0)  # (C, M)
+
+    rows = []
+
+    # 1) 정규성 검정: 모든 (조건, 지표)에 대해 한 번에
+    sw_stat, sw_p = stats.shapiro(arr, axis=0, nan_policy='omit')
+    sw_stat, sw_p = np.atleast_2d(sw_stat), np.atleast_2d(sw_p)
+    for ci, cond in enumerate(conditions):
+        for mi, metric in enumerate(metrics):
+            rows.append({'Metric': metric, 'Test': 'shapiro', 'Condition_1': cond, 'Condition_2': None,
+                         'N': int(n_valid[ci, mi]), 'Statistic': sw_stat[ci, mi], 'p': sw_p[ci, mi]})
+
+    # 2) Friedman 검정: 지표 전체를 한 번에
+    complete = np.all(~np.isnan(arr), axis=1)  # (P, M)
+    fr_stat, fr_p = stats.friedmanchisquare(*[arr[:, ci, :] for ci in range(len(conditions))],
+                                            axis=0, nan_policy='omit')
+    for mi, metric in enumerate(metrics):
+        rows.append({'Metric': metric, 'Test': 'friedman', 'Condition_1': None, 'Condition_2': None,
+                     'N': int(complete[:, mi].sum()), 'Statistic': fr_stat[mi], 'p': fr_p[mi]})
+
+    # 3) Wilcoxon 대응표본 검정: (P, 쌍, 지표) 차이 배열로 한 번에
+    i1 = [cond_idx[c1] for c1, _ in pairs]
+    i2 = [cond_idx[c2] for _, c2 in pairs]
+    diffs = arr[:, i1, :] - arr[:, i2, :]
+    with np.errstate(invalid='ignore'):
+        wx_stat, wx_p = stats.wilcoxon(diffs, axis=0, nan_policy='omit')
+    wx_stat, wx_p = np.atleast_2d(wx_stat), np.atleast_2d(wx_p)
+    n_pair = np.sum(~np.isnan(diffs), axis=0)
+
+    # 보정은 지표별로 쌍 전체를 하나의 family로 간주 (축: 쌍)
+    p_holm = adjust_pvalues(wx_p.T, 'holm').T
+    p_bh = adjust_pvalues(wx_p.T, 'bh').T
+    for pi, (c1, c2) in enumerate(pairs):
+        for mi, metric in enumerate(metrics):
+            rows.append({'Metric': metric, 'Test': 'wilcoxon', 'Condition_1': c1, 'Condition_2': c2,
+                         'N': int(n_pair[pi, mi]), 'Statistic': wx_stat[pi, mi], 'p': wx_p[pi, mi],
+                         'p_holm': p_holm[pi, mi], 'p_bh': p_bh[pi, mi]})
+
+    results = pd.DataFrame(rows, columns=['Metric', 'Test', 'Condition_1', 'Condition_2', 'N',
+                                          'Statistic', 'p', 'p_holm', 'p_bh'])
+    # 보정된 p값 기준 유의성 (Wilcoxon 외에는 원래 p값 사용)
+    p_ref = results['p_holm'].fillna(results['p'])
+    results['Significance'] = [significance_stars(p) for p in p_ref]
+    return results
+
+# ==========================================
+# 6. 실행 (모든 지표 일괄 분석)
+# ==========================================
+if __name__ == "__main__":
+    print("🔄 일괄 통계 분석 시작...")
+    frames = []
+
+    if os.path.exists(PROCESS_PATH):
+        frames.append(trials_to_long(pd.read_csv(PROCESS_PATH)))
+    else:
+        print(f"⚠️ '{PROCESS_PATH}' 파일이 없습니다. 01_data_loader.py를 먼저 실행하세요.")
+
+    if os.path.exists(MAPPED_PATH):
+        frames.append(mapped_to_long(pd.read_csv(MAPPED_PATH)))
+    else:
+        print(f"⚠️ '{MAPPED_PATH}' 파일이 없습니다. test.py를 먼저 실행하세요.")
+
+    if not frames:
+        exit()
+
+    long_df = pd.concat(frames, ignore_index=True)
+    results = run_batch_tests(long_df)
+
+    pd.set_option('display.width', 200)
+    print(results[results['Test'] != 'shapiro'].to_string(index=False))
+
+    save_path = os.path.join(RESULT_DIR, 'stats_results.csv')
+    results.to_csv(save_path, index=False, encoding='utf-8-sig')
+    print(f"\n💾 통계 결과 테이블이 '{save_path}'에 저장되었습니다.")
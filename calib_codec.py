@@ -0,0 +1,203 @@
+import numpy as np
+import json
+import struct
+import zlib
+
+# ==========================================
+# 1. 포맷
+# ==========================================
+# [헤더][키 순서 JSON][timestamp 델타][x 델타][y 델타][reachable 비트]
+#
+# - timestamp / x / y 는 첫 값 + 차분(delta)으로 저장하고, 차분 범위에 맞는
+#   가장 작은 정수형(int8/16/32/64)을 스트림별로 선택
+# - reachable 은 np.packbits 로 8개씩 1바이트에 압축
+# - 좌표가 정수가 아닌 세션은 x / y 를 float64 원본 그대로 저장하고,
+#   정수로 기록된 행(예: JSON.stringify 의 170 vs 171.25)은 비트마스크로 따로 저장해 타입까지 복원
+MAGIC = b'HCAL'
+VERSION = 1
+HEADER = struct.Struct('<4sBIBBBBqqq')
+INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+FLAG_INT_COORDS = 1
+FLAG_INT_ROWS = 2   # float64 좌표 + 정수 행 비트마스크 (x, y 순서로 reachable 뒤에 붙음)
+FIELDS = ('x', 'y', 'reachable', 'timestamp')
+
+
+def _smallest_int(values):
+    if len(values) == 0:
+        return 0
+    lo, hi = values.min(), values.max()
+    for code, dtype in enumerate(INT_DTYPES):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return code
+    return len(INT_DTYPES) - 1
+
+
+def _is_int(v):
+    return isinstance(v, int) and not isinstance(v, bool)
+
+# ==========================================
+# 2. 인코딩
+# ==========================================
+def encode_arrays(x, y, timestamp, reachable, key_order=FIELDS, int_coords=True, int_rows=None):
+    # int_rows: float64 저장 시 (x 정수 행 마스크, y 정수 행 마스크)
+    n = len(timestamp)
+    t = np.asarray(timestamp, dtype=np.int64)
+    reachable = np.asarray(reachable, dtype=bool)
+
+    if int_coords:
+        xs = np.asarray(x, dtype=np.int64)
+        ys = np.asarray(y, dtype=np.int64)
+    else:
+        xs = np.asarray(x, dtype=float)
+        ys = np.asarray(y, dtype=float)
+
+    dt = np.diff(t)
+    t_code = _smallest_int(dt)
+    if int_coords:
+        dx, dy = np.diff(xs), np.diff(ys)
+        x_code, y_code = _smallest_int(dx), _smallest_int(dy)
+        x_body = dx.astype(INT_DTYPES[x_code]).tobytes()
+        y_body = dy.astype(INT_DTYPES[y_code]).tobytes()
+        base_x = int(xs[0]) if n else 0
+        base_y = int(ys[0]) if n else 0
+    else:
+        x_code = y_code = 255  # float64 원본
+        x_body, y_body = xs.tobytes(), ys.tobytes()
+        base_x = base_y = 0
+
+    flags = FLAG_INT_COORDS if int_coords else 0
+    mask_body = b''
+    if not int_coords and int_rows is not None and any(np.any(m) for m in int_rows):
+        flags |= FLAG_INT_ROWS
+        mask_body = b''.join(np.packbits(np.asarray(m, dtype=bool)).tobytes() for m in int_rows)
+
+    keys = json.dumps(list(key_order)).encode('utf-8')
+    header = HEADER.pack(MAGIC, VERSION, n, flags,
+                         t_code, x_code, y_code, int(t[0]) if n else 0, base_x, base_y)
+    parts = [
+        header,
+        struct.pack('<H', len(keys)), keys,
+        dt.astype(INT_DTYPES[t_code]).tobytes(),
+        x_body, y_body,
+        np.packbits(reachable).tobytes(),
+        mask_body,
+    ]
+    return b''.join(parts)
+
+
+def encode_points(points):
+    # JSON의 [{"x":..,"y":..,"reachable":..,"timestamp":..}, ...] -> bytes
+    if points:
+        key_order = tuple(points[0].keys())
+        if any(tuple(p.keys()) != key_order for p in points) or set(key_order) != set(FIELDS):
+            raise ValueError("모든 포인트가 x, y, reachable, timestamp 키를 같은 순서로 가져야 합니다.")
+        if not all(_is_int(p['timestamp']) and isinstance(p['reachable'], bool) for p in points):
+            raise ValueError("timestamp는 정수, reachable은 bool이어야 합니다.")
+    else:
+        key_order = FIELDS
+
+    x_int = [_is_int(p['x']) for p in points]
+    y_int = [_is_int(p['y']) for p in points]
+    int_coords = all(x_int) and all(y_int)
+    return encode_arrays(
+        [p['x'] for p in points], [p['y'] for p in points],
+        [p['timestamp'] for p in points], [p['reachable'] for p in points],
+        key_order, int_coords, (x_int, y_int),
+    )
+
+# ==========================================
+# 3. 디코딩 (NumPy 벡터 연산)
+# ==========================================
+def decode_arrays(raw):
+    (magic, version, n, flags, t_code, x_code, y_code,
+     base_t, base_x, base_y) = HEADER.unpack_from(raw, 0)
+    if magic != MAGIC:
+        raise ValueError("캘리브레이션 인코딩 데이터가 아닙니다.")
+    pos = HEADER.size
+    (key_len,) = struct.unpack_from('<H', raw, pos)
+    pos += 2
+    key_order = json.loads(raw[pos:pos + key_len].decode('utf-8'))
+    pos += key_len
+
+    def take(dtype, count):
+        nonlocal pos
+        arr = np.frombuffer(raw, dtype=dtype, count=count, offset=pos)
+        pos += arr.nbytes
+        return arr
+
+    def cumulative(base, deltas):
+        out = np.empty(n, dtype=np.int64)
+        if n:
+            out[0] = base
+            np.cumsum(deltas, out=out[1:])
+            out[1:] += base
+        return out
+
+    n_delta = max(n - 1, 0)
+    t = cumulative(base_t, take(INT_DTYPES[t_code], n_delta).astype(np.int64))
+
+    if flags & FLAG_INT_COORDS:
+        x = cumulative(base_x, take(INT_DTYPES[x_code], n_delta).astype(np.int64))
+        y = cumulative(base_y, take(INT_DTYPES[y_code], n_delta).astype(np.int64))
+    else:
+        x = take(np.float64, n).copy()
+        y = take(np.float64, n).copy()
+
+    reachable = np.unpackbits(take(np.uint8, (n + 7) // 8), count=n).astype(bool)
+    out = {'x': x, 'y': y, 'timestamp': t, 'reachable': reachable, 'key_order': key_order}
+    if flags & FLAG_INT_ROWS:
+        # 원래 정수로 기록된 좌표 행 (to_python 에서 int 로 복원)
+        out['int_rows'] = {c: np.unpackbits(take(np.uint8, (n + 7) // 8), count=n).astype(bool)
+                           for c in ('x', 'y')}
+    return out
+
+
+def to_python(arrays, col):
+    # 디코딩한 컬럼 -> 파이썬 리스트 (정수로 기록된 좌표 행은 int 로)
+    values = arrays[col].tolist()
+    mask = arrays.get('int_rows', {}).get(col)
+    if mask is None:
+        return values
+    return [int(v) if m else v for v, m in zip(values, mask.tolist())]
+
+
+def decode_points(raw):
+    # bytes -> 원래 JSON과 같은 포인트 딕셔너리 리스트 (키 순서 포함)
+    arrays = decode_arrays(raw)
+    key_order = arrays['key_order']
+    columns = [to_python(arrays, k) for k in key_order]
+    return [dict(zip(key_order, values)) for values in zip(*columns)]
+
+# ==========================================
+# 4. 실행 (용량 비교 및 무손실 검증)
+# ==========================================
+if __name__ == "__main__":
+    import os
+    import glob
+    import time
+
+    DATA_DIR = './data'
+    total_json = total_enc = total_zip = 0
+    t_decode = 0.0
+    for file_path in sorted(glob.glob(os.path.join(DATA_DIR, '*.json'))):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        points = data['calibration']['points']
+
+        raw = encode_points(points)
+        start = time.perf_counter()
+        decode_arrays(raw)
+        t_decode += time.perf_counter() - start
+
+        # == 는 170 == 170.0 을 같다고 보므로 직렬화 결과(타입 포함)로 비교
+        assert json.dumps(decode_points(raw)) == json.dumps(points), f"{file_path}: 복원 결과가 원본과 다릅니다."
+        total_json += len(json.dumps(points, separators=(',', ':')).encode('utf-8'))
+        total_enc += len(raw)
+        total_zip += len(zlib.compress(raw))
+
+    print(f"📦 캘리브레이션 JSON: {total_json / 1024:.1f} KB")
+    print(f"   -> 델타/비트 인코딩: {total_enc / 1024:.1f} KB ({total_json / total_enc:.1f}배)")
+    print(f"   -> + zlib: {total_zip / 1024:.1f} KB ({total_json / total_zip:.1f}배)")
+    print(f"⚡ 전체 디코딩 시간: {t_decode * 1000:.2f} ms")
+    print("✅ 모든 파일 무손실 복원 확인")
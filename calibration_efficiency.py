@@ -0,0 +1,219 @@
+import pandas as pd
+import numpy as np
+import os
+import unicodedata
+from session_store import iter_sessions
+from calibration_kinematics import pack_calibration
+
+# ==========================================
+# 1. 설정
+# ==========================================
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+
+# 앱의 반경 모델: 도달 가능 포인트의 중심 거리 정렬값 중 floor(0.7 * n) 번째 (nearest-rank)
+RADIUS_PERCENTILE = 0.7
+BORDER_RATIO = 0.25          # borderThreshold = 0.25 * radius
+PREFIX_STEP = 5              # 접두(prefix) 길이 격자 간격 (포인트 수)
+TOLERANCES = [0.01, 0.02, 0.05]
+N_SUBSAMPLES = 200
+SUBSAMPLE_SIZES = [10, 20, 30, 50, 75, 100, 150, 200, 300, 400, 500]
+MAX_BATCH_CELLS = 20_000_000  # 한 배치 배열의 원소 수 상한 (접두 길이 / 참가자 단위로 나눠 계산)
+
+# ==========================================
+# 2. 반경 모델 (여러 부분집합을 한 번에)
+# ==========================================
+def radius_model(sorted_dist, counts):
+    # sorted_dist: (..., n) 오름차순 (제외된 값은 inf), counts: (...) 포함된 포인트 수
+    k = np.floor(RADIUS_PERCENTILE * counts).astype(int)
+    k = np.clip(k, 0, sorted_dist.shape[-1] - 1)
+    radius = np.take_along_axis(sorted_dist, k[..., None], axis=-1)[..., 0]
+    return np.where(counts > 0, radius, np.nan)
+
+
+def load_circles(data_dir=DATA_DIR):
+    # circleData 가 없거나 null 인 세션은 값을 NaN 으로 남김 (재생에서 제외)
+    rows = []
+    for file_path, data in iter_sessions(data_dir, include_calibration=False):
+        c = data.get('circleData') or {}
+        center = c.get('circleCenter') or {}
+        if not c:
+            print(f"⚠️ 경고: {file_path} 에 circleData 가 없습니다 - 반경 재생에서 제외")
+        rows.append({'Participant': data['participant']['name'].strip(),
+                     'Center_X': center.get('x', np.nan), 'Center_Y': center.get('y', np.nan),
+                     'Radius_Logged': c.get('radius', np.nan), 'Border_Logged': c.get('borderThreshold', np.nan),
+                     'Max_Distance_Logged': c.get('maxDistance', np.nan)})
+    return pd.DataFrame(rows, columns=['Participant', 'Center_X', 'Center_Y', 'Radius_Logged', 'Border_Logged',
+                                       'Max_Distance_Logged'])
+
+
+def padded_distances(packed, circles):
+    # 참가자별 (도달 가능) 포인트를 타임스탬프 순으로 재생 -> (P, n_max) 거리/시간 배열
+    names = [unicodedata.normalize('NFC', n) for n in packed['Participant']]
+    circles = circles.assign(Participant=circles['Participant'].map(lambda s: unicodedata.normalize('NFC', s)))
+    circles = circles.set_index('Participant').reindex(names)
+
+    P = len(names)
+    seg = np.repeat(np.arange(P), np.diff(packed['offsets']))
+    # 원 중심이 없는 참가자는 포인트 0개로 처리 (결과는 NaN)
+    has_center = circles[['Center_X', 'Center_Y']].notna().all(axis=1).to_numpy()
+    keep = packed['reachable'].astype(bool) & has_center[seg]
+    seg, t = seg[keep], packed['timestamp'][keep].astype(float)
+    x, y = packed['x'][keep], packed['y'][keep]
+    order = np.lexsort((t, seg))
+    seg, t, x, y = seg[order], t[order], x[order], y[order]
+
+    dist = np.hypot(x - circles['Center_X'].to_numpy()[seg], y - circles['Center_Y'].to_numpy()[seg])
+    counts = np.bincount(seg, minlength=P)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    pos = np.arange(len(seg)) - starts[seg]
+
+    n_max = max(int(counts.max()), 1) if P else 1
+    D = np.full((P, n_max), np.inf)
+    T = np.full((P, n_max), np.nan)
+    D[seg, pos] = dist
+    T[seg, pos] = t - t[starts][seg]
+    return names, circles, D, T / 1000, counts
+
+# ==========================================
+# 3. 접두(prefix) 재생: 참가자 x 접두 길이를 배치 단위로 한 번에
+# ==========================================
+def prefix_curves(D, T, counts, step=PREFIX_STEP, max_cells=MAX_BATCH_CELLS):
+    P, n_max = D.shape
+    lengths = np.unique(np.concatenate([np.arange(step, n_max + 1, step), counts]))  # (K,)
+    # (P, 배치, n) 배열이 max_cells 를 넘지 않도록 접두 길이를 나눠서 계산 (배치마다 가장 긴 접두까지만 사용)
+    batch = max(1, max_cells // max(P * n_max, 1))
+    radius, max_dist, elapsed = [], [], []
+    for lo in range(0, len(lengths), batch):
+        L = lengths[lo:lo + batch]
+        n = max(int(L.max()), 1)
+        n_used = np.minimum(L[None, :], counts[:, None])
+        # 접두 밖의 값은 inf 로 가린 뒤 정렬
+        inside = np.arange(n)[None, None, :] < n_used[:, :, None]
+        masked = np.sort(np.where(inside, D[:, None, :n], np.inf), axis=-1)
+        valid = L[None, :] <= counts[:, None]
+        r = radius_model(masked, n_used)
+        m = np.take_along_axis(masked, np.maximum(n_used - 1, 0)[..., None], axis=-1)[..., 0]
+        e = np.take_along_axis(T, np.clip(n_used - 1, 0, n_max - 1), axis=1)
+        radius.append(np.where(valid, r, np.nan))
+        max_dist.append(np.where(valid & (n_used > 0), m, np.nan))
+        elapsed.append(np.where(valid & (n_used > 0), e, np.nan))
+    return lengths, np.concatenate(radius, axis=1), np.concatenate(max_dist, axis=1), \
+        np.concatenate(elapsed, axis=1)
+
+
+def converged_at(rel_err, tol):
+    # 이후 모든 접두에서 오차가 tol 이하로 유지되기 시작하는 첫 위치 (없거나 오차를 계산할 수 없으면 -1)
+    ok = (rel_err <= tol) | np.isnan(rel_err)
+    stays = np.logical_and.accumulate(ok[:, ::-1], axis=1)[:, ::-1]
+    first = stays.argmax(axis=1)
+    return np.where(stays.any(axis=1) & ~np.isnan(rel_err).all(axis=1), first, -1)
+
+# ==========================================
+# 4. 무작위 부분표본: 같은 수의 포인트를 전체 범위에서 골랐을 때의 오차
+# ==========================================
+def subsample_errors(D, counts, final, sizes=SUBSAMPLE_SIZES, n_rep=N_SUBSAMPLES, seed=0,
+                     max_cells=MAX_BATCH_CELLS):
+    rng = np.random.default_rng(seed)
+    P, n_max = D.shape
+    m_max = min(max(sizes), n_max)
+    # (참가자 배치, n_rep, n_max) 배열이 max_cells 를 넘지 않도록 참가자를 나눠서 계산
+    # (난수는 참가자 순서대로 이어서 뽑으므로 한 번에 뽑을 때와 같은 순열)
+    batch = max(1, max_cells // max(n_rep * n_max, 1))
+    rel = {m: [] for m in sizes}
+    for lo in range(0, P, batch):
+        d, c, f = D[lo:lo + batch], counts[lo:lo + batch], final[lo:lo + batch]
+        # 참가자마다 n_rep 개의 무작위 순열 (패딩 위치는 항상 뒤로), 가장 큰 부분표본 크기까지만 보관
+        keys = np.where(np.isfinite(d)[:, None, :], rng.random((len(d), n_rep, n_max)), np.inf)
+        perm = np.argsort(keys, axis=-1)[:, :, :m_max]
+        del keys
+        shuffled = np.take_along_axis(np.broadcast_to(d[:, None, :], perm.shape[:2] + (n_max,)), perm, axis=-1)
+        for m in sizes:
+            use = np.minimum(m, c)
+            sub = np.sort(shuffled[:, :, :m], axis=-1)
+            radius = radius_model(sub, np.broadcast_to(use[:, None], (len(d), n_rep)))
+            r = np.abs(radius - f[:, None]) / f[:, None]
+            r[m > c] = np.nan  # 포인트가 m 개보다 적은 참가자는 제외
+            rel[m].append(r)
+
+    rows = []
+    for m in sizes:
+        r = np.concatenate(rel[m])
+        rows.append({'Points': m, 'Participants': int((m <= counts).sum()),
+                     'Median_Rel_Error': np.nanmedian(r), 'P95_Rel_Error': np.nanpercentile(r, 95),
+                     'Max_Rel_Error': np.nanmax(r) if np.isfinite(r).any() else np.nan})
+    return pd.DataFrame(rows)
+
+# ==========================================
+# 5. 실행
+# ==========================================
+if __name__ == "__main__":
+    import time
+
+    print("🔄 캘리브레이션 재생 중...")
+    start = time.perf_counter()
+    packed = pack_calibration(DATA_DIR)
+    circles = load_circles(DATA_DIR)
+    names, circles, D, T, counts = padded_distances(packed, circles)
+
+    lengths, radius, max_dist, elapsed = prefix_curves(D, T, counts)
+    final_idx = np.searchsorted(lengths, counts)
+    replayed = radius[np.arange(len(names)), final_idx]
+    logged = circles['Radius_Logged'].to_numpy()
+    match = np.isclose(replayed, logged)
+    print(f"✅ 전체 포인트로 다시 계산한 반경이 circleData.radius 와 일치: {match.sum()}/{len(match)}명")
+
+    rel_err = np.abs(radius - logged[:, None]) / logged[:, None]
+    summary = pd.DataFrame({
+        'Participant': names,
+        'N_Points': counts,
+        'Duration_s': elapsed[np.arange(len(names)), final_idx],
+        'Radius_Logged': logged,
+        'Radius_Replayed': replayed,
+        'Border_Replayed': BORDER_RATIO * replayed,
+        'Match': match,
+    })
+    for tol in TOLERANCES:
+        at = converged_at(rel_err, tol)
+        summary[f'Points_Within_{tol:.0%}'] = np.where(at >= 0, lengths[np.maximum(at, 0)], np.nan)
+        summary[f'Seconds_Within_{tol:.0%}'] = np.where(
+            at >= 0, elapsed[np.arange(len(names)), np.maximum(at, 0)], np.nan)
+
+    subsample = subsample_errors(D, counts, logged)
+    print(f"⚡ 재생 + 부분표본 계산: {time.perf_counter() - start:.2f} s")
+
+    pd.set_option('display.width', 200)
+    print("\n[접두 재생: 최종 반경 대비 오차가 이후 계속 유지되는 시점]")
+    print(summary.drop(columns=['Border_Replayed', 'Match']).round(1).to_string(index=False))
+    print("\n[중앙값]")
+    print(summary.filter(like='_Within_').median().round(1).to_string())
+    print("\n[무작위 부분표본 (참가자별 200회): 반경 상대 오차]")
+    print(subsample.round(4).to_string(index=False))
+
+    summary.to_csv(os.path.join(RESULT_DIR, 'calibration_convergence.csv'), index=False, encoding='utf-8-sig')
+    subsample.to_csv(os.path.join(RESULT_DIR, 'calibration_subsample_error.csv'), index=False, encoding='utf-8-sig')
+
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5.5))
+    for p, name in enumerate(names):
+        axes[0].plot(elapsed[p], 100 * (radius[p] - logged[p]) / logged[p], lw=1, alpha=0.7)
+    for tol in TOLERANCES[:2]:
+        axes[0].axhspan(-100 * tol, 100 * tol, color='gray', alpha=0.12)
+    axes[0].set_ylim(-40, 20)
+    axes[0].set_xlabel('Calibration time elapsed (s)')
+    axes[0].set_ylabel('Radius error vs. final (%)')
+    axes[0].set_title('Prefix replay (per participant)')
+
+    axes[1].plot(subsample['Points'], 100 * subsample['Median_Rel_Error'], 'o-', label='median')
+    axes[1].plot(subsample['Points'], 100 * subsample['P95_Rel_Error'], 's--', label='95th percentile')
+    for tol in TOLERANCES:
+        axes[1].axhline(100 * tol, color='gray', ls=':', lw=0.8)
+    axes[1].set_xlabel('Random points used')
+    axes[1].set_ylabel('|Radius error| (%)')
+    axes[1].set_title('Random subsamples across the whole reach')
+    axes[1].legend()
+    fig.suptitle('Calibration Sample Efficiency', fontsize=15, fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(os.path.join(RESULT_DIR, 'Fig14_Calibration_Convergence.png'), dpi=200)
+    print("\n💾 calibration_convergence.csv, calibration_subsample_error.csv, Fig14 저장 완료")
@@ -0,0 +1,208 @@
+import pandas as pd
+import numpy as np
+import os
+from session_store import iter_sessions, resolve_source, SessionArchive
+from device_norm import device_signature, device_transform
+
+# ==========================================
+# 1. 설정
+# ==========================================
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+
+# 캘리브레이션 포인트는 약 16ms 간격으로 기록되므로,
+# 이보다 훨씬 긴 공백은 손가락을 뗐다가 다시 쓸기 시작한 것(새 stroke)으로 봄
+STROKE_GAP_MS = 100
+
+# ==========================================
+# 2. 캘리브레이션 포인트 패킹 (참가자 전체를 하나의 평탄 배열로)
+# ==========================================
+def pack_calibration(data_dir):
+    source = resolve_source(data_dir)
+    if os.path.isfile(source):
+        return _pack_calibration_archive(source)
+
+    names, lengths, scales = [], [], []
+    xs, ys, ts, reach = [], [], [], []
+    for file_path, data in iter_sessions(data_dir):
+        points = data.get('calibration', {}).get('points', [])
+        # 기록 순서가 아닌 타임스탬프 순으로 정렬
+        points = sorted(points, key=lambda p: p['timestamp'])
+
+        names.append(data['participant']['name'].strip())
+        lengths.append(len(points))
+        scales.append(device_transform(device_signature(data.get('deviceInfo')))['mm_per_px'])
+        xs.extend(p['x'] for p in points)
+        ys.extend(p['y'] for p in points)
+        ts.extend(p['timestamp'] for p in points)
+        reach.extend(bool(p.get('reachable', True)) for p in points)
+
+    # offsets[i]:offsets[i+1] 이 i번째 참가자의 구간 (CSR 형태)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    return _with_mm({
+        'Participant': names,
+        'offsets': offsets,
+        'mm_per_px': np.asarray(scales, dtype=float),
+        'x': np.asarray(xs, dtype=float),
+        'y': np.asarray(ys, dtype=float),
+        'timestamp': np.asarray(ts, dtype=np.int64),
+        'reachable': np.asarray(reach, dtype=bool),
+    })
+
+
+def _with_mm(packed):
+    # 참가자별 px -> mm 계수를 포인트 단위로 펼쳐 기기 무관 좌표 추가
+    scale = np.repeat(packed['mm_per_px'], np.diff(packed['offsets']))
+    packed['x_mm'] = packed['x'] * scale
+    packed['y_mm'] = packed['y'] * scale
+    return packed
+
+
+def _pack_calibration_archive(archive_path):
+    # 아카이브에서는 캘리브레이션 컬럼 블록만 바로 읽음 (JSON 복원 없이)
+    names, scales, cols = [], [], {'x': [], 'y': [], 'timestamp': [], 'reachable': []}
+    with SessionArchive(archive_path) as archive:
+        for i, name in enumerate(archive.participants):
+            meta = archive.read_meta(i)
+            scales.append(device_transform(device_signature(meta.get('deviceInfo')))['mm_per_px'])
+            calib = archive.read_calibration(i, list(cols))
+            order = np.argsort(calib['timestamp'], kind='stable')
+            names.append(name.strip())
+            for c in cols:
+                cols[c].append(np.asarray(calib[c])[order])
+
+    lengths = [len(ts) for ts in cols['timestamp']]
+    return _with_mm({
+        'Participant': names,
+        'offsets': np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        'mm_per_px': np.asarray(scales, dtype=float),
+        'x': np.concatenate(cols['x']).astype(float),
+        'y': np.concatenate(cols['y']).astype(float),
+        'timestamp': np.concatenate(cols['timestamp']).astype(np.int64),
+        'reachable': np.concatenate(cols['reachable']).astype(bool),
+    })
+
+# ==========================================
+# 3. Stroke 분할 및 운동학 계산 (전체 참가자 1회 벡터 연산)
+# ==========================================
+def compute_kinematics(packed, gap_ms=STROKE_GAP_MS, units='mm'):
+    # 기본은 기기 무관 mm 좌표 (units='px'이면 원래 CSS px 좌표)
+    offsets = packed['offsets']
+    x, y = (packed['x_mm'], packed['y_mm']) if units == 'mm' else (packed['x'], packed['y'])
+    t = packed['timestamp'].astype(float)
+    n = len(x)
+    n_participants = len(offsets) - 1
+
+    # 각 샘플의 참가자 인덱스
+    pid = np.repeat(np.arange(n_participants), np.diff(offsets))
+
+    # 참가자 경계 또는 시간 공백이 gap_ms를 넘으면 새 stroke 시작
+    dt = np.diff(t, prepend=np.nan)
+    new_stroke = np.ones(n, dtype=bool)
+    new_stroke[1:] = (pid[1:] != pid[:-1]) | (dt[1:] > gap_ms)
+    stroke_id = np.cumsum(new_stroke) - 1
+    n_strokes = stroke_id[-1] + 1 if n else 0
+
+    # 1차 차분 (stroke 첫 샘플은 이전 샘플과 이어지지 않으므로 무효)
+    dx = np.diff(x, prepend=np.nan)
+    dy = np.diff(y, prepend=np.nan)
+    step_valid = ~new_stroke
+    ds = np.where(step_valid, np.hypot(dx, dy), 0.0)
+
+    # 같은 타임스탬프(dt=0)가 찍힌 샘플은 속도 계산에서 제외
+    speed_valid = step_valid & (dt > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = np.where(speed_valid, ds / dt * 1000.0, np.nan)  # mm/s (또는 px/s)
+
+    # 2차 차분: 가속도와 방향 변화량
+    prev_speed = np.concatenate([[np.nan], speed[:-1]])
+    acc_valid = speed_valid & np.concatenate([[False], speed_valid[:-1]])
+    with np.errstate(invalid='ignore'):
+        acc = np.where(acc_valid, (speed - prev_speed) / dt * 1000.0, np.nan)  # mm/s^2 (또는 px/s^2)
+
+    heading = np.arctan2(dy, dx)
+    turn = np.diff(heading, prepend=np.nan)
+    turn = (turn + np.pi) % (2 * np.pi) - np.pi  # [-pi, pi)로 감기
+    moved = step_valid & (ds > 0)
+    turn_valid = moved & np.concatenate([[False], moved[:-1]])
+    abs_turn = np.where(turn_valid, np.abs(turn), 0.0)
+
+    # --- stroke 단위 집계 ---
+    def s_sum(v):
+        return np.bincount(stroke_id, weights=v, minlength=n_strokes)
+
+    def s_count(mask):
+        return np.bincount(stroke_id, weights=mask.astype(float), minlength=n_strokes)
+
+    start_idx = np.flatnonzero(new_stroke)
+    end_idx = np.concatenate([start_idx[1:], [n]]) - 1
+
+    stroke_pid = pid[start_idx]
+    path_length = s_sum(ds)
+    duration = t[end_idx] - t[start_idx]
+    speed_f = np.nan_to_num(speed)
+    abs_acc = np.nan_to_num(np.abs(acc))
+    peak_speed = np.zeros(n_strokes)
+    np.maximum.at(peak_speed, stroke_id, speed_f)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strokes = pd.DataFrame({
+            'Participant': np.asarray(packed['Participant'], dtype=object)[stroke_pid],
+            'Stroke': stroke_id[start_idx],
+            'N_Points': np.diff(np.concatenate([start_idx, [n]])),
+            'Duration': duration,
+            'Path_Length': path_length,
+            'Mean_Speed': s_sum(speed_f) / s_count(speed_valid),
+            'Peak_Speed': peak_speed,
+            'Mean_Abs_Acc': s_sum(abs_acc) / s_count(acc_valid),
+            # 경로 길이당 누적 회전량 (rad/mm 또는 rad/px)
+            'Mean_Curvature': s_sum(abs_turn) / path_length,
+        })
+
+    # --- 참가자 단위 집계 (stroke 배열에 다시 bincount) ---
+    def p_sum(v, ids=pid):
+        return np.bincount(ids, weights=v, minlength=n_participants)
+
+    total_length = p_sum(path_length, stroke_pid)
+    moving_time = p_sum(duration, stroke_pid)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = pd.DataFrame({
+            'Participant': packed['Participant'],
+            'Calib_Points': np.diff(offsets),
+            'Calib_Strokes': np.bincount(stroke_pid, minlength=n_participants),
+            'Calib_Duration': p_sum(duration, stroke_pid),
+            'Calib_Path_Length': total_length,
+            'Calib_Mean_Speed': total_length / moving_time * 1000.0,
+            'Calib_Peak_Speed': strokes.groupby(stroke_pid)['Peak_Speed'].max()
+                                      .reindex(range(n_participants)).to_numpy(),
+            'Calib_Mean_Abs_Acc': p_sum(abs_acc) / p_sum(acc_valid.astype(float)),
+            'Calib_Mean_Curvature': p_sum(abs_turn) / total_length,
+        })
+
+    return strokes, features
+
+# ==========================================
+# 4. 실행 및 결과 저장
+# ==========================================
+if __name__ == "__main__":
+    print("🔄 캘리브레이션 궤적 패킹 중...")
+    packed = pack_calibration(DATA_DIR)
+    print(f"📂 {len(packed['Participant'])}명, 총 {len(packed['x'])}개 포인트")
+
+    strokes, features = compute_kinematics(packed)
+    print(f"✅ 총 {len(strokes)}개의 stroke 분할 완료 (gap > {STROKE_GAP_MS}ms)")
+
+    pd.set_option('display.width', 200)
+    print("\n[참가자별 운동 특성]")
+    print(features.round(3).to_string(index=False))
+
+    strokes.to_csv(os.path.join(RESULT_DIR, 'calibration_strokes.csv'), index=False, encoding='utf-8-sig')
+    save_path = os.path.join(RESULT_DIR, 'calibration_kinematics.csv')
+    features.to_csv(save_path, index=False, encoding='utf-8-sig')
+    print(f"\n💾 운동 특성이 '{save_path}'에 저장되었습니다.")
+
+    # 시행 테이블과 Participant 기준으로 결합 가능 여부 확인
+    process_path = os.path.join(RESULT_DIR, 'processed_data.csv')
+    if os.path.exists(process_path):
+        df = pd.read_csv(process_path).merge(features, on='Participant', how='left')
+        print(f"🔗 시행 테이블 결합: {df['Calib_Mean_Speed'].notna().sum()}/{len(df)}건 매칭")
@@ -0,0 +1,351 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import argparse
+import subprocess
+import warnings
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from batch_stats import trials_to_long, mapped_to_long, run_batch_tests, CONDITIONS, TRIAL_METRICS, SURVEY_METRICS
+
+# ==========================================
+# 1. 설정
+# ==========================================
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+SURVEY_PATH = os.environ.get('HIM_SURVEY_PATH', './사후 설문 정리.csv')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+POOLED_DIR = os.path.join(RESULT_DIR, 'pooled')
+
+STATE_FILE = '.cohort_state.json'  # 코호트 결과 폴더마다 단계별 입력 해시를 기록 (통합 폴더에는 통합 테이블 키)
+LOG_DIR = 'logs'
+
+# 분석 단계: 스크립트 -> (읽는 원본 입력, 먼저 끝나야 하는 단계)
+# 단계 키 = 코드 + 입력 + 선행 단계 키의 해시 -> 바뀐 것이 없으면 해당 단계는 다시 실행하지 않음
+STAGES = {
+    '01_data_loader.py': (['data'], []),
+    '02_data_analysis.py': ([], ['01_data_loader.py']),
+    '03_heatmap_analysis.py': (['data'], []),
+    '04_preference_analysis.py': (['data', 'survey'], []),
+    '05_advanced_survey.py': (['data', 'survey'], []),
+    'test.py': (['data', 'survey'], []),  # mapped_survey_data_check.csv 생성
+    '06_tlx_analysis.py': (['survey'], ['test.py']),
+    'order_effects.py': (['data'], ['01_data_loader.py']),
+    'free_text.py': (['data', 'survey'], ['01_data_loader.py', 'test.py']),  # 결과 비교에 두 단계 결과 사용
+}
+# 통합 비교 테이블이 읽는 결과 파일을 만드는 단계와 그 결과 파일
+POOLED_SOURCES = ['01_data_loader.py', 'test.py']
+POOLED_INPUTS = ['processed_data.csv', 'mapped_survey_data_check.csv']
+
+# ==========================================
+# 2. 매니페스트
+# ==========================================
+# {"pooled_dir": "...", "cohorts": [{"name": ..., "data_dir": ..., "survey": ..., "result_dir": ...}, ...]}
+# 상대 경로는 매니페스트 파일 위치 기준
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return os.path.normpath(os.path.join(base, p))
+
+    cohorts = []
+    for c in manifest['cohorts']:
+        cohorts.append({'name': c['name'], 'data_dir': resolve(c['data_dir']),
+                        'survey': resolve(c.get('survey', SURVEY_PATH)),
+                        'result_dir': resolve(c.get('result_dir', os.path.join(RESULT_DIR, c['name'])))})
+    pooled_dir = resolve(manifest.get('pooled_dir', POOLED_DIR))
+    check_cohorts(cohorts)
+    return cohorts, pooled_dir
+
+
+def default_cohorts():
+    # 매니페스트 없이 실행하면 기존 단일 연구 경로 하나
+    return [{'name': 'main', 'data_dir': os.path.abspath(DATA_DIR), 'survey': os.path.abspath(SURVEY_PATH),
+             'result_dir': os.path.abspath(RESULT_DIR)}]
+
+
+def check_cohorts(cohorts):
+    names = [c['name'] for c in cohorts]
+    dirs = [c['result_dir'] for c in cohorts]
+    if len(set(names)) != len(names):
+        raise ValueError(f"코호트 이름이 중복됩니다: {sorted(n for n in set(names) if names.count(n) > 1)}")
+    # 같은 결과 폴더를 동시에 쓰면 processed_data.csv 등이 서로 덮어써짐
+    if len(set(dirs)) != len(dirs):
+        raise ValueError(f"결과 폴더가 중복됩니다: {sorted(d for d in set(dirs) if dirs.count(d) > 1)}")
+
+# ==========================================
+# 3. 입력 해시 (내용 기준, 블록 단위로 읽어 메모리 일정)
+# ==========================================
+def file_digest(path, h=None):
+    h = h or hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h
+
+
+def data_digest(data_dir):
+    # 세션 JSON 전체 + (있으면) 옆의 .himpack 아카이브
+    from session_store import ARCHIVE_EXT
+    h = hashlib.sha1()
+    paths = sorted(glob.glob(os.path.join(data_dir, '*.json')))
+    archive_path = data_dir.rstrip('/\\') + ARCHIVE_EXT
+    if os.path.isfile(archive_path):
+        paths.append(archive_path)
+    for path in paths:
+        h.update(os.path.basename(path).encode('utf-8'))
+        file_digest(path, h)
+    return h.hexdigest()
+
+
+def survey_digest(survey_path):
+    from participant_registry import resolve_path
+    path = resolve_path(survey_path)
+    return file_digest(path).hexdigest() if os.path.isfile(path) else 'missing'
+
+
+def code_digest(root=ROOT):
+    # 분석 코드가 바뀌면 모든 단계를 다시 실행 (어느 모듈을 쓰는지 추적하지 않고 보수적으로, 실행기 자신은 제외)
+    h = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(root, '*.py'))):
+        if os.path.basename(path) == os.path.basename(__file__):
+            continue
+        h.update(os.path.basename(path).encode('utf-8'))
+        file_digest(path, h)
+    return h.hexdigest()
+
+
+def stage_keys(cohort, code):
+    inputs = {'data': data_digest(cohort['data_dir']), 'survey': survey_digest(cohort['survey'])}
+    keys = {}
+    for stage, (needs, after) in STAGES.items():  # 선행 단계가 항상 먼저 나오도록 정의됨
+        payload = [stage, code, [inputs[n] for n in needs], [keys[s] for s in after]]
+        keys[stage] = hashlib.sha1(json.dumps(payload).encode('utf-8')).hexdigest()
+    return keys
+
+
+def load_state(result_dir):
+    path = os.path.join(result_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(result_dir, state):
+    path = os.path.join(result_dir, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+# ==========================================
+# 4. 단계 실행 (코호트 경로를 환경 변수로 넘겨 별도 프로세스로)
+# ==========================================
+def run_stage(cohort, stage):
+    env = dict(os.environ, HIM_DATA_DIR=cohort['data_dir'], HIM_SURVEY_PATH=cohort['survey'],
+               HIM_RESULT_DIR=cohort['result_dir'], MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    log_path = os.path.join(cohort['result_dir'], LOG_DIR, stage.replace('.py', '.log'))
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.run([sys.executable, os.path.join(ROOT, stage)], cwd=ROOT, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - start
+
+
+def select_stages(names=None):
+    # '01' 처럼 번호만 줘도 해당 스크립트로
+    if names is None:
+        return list(STAGES)
+    selected = []
+    for name in names:
+        matches = [s for s in STAGES if s == name or s.startswith(name)]
+        if len(matches) != 1:
+            raise ValueError(f"알 수 없는 단계입니다: '{name}' (가능한 단계: {', '.join(STAGES)})")
+        selected.append(matches[0])
+    return [s for s in STAGES if s in selected]
+
+
+def run_cohorts(cohorts, max_workers=None, force=False, stages=None):
+    # 모든 코호트의 단계를 하나의 작업 풀에서 실행 (선행 단계가 끝난 작업부터 바로 투입)
+    stages = select_stages(stages)
+    code = code_digest()
+    keys, states = {}, {}
+    for c in cohorts:
+        os.makedirs(os.path.join(c['result_dir'], LOG_DIR), exist_ok=True)
+        keys[c['name']] = stage_keys(c, code)
+        states[c['name']] = load_state(c['result_dir'])
+    by_name = {c['name']: c for c in cohorts}
+
+    pending = [(c['name'], s) for c in cohorts for s in stages]
+    status = {}
+    rows = []
+
+    def record(task, result, seconds=0.0, returncode=None):
+        status[task] = result
+        rows.append({'Cohort': task[0], 'Stage': task[1], 'Status': result, 'Seconds': seconds,
+                     'Return_Code': returncode})
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        running = {}
+        while pending or running:
+            for task in list(pending):
+                name, stage = task
+                after = [(name, s) for s in STAGES[stage][1] if s in stages]
+                if any(status.get(t) in ('failed', 'blocked') for t in after):
+                    pending.remove(task)
+                    record(task, 'blocked')
+                    continue
+                if not all(t in status for t in after):
+                    continue
+                pending.remove(task)
+                prev = states[name].get(stage, {})
+                if not force and prev.get('key') == keys[name][stage] and prev.get('status') == 'ok':
+                    record(task, 'cached')
+                else:
+                    running[pool.submit(run_stage, by_name[name], stage)] = task
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = running.pop(future)
+                returncode, seconds = future.result()
+                ok = returncode == 0
+                record(task, 'ok' if ok else 'failed', seconds, returncode)
+                states[task[0]][task[1]] = {'key': keys[task[0]][task[1]], 'status': 'ok' if ok else 'failed',
+                                            'seconds': round(seconds, 2)}
+                save_state(by_name[task[0]]['result_dir'], states[task[0]])
+
+    order = {task: i for i, task in enumerate((c['name'], s) for c in cohorts for s in stages)}
+    rows.sort(key=lambda r: order[(r['Cohort'], r['Stage'])])
+    report = pd.DataFrame(rows, columns=['Cohort', 'Stage', 'Status', 'Seconds', 'Return_Code'])
+    return report.astype({'Return_Code': 'Int64'}), keys
+
+# ==========================================
+# 5. 코호트 통합 비교 테이블 (각 코호트의 결과 CSV만 읽음)
+# ==========================================
+def cohort_long(result_dir):
+    frames = []
+    process_path = os.path.join(result_dir, 'processed_data.csv')
+    mapped_path = os.path.join(result_dir, 'mapped_survey_data_check.csv')
+    if os.path.exists(process_path):
+        frames.append(trials_to_long(pd.read_csv(process_path), TRIAL_METRICS))
+    if os.path.exists(mapped_path):
+        frames.append(mapped_to_long(pd.read_csv(mapped_path), SURVEY_METRICS))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def source_status(report, cohort):
+    # 통합 테이블의 원본 단계 상태 (ok / cached 는 같은 'ok', 이번에 실행하지 않은 단계는 None)
+    status = dict(zip(zip(report['Cohort'], report['Stage']), report['Status']))
+    return [{'cached': 'ok'}.get(status.get((cohort, s)), status.get((cohort, s))) for s in POOLED_SOURCES]
+
+
+def pooled_key(cohorts, keys, report):
+    # 각 코호트의 결과 파일을 만든 단계 키 + 그 단계의 성공 여부 + 결과 파일 내용이 모두 그대로면 통합 테이블도 그대로
+    # (실패했던 단계가 재시도로 성공하면 단계 키는 같아도 결과 파일이 생기거나 바뀌므로 다시 계산)
+    payload = []
+    for c in cohorts:
+        paths = [os.path.join(c['result_dir'], name) for name in POOLED_INPUTS]
+        files = [file_digest(p).hexdigest() if os.path.isfile(p) else 'missing' for p in paths]
+        payload.append([c['name'], [keys[c['name']][s] for s in POOLED_SOURCES], source_status(report, c['name']),
+                        files])
+    return hashlib.sha1(json.dumps(payload).encode('utf-8')).hexdigest()
+
+
+def pooled_tables(cohorts):
+    # -> (요약, 검정, 결과 파일이 없어 제외한 코호트 이름)
+    frames, excluded = [], []
+    for c in cohorts:
+        long_df = cohort_long(c['result_dir'])
+        if long_df.empty:
+            print(f"⚠️ 경고: '{c['name']}' 코호트의 결과 파일이 없어 통합 비교에서 제외합니다.")
+            excluded.append(c['name'])
+            continue
+        frames.append(long_df.assign(Cohort=c['name']))
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame(), excluded
+    long_df = pd.concat(frames, ignore_index=True)
+    # 코호트가 달라도 이름이 같은 참가자가 섞이지 않도록 코호트를 붙인 키 사용
+    long_df['Participant'] = long_df['Cohort'] + '/' + long_df['Participant'].astype(str)
+    pooled = pd.concat([long_df, long_df.assign(Cohort='ALL')], ignore_index=True)
+
+    # 참가자 x 조건 평균 -> 코호트 x 지표 x 조건 요약
+    per_p = pooled.groupby(['Cohort', 'Metric', 'Condition', 'Participant'], sort=False)['Value'].mean()
+    summary = per_p.groupby(['Cohort', 'Metric', 'Condition'], sort=False).agg(
+        N='count', Mean='mean', SD='std', Median='median').reset_index()
+    summary['Condition'] = pd.Categorical(summary['Condition'], categories=CONDITIONS, ordered=True)
+    summary = summary.sort_values(['Cohort', 'Metric', 'Condition']).reset_index(drop=True)
+
+    tests = []
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        for cohort, sub in pooled.groupby('Cohort', sort=False):
+            t = run_batch_tests(sub.drop(columns='Cohort'))
+            tests.append(t[t['Test'] != 'shapiro'].assign(Cohort=cohort))
+    tests = pd.concat(tests, ignore_index=True)
+    tests = tests[['Cohort'] + [c for c in tests.columns if c != 'Cohort']]
+    return summary, tests, excluded
+
+# ==========================================
+# 6. 실행
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='여러 코호트(데이터 폴더 / 설문 CSV / 결과 폴더) 동시 분석')
+    parser.add_argument('manifest', nargs='?', default=None, help='코호트 매니페스트 JSON (없으면 기본 경로 하나)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='입력이 그대로여도 모든 단계를 다시 실행')
+    parser.add_argument('--stages', nargs='+', default=None, help="실행할 단계 (예: 01 02, 기본: 01~06 전체)")
+    args = parser.parse_args()
+
+    if args.manifest:
+        cohorts, pooled_dir = load_manifest(args.manifest)
+    else:
+        cohorts, pooled_dir = default_cohorts(), os.path.abspath(POOLED_DIR)
+
+    print(f"🔄 {len(cohorts)}개 코호트 x {len(args.stages or STAGES)}개 단계 실행 중...")
+    start = time.perf_counter()
+    report, keys = run_cohorts(cohorts, args.workers, args.force, args.stages)
+    print(f"⚡ 완료 ({time.perf_counter() - start:.1f} s)")
+    print(report.to_string(index=False))
+
+    failed = report[report['Status'].isin(['failed', 'blocked'])]
+    for _, r in failed.iterrows():
+        print(f"⚠️ 경고: {r['Cohort']} / {r['Stage']} {r['Status']} - 로그 확인 필요")
+
+    key = pooled_key(cohorts, keys, report)
+    summary_path = os.path.join(pooled_dir, 'cohort_summary.csv')
+    tests_path = os.path.join(pooled_dir, 'cohort_tests.csv')
+    if not args.force and load_state(pooled_dir).get('key') == key and os.path.exists(tests_path):
+        print(f"\n✅ 코호트 결과가 바뀌지 않아 통합 테이블을 다시 계산하지 않습니다: {pooled_dir}")
+        summary = pd.read_csv(summary_path)
+    else:
+        summary, tests, excluded = pooled_tables(cohorts)
+        if not summary.empty:
+            os.makedirs(pooled_dir, exist_ok=True)
+            summary.to_csv(summary_path, index=False, encoding='utf-8-sig')
+            tests.to_csv(tests_path, index=False, encoding='utf-8-sig')
+            print(f"\n💾 cohort_summary.csv, cohort_tests.csv 저장 완료: {pooled_dir}")
+        incomplete = excluded + sorted({c['name'] for c in cohorts
+                                        if any(s in ('failed', 'blocked') for s in source_status(report, c['name']))})
+        if incomplete:
+            # 일부 코호트가 빠진 테이블은 재사용하지 않도록 상태를 남기지 않음 (다음 실행에서 다시 계산)
+            state_path = os.path.join(pooled_dir, STATE_FILE)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            print(f"⚠️ 경고: 코호트 {sorted(set(incomplete))} 의 결과가 불완전해 통합 테이블 상태를 저장하지 않습니다.")
+        elif not summary.empty:
+            save_state(pooled_dir, {'key': key, 'cohorts': [c['name'] for c in cohorts]})
+
+    if not summary.empty:
+        pd.set_option('display.width', 200)
+        print("\n[코호트별 조건 평균 (참가자 평균 기준)]")
+        summary['Condition'] = pd.Categorical(summary['Condition'], categories=CONDITIONS, ordered=True)
+        print(summary.pivot_table(index=['Metric', 'Condition'], columns='Cohort', values='Mean',
+                                  observed=True).round(3).to_string())
@@ -0,0 +1,134 @@
+import pandas as pd
+import numpy as np
+from functools import lru_cache
+
+# ==========================================
+# 1. 기기별 물리 해상도 (CSS px -> mm 변환용)
+# ==========================================
+# 키: (screenWidth, screenHeight, devicePixelRatio) [CSS px], 값: 물리 ppi
+# 로그의 좌표는 모두 CSS px 이므로 1 CSS px = devicePixelRatio 물리 픽셀
+DEVICE_PPI = {
+    (393, 852, 3): 460,   # iPhone 14 Pro / 15 / 15 Pro / 16
+    (402, 874, 3): 460,   # iPhone 16 Pro
+    (390, 844, 3): 460,   # iPhone 12 / 13 / 14
+    (430, 932, 3): 460,   # iPhone 14 Pro Max / 15 Plus / 15 Pro Max / 16 Plus
+    (440, 956, 3): 460,   # iPhone 16 Pro Max
+    (428, 926, 3): 458,   # iPhone 12 Pro Max / 13 Pro Max / 14 Plus
+    (375, 812, 3): 458,   # iPhone X / XS / 11 Pro / 12 mini / 13 mini
+    (414, 896, 2): 326,   # iPhone XR / 11
+    (375, 667, 2): 326,   # iPhone 8 / SE (2, 3세대)
+}
+# 목록에 없는 기기: 플랫폼별 CSS px 밀도로 가정
+# (iOS 는 1pt = 1/163 inch, Android 는 1dp = 1/160 inch)
+CSS_PPI_BY_PLATFORM = {'ios': 163, 'android': 160}
+# userAgent 로 플랫폼을 알 수 없으면 iOS 로 가정 (실험 기기가 모두 iPhone)
+DEFAULT_PLATFORM = 'ios'
+
+# 변환 대상 위치 컬럼 (X, Y 쌍)
+POSITION_COLS = [('Button_X', 'Button_Y'), ('Touch_X', 'Touch_Y'), ('Circle_X', 'Circle_Y')]
+
+# ==========================================
+# 2. 기기 시그니처 및 변환 계수 (시그니처별 캐시)
+# ==========================================
+def device_platform(user_agent):
+    ua = (user_agent or '').lower()
+    if 'android' in ua:
+        return 'android'
+    if any(k in ua for k in ('iphone', 'ipad', 'ipod')):
+        return 'ios'
+    return None
+
+
+def device_signature(device_info):
+    # (screenW, screenH, viewportW, viewportH, dpr, 플랫폼) - 해시 가능한 튜플이므로 그대로 캐시 키로 사용
+    device_info = device_info or {}
+    return (
+        device_info.get('screenWidth'),
+        device_info.get('screenHeight'),
+        device_info.get('viewportWidth'),
+        device_info.get('viewportHeight'),
+        device_info.get('devicePixelRatio'),
+        device_platform(device_info.get('userAgent')),
+    )
+
+
+def _fmt(v):
+    return 'None' if v is None else f'{v:g}'
+
+
+def signature_key(signature):
+    # CSV 등에 저장할 수 있는 문자열 형태 (예: '393x852/393x695@3') - 표시용, 계산에는 튜플을 사용
+    sw, sh, vw, vh, dpr = signature[:5]
+    key = f"{_fmt(sw)}x{_fmt(sh)}/{_fmt(vw)}x{_fmt(vh)}"
+    return f"{key}@{dpr:g}" if dpr is not None else key
+
+
+def parse_signature_key(key):
+    # signature_key 의 역변환 (processed_data.csv 의 Device 컬럼용, 플랫폼은 복원되지 않음)
+    def num(v):
+        if v in ('', 'None', 'nan'):
+            return None
+        v = float(v)
+        return int(v) if v.is_integer() else v
+
+    screen, rest = key.split('/')
+    viewport, _, dpr = rest.partition('@')
+    sw, sh = (num(v) for v in screen.split('x'))
+    vw, vh = (num(v) for v in viewport.split('x'))
+    return sw, sh, vw, vh, float(dpr) if dpr else None, None
+
+
+@lru_cache(maxsize=None)
+def device_transform(signature):
+    sw, sh, vw, vh, dpr = signature[:5]
+    platform = signature[5] if len(signature) > 5 else None
+    vw, vh = vw or sw, vh or sh
+    if vw is None or vh is None:
+        # 화면 크기가 없으면 (deviceInfo 누락 등) 물리 단위로 변환할 수 없음 -> NaN
+        print(f"⚠️ 경고: 기기 정보가 없어 mm 변환을 할 수 없습니다 - {signature_key(signature)}")
+        return {'mm_per_px': np.nan, 'viewport_w': np.nan, 'viewport_h': np.nan, 'known_device': False}
+
+    ppi = DEVICE_PPI.get((sw, sh, dpr))
+    if ppi is None:
+        mm_per_px = 25.4 / CSS_PPI_BY_PLATFORM[platform or DEFAULT_PLATFORM]
+    else:
+        mm_per_px = 25.4 * dpr / ppi
+    return {
+        'mm_per_px': mm_per_px,
+        'viewport_w': float(vw),
+        'viewport_h': float(vh),
+        'known_device': ppi is not None,
+    }
+
+
+def px_to_mm(value, signature):
+    return value * device_transform(signature)['mm_per_px']
+
+# ==========================================
+# 3. 위치 컬럼 일괄 정규화 (기기별 계수를 행에 브로드캐스트)
+# ==========================================
+def normalize_positions(df, position_cols=POSITION_COLS, signature_col='Device', signatures=None):
+    # 시그니처별로 한 번만 계수를 구하고, 코드 인덱싱으로 전체 행에 적용
+    # signatures: signature_key -> device_signature 튜플 (없으면 키 문자열에서 복원, 플랫폼 정보는 없음)
+    signatures = signatures or {}
+    codes, keys = pd.factorize(df[signature_col])
+    transforms = [device_transform(signatures.get(k) or parse_signature_key(k)) for k in keys]
+    mm_per_px = np.array([t['mm_per_px'] for t in transforms])[codes]
+    vw = np.array([t['viewport_w'] for t in transforms])[codes]
+    vh = np.array([t['viewport_h'] for t in transforms])[codes]
+
+    out = df.copy()
+    for col_x, col_y in position_cols:
+        if col_x not in df.columns:
+            continue
+        x = df[col_x].to_numpy(dtype=float)
+        y = df[col_y].to_numpy(dtype=float)
+        # mm (뷰포트 좌상단 기준)과 하단 기준 거리 (엄지는 화면 아래쪽에서 뻗으므로)
+        out[f'{col_x}_mm'] = x * mm_per_px
+        out[f'{col_y}_mm'] = y * mm_per_px
+        out[f'{col_y}_FromBottom_mm'] = (vh - y) * mm_per_px
+        # 뷰포트 비율 좌표 [0, 1]
+        out[f'{col_x}_norm'] = x / vw
+        out[f'{col_y}_norm'] = y / vh
+    out['mm_per_px'] = mm_per_px
+    return out
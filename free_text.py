@@ -0,0 +1,318 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+import json
+import inspect
+import hashlib
+import unicodedata
+from scipy import sparse, stats
+from batch_stats import adjust_pvalues
+from participant_registry import build_registry, load_survey, report_unmatched, ordinal_to_condition, \
+    ORDINAL_LABELS, ORDER_COLS
+
+# ==========================================
+# 1. 설정
+# ==========================================
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+SURVEY_PATH = os.environ.get('HIM_SURVEY_PATH', './사후 설문 정리.csv')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+CACHE_DIR = './.cache/free_text'   # 토큰화 결과(역색인)는 설문 응답 해시 단위로 캐싱
+
+# 자유 응답 문항 (CSV 컬럼명 접두어)
+# Q8: 상단 고정을 제외한 두 방식의 차이 / Q9: 상단 고정 방식에서 불편했던 신체 부위·상황
+QUESTIONS = {'Q8': '8.', 'Q9': '9.'}
+QUESTION_CONDITION = {'Q9': 'fixed'}  # 문항 자체가 특정 조건에 대한 질문인 경우
+# 문항이 다루지 않는 조건: 응답의 "조건 N" / "N 번째" 는 실험 순서(세션 순서)로 해석하므로,
+# Q8 에서 이것이 fixed 로 풀리면 응답자가 순서를 다르게 센 것 -> 조건을 알 수 없음(NaN)으로 두고 결과 비교에서 제외
+QUESTION_EXCLUDED = {'Q8': 'fixed'}
+
+# 어절 끝의 조사 (긴 것부터 확인, 떼고 남은 어간이 2글자 이상일 때만 제거)
+JOSA = sorted(['은', '는', '이', '가', '을', '를', '에', '의', '로', '도', '만', '와', '과', '랑',
+               '으로', '에서', '까지', '부터', '처럼', '보다', '에게', '에서는', '으로는'], key=len, reverse=True)
+
+# 개념 사전: 이름 -> (분류, 패턴). '*'로 끝나면 접두어 검색, 아니면 정확히 일치
+# (패턴은 strip_josa 를 거친 토큰과 비교하므로 조사를 뗀 형태로 적음. '손이' 처럼 어간이 1글자면 조사가 남음)
+CONCEPTS = {
+    '엄지': ('body', ['엄지*']),
+    '손목': ('body', ['손목*']),
+    '새끼손가락': ('body', ['새끼손가락*']),
+    '손': ('body', ['손', '손이', '손을', '손은', '손에', '손의']),
+    '고쳐잡기': ('situation', ['고쳐*', '다시', '잡는*', '잡아야*', '위치']),
+    '거리': ('situation', ['멀*', '먼*', '거리*', '상단*', '위로']),
+    '떨어뜨림': ('situation', ['떨어*']),
+    '통증': ('situation', ['아프*', '아파*', '아픔*', '당기*']),
+    '불편': ('evaluation', ['불편*', '번거*', '어려*', '힘들*', '당황*']),
+    '편함': ('evaluation', ['편하*', '편했*', '편한*', '적절*', '안정적*', '맞는*']),
+    '차이없음': ('evaluation', ['차이*', '모르겠*']),
+}
+
+# 응답 안의 조건 언급: "조건 2", "조건3", "두 번째", "세번째"
+_ORDINAL_WORDS = {'첫': 0, '두': 1, '세': 2}
+_ORDINAL_PATTERN = re.compile(r'조건\s*([1-3])|([첫두세])\s*번\s*째')
+
+_TOKEN_PATTERN = re.compile(r'[가-힣]+|[a-z]+|\d+')
+
+# ==========================================
+# 2. 토큰화
+# ==========================================
+def strip_josa(word):
+    for josa in JOSA:
+        if word.endswith(josa) and len(word) - len(josa) >= 2:
+            return word[:-len(josa)]
+    return word
+
+
+def tokenize(text):
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return []
+    text = unicodedata.normalize('NFC', str(text)).casefold()
+    return [strip_josa(w) for w in _TOKEN_PATTERN.findall(text)]
+
+
+def referenced_ordinal(texts):
+    # 응답에서 처음 언급된 조건을 설문 순서 표현('첫 번째' 등)으로 -> ordinal_to_condition 에 그대로 사용
+    labels = []
+    for text in texts.astype('string').fillna(''):
+        m = _ORDINAL_PATTERN.search(unicodedata.normalize('NFC', text))
+        if m is None:
+            labels.append('')
+        else:
+            i = int(m.group(1)) - 1 if m.group(1) else _ORDINAL_WORDS[m.group(2)]
+            labels.append(ORDINAL_LABELS[i])
+    return pd.Series(labels, index=texts.index, dtype='string')
+
+# ==========================================
+# 3. 설문 -> 응답 문서 (참가자 × 문항, 조건 매핑 포함)
+# ==========================================
+def load_documents(registry, survey_path=SURVEY_PATH):
+    df, unmatched = load_survey(registry, survey_path)
+    frames = []
+    for qid, prefix in QUESTIONS.items():
+        cols = [c for c in df.columns if str(c).startswith(prefix)]
+        if not cols:
+            print(f"⚠️ 경고: '{prefix}'로 시작하는 문항 컬럼이 없습니다. ({qid} 제외)")
+            continue
+        doc = df[['Participant_ID', 'Participant'] + ORDER_COLS].copy()
+        doc['Question'] = qid
+        doc['Text'] = df[cols[0]].astype('string').str.strip()
+        frames.append(doc)
+    docs = pd.concat(frames, ignore_index=True)
+    docs = docs[docs['Text'].fillna('') != ''].reset_index(drop=True)
+
+    # test.py 와 같은 기준: 순서 표현 -> 해당 참가자의 실험 순서 -> 조건명
+    docs['Reference'] = referenced_ordinal(docs['Text'])
+    docs['Condition'] = ordinal_to_condition(docs['Reference'], docs[ORDER_COLS].to_numpy())
+    for qid, cond in QUESTION_CONDITION.items():
+        docs.loc[docs['Question'] == qid, 'Condition'] = cond
+    docs['Referenced_Condition'] = docs['Condition']
+    for qid, cond in QUESTION_EXCLUDED.items():
+        docs.loc[(docs['Question'] == qid) & (docs['Condition'] == cond), 'Condition'] = np.nan
+    return docs.drop(columns=ORDER_COLS), unmatched
+
+# ==========================================
+# 4. 역색인 (문서 × 어휘 CSR 행렬, 어휘는 정렬 -> 접두어 검색은 이진 탐색)
+# ==========================================
+def build_index(texts):
+    tokens = [tokenize(t) for t in texts]
+    lengths = np.array([len(t) for t in tokens], dtype=np.int64)
+    flat = np.array([w for t in tokens for w in t], dtype=object)
+
+    vocab, cols = np.unique(flat.astype(str), return_inverse=True) if len(flat) else (np.array([], dtype=str),
+                                                                                        np.array([], dtype=int))
+    rows = np.repeat(np.arange(len(tokens)), lengths)
+    matrix = sparse.csr_matrix((np.ones(len(cols), dtype=np.int32), (rows, cols.ravel())),
+                               shape=(len(tokens), len(vocab)))
+    matrix.sum_duplicates()
+    return {'vocab': vocab, 'matrix': matrix}
+
+
+def _index_key(texts):
+    h = hashlib.sha1()
+    # 토큰화 규칙(조사 목록, 정규식, 함수 코드)이 바뀌면 다른 키 -> 예전 색인을 쓰지 않음
+    h.update(json.dumps(JOSA, ensure_ascii=False).encode('utf-8'))
+    h.update(_TOKEN_PATTERN.pattern.encode('utf-8'))
+    for func in (tokenize, strip_josa):
+        h.update(inspect.getsource(func).encode('utf-8'))
+    for t in texts:
+        h.update(str(t).encode('utf-8') + b'\0')
+    return h.hexdigest()[:16]
+
+
+def cached_index(texts):
+    # 같은 응답 집합이면 토큰화를 다시 하지 않고 디스크의 색인을 사용
+    path = os.path.join(CACHE_DIR, f'index_{_index_key(texts)}.npz')
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as f:
+            matrix = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+            return {'vocab': f['vocab'], 'matrix': matrix}
+
+    index = build_index(texts)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    m = index['matrix']
+    tmp_path = f"{path[:-4]}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, vocab=index['vocab'], data=m.data, indices=m.indices, indptr=m.indptr,
+             shape=np.array(m.shape))
+    os.replace(tmp_path, path)
+    return index
+
+
+def term_ids(index, pattern):
+    vocab = index['vocab']
+    if pattern.endswith('*'):
+        prefix = pattern[:-1]
+        lo = np.searchsorted(vocab, prefix, side='left')
+        hi = np.searchsorted(vocab, prefix + '\U0010ffff', side='left')
+        return np.arange(lo, hi)
+    i = np.searchsorted(vocab, pattern)
+    return np.array([i]) if i < len(vocab) and vocab[i] == pattern else np.array([], dtype=int)
+
+# ==========================================
+# 5. 조회 (개념 빈도 / 동시 출현 / 조건별 결과 비교)
+# ==========================================
+def concept_hits(index, concepts=CONCEPTS):
+    # (문서, 개념) 불리언 행렬: 개념 -> 어휘 선택 행렬을 곱해 한 번에
+    n_vocab = len(index['vocab'])
+    rows, cols = [], []
+    for ci, (_, patterns) in enumerate(concepts.values()):
+        ids = np.unique(np.concatenate([term_ids(index, p) for p in patterns]))
+        rows.append(ids)
+        cols.append(np.full(len(ids), ci))
+    selector = sparse.csr_matrix((np.ones(sum(len(r) for r in rows)), (np.concatenate(rows), np.concatenate(cols))),
+                                 shape=(n_vocab, len(concepts)))
+    hits = (index['matrix'] @ selector).toarray() > 0
+    return pd.DataFrame(hits, columns=list(concepts))
+
+
+def concept_frequency(docs, hits, concepts=CONCEPTS):
+    counts = hits.groupby(docs['Question'].to_numpy()).sum().T
+    counts.columns = [f'N_{q}' for q in counts.columns]
+    counts['N_Participants'] = hits.groupby(docs['Participant_ID'].to_numpy()).any().sum()
+    counts.insert(0, 'Category', [concepts[c][0] for c in counts.index])
+    return counts.rename_axis('Concept').reset_index()
+
+
+def cooccurrence(docs, hits):
+    # 참가자 단위(두 문항 합침)로 개념이 함께 언급된 인원수
+    by_p = hits.groupby(docs['Participant_ID'].to_numpy()).any().astype(int)
+    return by_p.T @ by_p
+
+
+def top_terms(index, docs, n=20):
+    m = index['matrix']
+    rows = []
+    for qid in pd.unique(docs['Question']):
+        sub = m[np.flatnonzero(docs['Question'].to_numpy() == qid)]
+        df_count = np.asarray((sub > 0).sum(axis=0)).ravel()
+        for i in np.argsort(-df_count, kind='stable')[:n]:
+            if df_count[i] > 0:
+                rows.append({'Question': qid, 'Term': index['vocab'][i], 'N_Responses': int(df_count[i])})
+    return pd.DataFrame(rows)
+
+
+def load_outcomes(result_dir=RESULT_DIR):
+    # (Participant_ID, Condition) 단위 결과: 설문 평정(test.py) + 시행 지표 평균(01_data_loader.py)
+    frames = []
+    mapped_path = os.path.join(result_dir, 'mapped_survey_data_check.csv')
+    if os.path.exists(mapped_path):
+        from batch_stats import mapped_to_long
+        df_mapped = pd.read_csv(mapped_path, dtype={'Participant_ID': str})
+        long_df = mapped_to_long(df_mapped.drop(columns='Participant').rename(columns={'Participant_ID': 'Participant'}))
+        frames.append(long_df.pivot_table(index=['Participant', 'Condition'], columns='Metric', values='Value'))
+    process_path = os.path.join(result_dir, 'processed_data.csv')
+    if os.path.exists(process_path):
+        df = pd.read_csv(process_path, dtype={'Participant_ID': str})
+        frames.append(df.groupby(['Participant_ID', 'Condition'])[['SearchTime', 'Offset']].mean()
+                      .rename_axis(['Participant', 'Condition']))
+    if not frames:
+        return None
+    outcomes = pd.concat(frames, axis=1)
+    outcomes.index = outcomes.index.set_names(['Participant_ID', 'Condition'])
+    return outcomes
+
+
+def outcome_contrast(docs, hits, outcomes):
+    # 응답이 가리키는 조건의 결과를, 개념을 언급한 응답 vs 언급하지 않은 응답으로 비교 (문항별)
+    keys = pd.MultiIndex.from_arrays([docs['Participant_ID'].astype(str), docs['Condition']])
+    y = outcomes.reindex(keys)
+    valid = docs['Condition'].notna().to_numpy()
+
+    rows = []
+    for qid in pd.unique(docs['Question']):
+        q = (docs['Question'].to_numpy() == qid) & valid
+        Y = y.to_numpy(dtype=float)[q]
+        H = hits.to_numpy()[q]
+        for ci, concept in enumerate(hits.columns):
+            hit = H[:, ci]
+            if not hit.any() or hit.all():
+                continue
+            for mi, metric in enumerate(y.columns):
+                a, b = Y[hit, mi], Y[~hit, mi]
+                a, b = a[~np.isnan(a)], b[~np.isnan(b)]
+                if len(a) == 0 or len(b) == 0:
+                    continue
+                p = stats.mannwhitneyu(a, b).pvalue
+                rows.append({'Question': qid, 'Concept': concept, 'Metric': metric, 'N_Mention': len(a),
+                             'N_Other': len(b), 'Mean_Mention': a.mean(), 'Mean_Other': b.mean(),
+                             'Difference': a.mean() - b.mean(), 'p': p})
+    contrast = pd.DataFrame(rows)
+    if len(contrast):
+        # 문항 x 지표마다 여러 개념을 비교하므로 그 묶음 안에서 Holm 보정
+        contrast['p_holm'] = contrast.groupby(['Question', 'Metric'])['p'].transform(
+            lambda p: adjust_pvalues(p.to_numpy()))
+    return contrast
+
+# ==========================================
+# 6. 실행
+# ==========================================
+if __name__ == "__main__":
+    print("🔄 자유 응답(Q8/Q9) 색인 생성 중...")
+    registry = build_registry(DATA_DIR)
+    try:
+        docs, unmatched = load_documents(registry, SURVEY_PATH)
+    except FileNotFoundError as e:
+        print(f"❌ 설문 CSV 파일을 찾을 수 없습니다: {e}")
+        exit()
+    report_unmatched(unmatched, '설문')
+
+    index = cached_index(docs['Text'].tolist())
+    hits = concept_hits(index)
+    print(f"✅ 응답 {len(docs)}개, 어휘 {len(index['vocab'])}개 색인 완료")
+
+    pd.set_option('display.width', 200)
+    print("\n[응답이 가리키는 조건]")
+    print(docs.groupby('Question')['Condition'].value_counts(dropna=False).to_string())
+    # Q8 은 상단 고정을 제외한 두 방식에 대한 질문이므로 fixed 로 매핑되면 응답자의 순서 표현을 확인
+    for qid, cond in QUESTION_EXCLUDED.items():
+        odd = docs[(docs['Question'] == qid) & (docs['Referenced_Condition'] == cond)]
+        if len(odd):
+            print(f"⚠️ 경고: {qid} 응답 {len(odd)}개가 {cond} 조건을 가리킵니다 (순서 표현 확인 필요) "
+                  f"- 조건을 비워 결과 비교에서 제외: {list(odd['Participant'])}")
+
+    freq = concept_frequency(docs, hits)
+    print("\n[개념(신체 부위·상황·평가) 언급 빈도]")
+    print(freq.to_string(index=False))
+
+    co = cooccurrence(docs, hits)
+    print("\n[개념 동시 언급 (참가자 수)]")
+    print(co.to_string())
+
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    out = docs.copy()
+    out['Tokens'] = [' '.join(tokenize(t)) for t in docs['Text']]
+    out = pd.concat([out, hits.add_prefix('Has_')], axis=1)
+    out.to_csv(os.path.join(RESULT_DIR, 'free_text_responses.csv'), index=False, encoding='utf-8-sig')
+    freq.to_csv(os.path.join(RESULT_DIR, 'free_text_concepts.csv'), index=False, encoding='utf-8-sig')
+    co.to_csv(os.path.join(RESULT_DIR, 'free_text_cooccurrence.csv'), encoding='utf-8-sig')
+    top_terms(index, docs).to_csv(os.path.join(RESULT_DIR, 'free_text_terms.csv'), index=False, encoding='utf-8-sig')
+
+    outcomes = load_outcomes(RESULT_DIR)
+    if outcomes is None:
+        print("⚠️ 결과 파일이 없어 조건별 결과 비교를 생략합니다. (01_data_loader.py / test.py 먼저 실행)")
+    else:
+        contrast = outcome_contrast(docs, hits, outcomes)
+        print("\n[개념 언급 여부에 따른 해당 조건의 결과 비교 (Mann-Whitney U, 문항 x 지표별 Holm 보정)]")
+        print(contrast.sort_values(['p_holm', 'p']).head(15).to_string(index=False))
+        contrast.to_csv(os.path.join(RESULT_DIR, 'free_text_outcomes.csv'), index=False, encoding='utf-8-sig')
+
+    print(f"\n💾 자유 응답 분석 결과가 '{RESULT_DIR}'에 저장되었습니다.")
@@ -0,0 +1,129 @@
+import json
+import re
+
+# ==========================================
+# 1. 버퍼 단위 증분 JSON 리더
+# ==========================================
+# 파일 전체를 메모리에 올리지 않고, 읽은 만큼만 버퍼에 두고 값 단위로 디코딩
+# (이미 소비한 앞부분은 다음 청크를 읽을 때 버림)
+CHUNK_CHARS = 1 << 16
+_WS = re.compile(r'[ \t\n\r]*')
+_DELIMITERS = ' \t\n\r,]}'
+
+
+class JsonStream:
+    def __init__(self, f, chunk_chars=CHUNK_CHARS):
+        self.f = f
+        self.chunk_chars = chunk_chars
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size=None):
+        chunk = self.f.read(size or self.chunk_chars)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("JSON 문서가 중간에 끝났습니다.")
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"'{ch}' 가 와야 할 위치에 '{self.buf[self.pos]}' 가 있습니다.")
+        self.pos += 1
+
+    def value(self):
+        # 값 하나를 디코딩 (버퍼가 모자라면 읽는 크기를 두 배씩 늘려가며 재시도)
+        self.peek()
+        size = self.chunk_chars
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+                # 숫자는 버퍼 경계에서 잘렸을 수 있음 ('1.' / '2e' 까지만 읽히면 1, 2 로 디코딩됨)
+                # -> 바로 뒤에 구분자가 있거나 파일 끝일 때만 확정, 아니면 더 읽고 다시 디코딩
+                is_number = isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                complete = end < len(self.buf) and (not is_number or self.buf[end] in _DELIMITERS)
+                if complete or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill(size):
+                continue
+            size *= 2
+
+# ==========================================
+# 2. 경로 기반 이벤트 스트림
+# ==========================================
+# stream_paths 에 해당하는 배열은 원소 하나씩 ('item', 경로, 값) 으로 내보내고,
+# 그 상위 컨테이너는 ('start' / 'end') 로 열고 닫으며, 나머지 값은 ('value', 경로, 값) 으로 통째로 내보냄
+# ('start' 의 값은 새 빈 컨테이너, 원소 단위로 내보내는 배열이면 None)
+# 경로의 '*' 는 아무 키/인덱스와 일치
+def _match(path, pattern):
+    return len(path) == len(pattern) and all(p == '*' or p == k for k, p in zip(path, pattern))
+
+
+def _is_prefix(path, pattern):
+    return len(path) < len(pattern) and all(p == '*' or p == k for k, p in zip(path, pattern))
+
+
+def _walk(s, path, patterns):
+    streamed = any(_match(path, p) for p in patterns)
+    if not streamed and not any(_is_prefix(path, p) for p in patterns):
+        yield 'value', path, s.value()
+        return
+
+    c = s.peek()
+    if c == '{' and not streamed:
+        s.pos += 1
+        yield 'start', path, {}
+        if s.peek() == '}':
+            s.pos += 1
+        else:
+            while True:
+                key = s.value()
+                s.expect(':')
+                yield from _walk(s, path + (key,), patterns)
+                if s.peek() == ',':
+                    s.pos += 1
+                    continue
+                s.expect('}')
+                break
+        yield 'end', path, None
+    elif c == '[':
+        s.pos += 1
+        yield 'start', path, None if streamed else []
+        if s.peek() == ']':
+            s.pos += 1
+        else:
+            i = 0
+            while True:
+                if streamed:
+                    yield 'item', path, s.value()
+                else:
+                    yield from _walk(s, path + (i,), patterns)
+                i += 1
+                if s.peek() == ',':
+                    s.pos += 1
+                    continue
+                s.expect(']')
+                break
+        yield 'end', path, None
+    else:
+        yield 'value', path, s.value()
+
+
+def iter_events(f, stream_paths, chunk_chars=CHUNK_CHARS):
+    s = JsonStream(f, chunk_chars)
+    yield from _walk(s, (), [tuple(p) for p in stream_paths])
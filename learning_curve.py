@@ -0,0 +1,191 @@
+import pandas as pd
+import numpy as np
+import os
+
+# ==========================================
+# 1. 설정
+# ==========================================
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+PROCESS_PATH = os.path.join(RESULT_DIR, 'processed_data.csv')
+
+# 점근값(asymptote)까지 남은 차이가 처음의 5% 이하가 되는 시행을 "안정화"로 정의
+STABLE_FRACTION = 0.05
+MAX_ITER = 200
+# 시행 수가 적으면 학습률이 계단 함수(c -> 무한대)로 발산하므로 범위를 제한
+LOG_RATE_BOUNDS = (np.log(1e-3), np.log(20.0))
+
+# ==========================================
+# 2. 모델 정의 (파라미터: a=점근값, b=초기 이득, log_c=학습률의 로그)
+# ==========================================
+# 학습률 c는 항상 양수가 되도록 log 공간에서 추정
+def _power(p, n):
+    a, b, c = p[:, :1], p[:, 1:2], np.exp(p[:, 2:3])
+    decay = n ** (-c)
+    y = a + b * decay
+    # 각 파라미터에 대한 편미분 (G, T, 3)
+    J = np.stack([np.ones_like(y), decay, -b * decay * np.log(n) * c], axis=-1)
+    return y, J
+
+
+def _exponential(p, n):
+    a, b, c = p[:, :1], p[:, 1:2], np.exp(p[:, 2:3])
+    decay = np.exp(-c * (n - 1))
+    y = a + b * decay
+    J = np.stack([np.ones_like(y), decay, -b * decay * (n - 1) * c], axis=-1)
+    return y, J
+
+
+MODELS = {'power': _power, 'exponential': _exponential}
+
+
+def stable_trial(model, c):
+    # 남은 이득 b * f(n) 이 b * STABLE_FRACTION 이 되는 시행 번호 (연속값)
+    with np.errstate(divide='ignore', over='ignore'):
+        if model == 'power':
+            return (1 / STABLE_FRACTION) ** (1 / c)
+        return 1 + np.log(1 / STABLE_FRACTION) / c
+
+# ==========================================
+# 3. 배치 비선형 최소제곱 (모든 그룹을 한 번에 Gauss-Newton / LM)
+# ==========================================
+def fit_batched(model, n, y, mask, max_iter=MAX_ITER, tol=1e-8):
+    # n, y, mask: (G, T) - 그룹마다 시행 수가 달라도 mask로 패딩 처리
+    func = MODELS[model]
+    G = y.shape[0]
+    w = mask.astype(float)
+    y0 = np.where(mask, y, 0.0)
+    n_safe = np.where(mask, n, 1.0)
+
+    # 초기값: 점근값은 최솟값 근처, 초기 이득은 첫 시행과의 차이, 학습률 0.5
+    y_min = np.where(mask, y, np.inf).min(axis=1)
+    first = y0[np.arange(G), mask.argmax(axis=1)]
+    p = np.column_stack([y_min - 0.1 * np.abs(y_min), first - y_min, np.full(G, np.log(0.5))])
+
+    def rss_of(params):
+        y_hat, J = func(params, n_safe)
+        r = (y_hat - y0) * w
+        return (r ** 2).sum(axis=1), r, J * w[..., None]
+
+    rss, r, J = rss_of(p)
+    lam = np.full(G, 1e-3)
+    active = np.ones(G, dtype=bool)
+    eye = np.eye(3)
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        JtJ = np.einsum('gti,gtj->gij', J, J)
+        Jtr = np.einsum('gti,gt->gi', J, r)
+        # Levenberg-Marquardt 감쇠 (대각 스케일) + 수치 안정용 작은 항
+        A = JtJ + lam[:, None, None] * (JtJ * eye) + 1e-9 * eye
+        step = np.linalg.solve(A, Jtr[..., None])[..., 0]
+        step[~active] = 0.0
+
+        p_new = p - step
+        p_new[:, 2] = np.clip(p_new[:, 2], *LOG_RATE_BOUNDS)
+        rss_new, r_new, J_new = rss_of(p_new)
+        better = (rss_new < rss) & active
+
+        p[better], r[better], J[better] = p_new[better], r_new[better], J_new[better]
+        improvement = np.where(better, (rss - rss_new) / np.maximum(rss, 1e-12), 0.0)
+        rss[better] = rss_new[better]
+        lam = np.where(better, lam / 3, lam * 3)
+
+        # 개선이 거의 없거나 감쇠가 너무 커진 그룹은 수렴으로 보고 고정
+        active &= ~((better & (improvement < tol)) | (lam > 1e10))
+
+    n_obs = mask.sum(axis=1)
+    ss_tot = (((y0 - (y0.sum(axis=1) / n_obs)[:, None]) * w) ** 2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = 1 - rss / ss_tot
+        # 가우시안 오차 가정 AIC (모델 비교용)
+        aic = n_obs * np.log(rss / n_obs) + 2 * 3
+
+    c = np.exp(p[:, 2])
+    at_bound = np.isclose(p[:, 2], LOG_RATE_BOUNDS[0]) | np.isclose(p[:, 2], LOG_RATE_BOUNDS[1])
+    return pd.DataFrame({
+        'Model': model,
+        'Asymptote': p[:, 0],
+        'Gain': p[:, 1],
+        'Learning_Rate': c,
+        'Stable_Trial': stable_trial(model, c),
+        'RSS': rss,
+        'R2': r2,
+        'AIC': aic,
+        'N_Trials': n_obs,
+        'Rate_At_Bound': at_bound,
+    })
+
+# ==========================================
+# 4. Long 테이블 -> 패딩된 (그룹, 시행) 배열
+# ==========================================
+def to_padded(df, group_cols, x_col='Trial_Order', y_col='SearchTime'):
+    df = df.dropna(subset=[y_col]).sort_values(group_cols + [x_col])
+    codes, groups = pd.MultiIndex.from_frame(df[group_cols]).factorize()
+    # 그룹 내 순번 (0, 1, 2, ...)
+    pos = df.groupby(codes).cumcount().to_numpy()
+    G, T = len(groups), pos.max() + 1
+
+    n = np.ones((G, T))
+    y = np.zeros((G, T))
+    mask = np.zeros((G, T), dtype=bool)
+    n[codes, pos] = df[x_col].to_numpy(dtype=float)
+    y[codes, pos] = df[y_col].to_numpy(dtype=float)
+    mask[codes, pos] = True
+    return pd.DataFrame(list(groups), columns=group_cols), n, y, mask
+
+
+def fit_learning_curves(df, group_cols, y_col='SearchTime'):
+    keys, n, y, mask = to_padded(df, group_cols, y_col=y_col)
+    fits = []
+    for model in MODELS:
+        res = fit_batched(model, n, y, mask)
+        fits.append(pd.concat([keys, res], axis=1))
+    return pd.concat(fits, ignore_index=True)
+
+# ==========================================
+# 5. 실행
+# ==========================================
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    print("🔄 학습 곡선 적합 시작...")
+    df = pd.read_csv(PROCESS_PATH)
+
+    # 1) 참가자 x 조건 (모든 그룹을 한 번에 적합)
+    fits = fit_learning_curves(df, ['Participant', 'Condition'])
+    save_path = os.path.join(RESULT_DIR, 'learning_curve_fits.csv')
+    fits.to_csv(save_path, index=False, encoding='utf-8-sig')
+
+    print("\n[참가자 x 조건 적합 요약 (중앙값)]")
+    summary = fits.groupby(['Model', 'Condition'])[['Asymptote', 'Learning_Rate', 'Stable_Trial', 'R2']].median()
+    print(summary.round(3))
+
+    # 2) 조건 평균 곡선 (02의 Trial_Order x Condition 피벗과 동일한 평균)
+    mean_curve = df.groupby(['Condition', 'Trial_Order'], as_index=False)['SearchTime'].mean()
+    cond_fits = fit_learning_curves(mean_curve, ['Condition'])
+    print("\n[조건별 평균 곡선 적합]")
+    print(cond_fits[['Model', 'Condition', 'Asymptote', 'Gain', 'Learning_Rate', 'Stable_Trial', 'R2', 'AIC']]
+          .round(3).to_string(index=False))
+    print(f"💾 적합 결과 저장 완료: {save_path}")
+
+    # 3) 조건별 평균 곡선 + 거듭제곱 적합선
+    sns.set(style="whitegrid", font_scale=1.1)
+    plt.figure(figsize=(10, 6))
+    palette = dict(zip(['fixed', 'adaptive', 'bottom-right'], sns.color_palette('deep', 3)))
+    grid = np.linspace(1, df['Trial_Order'].max(), 100)
+    for _, f in cond_fits[cond_fits['Model'] == 'power'].iterrows():
+        cond = f['Condition']
+        obs = mean_curve[mean_curve['Condition'] == cond]
+        color = palette.get(cond)
+        plt.plot(obs['Trial_Order'], obs['SearchTime'], 'o', color=color, label=f'{cond} (observed)')
+        plt.plot(grid, f['Asymptote'] + f['Gain'] * grid ** (-f['Learning_Rate']), '-', color=color,
+                 label=f"{cond} fit: a={f['Asymptote']:.0f}, c={f['Learning_Rate']:.2f}")
+    plt.title('Learning Curve: Power-Law Fit of Search Time')
+    plt.xlabel('Trial Order')
+    plt.ylabel('Search Time (ms)')
+    plt.legend(fontsize=9)
+    plt.tight_layout()
+    plt.savefig(os.path.join(RESULT_DIR, 'Fig9_Learning_Curve_Fit.png'), dpi=300)
+    print("✅ Fig9_Learning_Curve_Fit.png 저장 완료")
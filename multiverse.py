@@ -0,0 +1,242 @@
+import pandas as pd
+import numpy as np
+import os
+import itertools
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from scipy import stats
+from batch_stats import run_batch_tests, CONDITIONS
+
+# ==========================================
+# 1. 설정 및 분기(선택지) 격자
+# ==========================================
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+PROCESS_PATH = os.path.join(RESULT_DIR, 'processed_data.csv')
+
+METRICS = ['SearchTime', 'Offset', 'Error']
+# 스펙 커브에 그릴 대표 비교 (adaptive - fixed)
+FOCAL_PAIR = ('fixed', 'adaptive')
+
+# 스크립트에 고정돼 있던 전처리 선택지들
+CHOICES = {
+    # SearchTime 이 이 값(ms) 미만인 시행 제외 (01은 100ms 미만을 보고만 하고 제외하지 않음)
+    'min_search_ms': [0, 100, 200],
+    # Offset 결측 시행: 유지(Offset만 결측) / 시행 전체 제외 / 참가자x조건 중앙값 대체
+    'offset_nan': ['keep', 'drop', 'impute'],
+    # 참가자 x 조건 집계 (pivot_table 의 aggfunc)
+    'aggregation': ['mean', 'median'],
+    # 오류 시행 제외 여부
+    'exclude_errors': [False, True],
+}
+# Radius 정의: 로그의 circleData.radius / 캘리브레이션 거리 백분위 / 최댓값
+# (개인화 상관 분석에만 쓰이므로 검정 경로와 교차하지 않고, 경로마다 상관만 정의별로 계산)
+RADIUS_CHOICES = ['logged', 'p50', 'p70', 'p90', 'max']
+BASELINE = {'min_search_ms': 0, 'offset_nan': 'keep', 'aggregation': 'mean',
+            'exclude_errors': False, 'radius': 'logged'}
+
+# 공유 메모리에 올릴 숫자 컬럼
+SHARED_COLS = ['Participant_Code', 'Condition_Code', 'SearchTime', 'Offset', 'Error']
+
+
+def spec_grid(choices=CHOICES):
+    keys = list(choices)
+    return [dict(zip(keys, values)) for values in itertools.product(*choices.values())]
+
+# ==========================================
+# 2. Radius 정의별 값 (참가자 x 정의)
+# ==========================================
+def radius_table(df, data_dir=DATA_DIR):
+    from calibration_kinematics import pack_calibration
+
+    per_p = df.groupby('Participant')[['Reachable_Radius', 'Circle_X', 'Circle_Y']].first()
+    packed = pack_calibration(data_dir)
+    names = packed['Participant']
+    seg = np.repeat(np.arange(len(names)), np.diff(packed['offsets']))
+    cx = per_p['Circle_X'].reindex(names).to_numpy()[seg]
+    cy = per_p['Circle_Y'].reindex(names).to_numpy()[seg]
+    dist = np.hypot(packed['x'] - cx, packed['y'] - cy)
+    dist = pd.Series(np.where(packed['reachable'], dist, np.nan)).groupby(seg)
+
+    table = pd.DataFrame({
+        'logged': per_p['Reachable_Radius'].reindex(names).to_numpy(),
+        'p50': dist.quantile(0.5).to_numpy(),
+        'p70': dist.quantile(0.7).to_numpy(),
+        'p90': dist.quantile(0.9).to_numpy(),
+        'max': dist.max().to_numpy(),
+    }, index=pd.Index(names, name='Participant'))
+    return table
+
+# ==========================================
+# 3. 워커 (공유 메모리의 배열을 복사 없이 참조)
+# ==========================================
+_SHARED = {}
+
+
+def _attach(shm_name, shape, participants, radii):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _SHARED['shm'] = shm  # 참조 유지 (닫히지 않도록)
+    _SHARED['data'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _SHARED['participants'] = np.asarray(participants, dtype=object)
+    _SHARED['radii'] = radii
+
+
+def apply_spec(data, spec):
+    # data: (N, len(SHARED_COLS)) 원본 배열 -> 선택지가 적용된 시행 DataFrame
+    df = pd.DataFrame(data, columns=SHARED_COLS)
+    keep = df['SearchTime'] >= spec['min_search_ms']
+    if spec['exclude_errors']:
+        keep &= df['Error'] == 0
+    if spec['offset_nan'] == 'drop':
+        keep &= df['Offset'].notna()
+    df = df[keep].copy()
+    if spec['offset_nan'] == 'impute':
+        df['Offset'] = df['Offset'].fillna(
+            df.groupby(['Participant_Code', 'Condition_Code'])['Offset'].transform('median'))
+    return df
+
+
+def evaluate_spec(spec_id, spec, data=None, participants=None, radii=None, radius_choices=RADIUS_CHOICES):
+    data = _SHARED['data'] if data is None else data
+    participants = _SHARED['participants'] if participants is None else participants
+    radii = _SHARED['radii'] if radii is None else radii
+
+    df = apply_spec(data, spec)
+    df['Participant'] = participants[df['Participant_Code'].astype(int)]
+    df['Condition'] = np.asarray(CONDITIONS, dtype=object)[df['Condition_Code'].astype(int)]
+    long_df = df.melt(id_vars=['Participant', 'Condition'], value_vars=METRICS,
+                      var_name='Metric', value_name='Value')
+
+    # 오류 시행을 제외하면 Error 가 상수가 되어 정규성 검정 경고가 나옴 (결과는 NaN 으로 남김)
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        tests = run_batch_tests(long_df, METRICS, aggfunc=spec['aggregation'])
+    tests = tests[tests['Test'] != 'shapiro']
+
+    # 효과 크기: 참가자별 (adaptive - fixed) 집계 차이의 중앙값
+    wide = df.pivot_table(index='Participant', columns='Condition', values=METRICS, aggfunc=spec['aggregation'])
+    effects = {m: np.nanmedian(wide[(m, FOCAL_PAIR[1])] - wide[(m, FOCAL_PAIR[0])]) for m in METRICS}
+
+    rows = []
+    for _, t in tests.iterrows():
+        effect = effects[t['Metric']] if (t['Condition_1'], t['Condition_2']) == FOCAL_PAIR else np.nan
+        rows.append({'Spec_ID': spec_id, **spec, 'N_Trials': len(df), 'Metric': t['Metric'], 'Test': t['Test'],
+                     'Condition_1': t['Condition_1'], 'Condition_2': t['Condition_2'], 'N': t['N'],
+                     'Statistic': t['Statistic'], 'p': t['p'], 'p_holm': t['p_holm'], 'Effect': effect})
+
+    # 개인화 분석 (02 RQ3): Radius vs Time Saving (fixed - adaptive) 상관 - Radius 정의별
+    saving = wide[('SearchTime', 'fixed')] - wide[('SearchTime', 'adaptive')]
+    for definition in radius_choices:
+        radius = radii[definition].reindex(saving.index)
+        ok = saving.notna() & radius.notna()
+        r, p_r = stats.pearsonr(radius[ok], saving[ok]) if ok.sum() > 2 else (np.nan, np.nan)
+        rows.append({'Spec_ID': spec_id, **spec, 'radius': definition, 'N_Trials': len(df),
+                     'Metric': 'Radius_vs_TimeSaving', 'Test': 'pearson', 'N': int(ok.sum()),
+                     'Statistic': r, 'p': p_r, 'Effect': r})
+    return rows
+
+# ==========================================
+# 4. 실행기 (프로세스 풀 + 공유 메모리)
+# ==========================================
+def run_multiverse(df, radii, choices=CHOICES, max_workers=None):
+    specs = spec_grid(choices)
+    codes, participants = pd.factorize(df['Participant'])
+    data = np.column_stack([
+        codes,
+        pd.Categorical(df['Condition'], categories=CONDITIONS).codes,
+        df['SearchTime'], df['Offset'], df['Error'],
+    ]).astype(np.float64)
+    data = data[data[:, 1] >= 0]
+
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach,
+                                 initargs=(shm.name, data.shape, list(participants), radii)) as pool:
+            futures = [pool.submit(evaluate_spec, i, spec) for i, spec in enumerate(specs)]
+            rows = [row for f in futures for row in f.result()]
+    finally:
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(rows)
+
+# ==========================================
+# 5. 스펙 커브 (효과 크기 정렬 + 선택지 표시 패널)
+# ==========================================
+def plot_specification_curve(results, save_path, choices=CHOICES):
+    import matplotlib.pyplot as plt
+
+    focal = results[(results['Test'] == 'wilcoxon') & (results['Condition_1'] == FOCAL_PAIR[0])
+                    & (results['Condition_2'] == FOCAL_PAIR[1])]
+    metrics = [m for m in METRICS if m in focal['Metric'].unique()]
+    n_rows = sum(len(v) for v in choices.values())
+    fig, axes = plt.subplots(2, len(metrics), figsize=(6 * len(metrics), 9), sharex='col',
+                             gridspec_kw={'height_ratios': [1, 1.6]}, squeeze=False)
+
+    for j, metric in enumerate(metrics):
+        sub = focal[focal['Metric'] == metric].sort_values('Effect').reset_index(drop=True)
+        x = np.arange(len(sub))
+        sig = sub['p_holm'] < 0.05
+        is_base = np.all([sub[k] == BASELINE[k] for k in choices], axis=0)
+
+        ax = axes[0, j]
+        ax.scatter(x[~sig], sub['Effect'][~sig], s=10, color='gray', label='n.s.')
+        ax.scatter(x[sig], sub['Effect'][sig], s=10, color='crimson', label='p_holm < .05')
+        ax.scatter(x[is_base], sub['Effect'][is_base], s=80, facecolors='none', edgecolors='black', label='baseline')
+        ax.axhline(0, color='black', lw=0.8)
+        ax.set_title(f'{metric}: {FOCAL_PAIR[1]} - {FOCAL_PAIR[0]}')
+        ax.set_ylabel('Median paired difference')
+        ax.legend(fontsize=8)
+
+        ax = axes[1, j]
+        labels, row = [], 0
+        for key, values in choices.items():
+            for v in values:
+                on = (sub[key] == v).to_numpy()
+                ax.scatter(x[on], np.full(on.sum(), row), s=4, marker='|', color='black')
+                labels.append(f'{key}={v}')
+                row += 1
+        ax.set_yticks(range(n_rows))
+        ax.set_yticklabels(labels if j == 0 else [], fontsize=8)
+        ax.invert_yaxis()
+        ax.set_xlabel('Specification (sorted by effect)')
+
+    fig.suptitle('Specification Curve (Multiverse Analysis)', fontsize=15, fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(save_path, dpi=200)
+    plt.close(fig)
+
+# ==========================================
+# 6. 실행
+# ==========================================
+if __name__ == "__main__":
+    import time
+
+    print("🔄 멀티버스 분석 시작...")
+    df = pd.read_csv(PROCESS_PATH)
+    radii = radius_table(df)
+
+    start = time.perf_counter()
+    results = run_multiverse(df, radii)
+    n_specs = results['Spec_ID'].nunique()
+    print(f"⚡ {n_specs}개 분석 경로 평가 완료 ({time.perf_counter() - start:.1f} s)")
+
+    save_path = os.path.join(RESULT_DIR, 'multiverse_results.csv')
+    results.to_csv(save_path, index=False, encoding='utf-8-sig')
+    print(f"💾 결과 저장 완료: {save_path}")
+
+    # 경로별 결론이 얼마나 안정적인지 요약 (유의한 경로의 비율)
+    summary = results[results['Test'].isin(['friedman', 'wilcoxon', 'pearson'])].copy()
+    summary['Significant'] = summary['p_holm'].fillna(summary['p']) < 0.05
+    summary['Pair'] = summary['Condition_1'].fillna('') + np.where(summary['Condition_2'].notna(), ' vs ', '') \
+        + summary['Condition_2'].fillna('')
+    summary.loc[summary['Test'] == 'pearson', 'Pair'] = 'radius=' + summary['radius'].astype(str)
+    table = summary.groupby(['Metric', 'Test', 'Pair']).agg(
+        Specs=('Spec_ID', 'nunique'), Significant_Share=('Significant', 'mean'),
+        p_Median=('p', 'median'), Effect_Median=('Effect', 'median'))
+    print("\n[분석 경로별 유의성 비율]")
+    print(table.round(3).to_string())
+
+    plot_specification_curve(results, os.path.join(RESULT_DIR, 'Fig12_Specification_Curve.png'))
+    print("✅ Fig12_Specification_Curve.png 저장 완료")
@@ -0,0 +1,246 @@
+import pandas as pd
+import numpy as np
+import os
+from scipy import stats
+from session_store import iter_sessions
+from participant_registry import participant_key
+from batch_stats import trials_to_long, build_wide_array, CONDITIONS
+
+# ==========================================
+# 1. 설정
+# ==========================================
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+PROCESS_PATH = os.path.join(RESULT_DIR, 'processed_data.csv')
+
+ORDER_METRICS = ['SearchTime', 'Offset']
+N_PERMUTATIONS = 10_000        # 참가자 간 실험 순서 재배정 횟수
+MAX_BATCH_CELLS = 20_000_000   # 한 배치의 설계 행렬 원소 수 상한 (배치 크기 = 상한 / (P*C*k))
+SEED = 0
+
+# ==========================================
+# 2. 실험 순서 (experiments[].order 기준)
+# ==========================================
+SEQUENCE_COLUMNS = ['Participant_ID', 'Participant', 'Condition', 'Session_Position', 'Prev_Condition']
+
+
+def session_sequence(data):
+    # 세션 하나의 (조건) 마다 실제 진행 위치와 직전 조건 행
+    participant_id, name = participant_key(data['participant'])
+    # order 가 없으면 리스트 순서(실제 수행 순서)를 사용
+    exps = sorted(enumerate(data['experiments']), key=lambda e: e[1].get('order', e[0] + 1))
+    rows, prev = [], None
+    for pos, (_, exp) in enumerate(exps, start=1):
+        rows.append({'Participant_ID': participant_id, 'Participant': name, 'Condition': exp['condition'],
+                     'Session_Position': pos, 'Prev_Condition': prev})
+        prev = exp['condition']
+    return rows
+
+
+def sequences_frame(sessions):
+    # 세션 메타 목록 -> (참가자, 조건) 순서 테이블
+    return pd.DataFrame([row for data in sessions for row in session_sequence(data)], columns=SEQUENCE_COLUMNS)
+
+
+def load_sequences(data_dir=DATA_DIR):
+    return sequences_frame(data for _, data in iter_sessions(data_dir, include_calibration=False))
+
+
+def attach_order(df, sequences):
+    # 시행 테이블에 조건의 진행 위치 / 직전 조건 컬럼 추가 (행 순서 유지)
+    # (참가자, 조건) 이 두 번 이상 나오면 병합 시 시행 행이 복제되므로 먼저 확인
+    dup = sequences.duplicated(['Participant_ID', 'Condition'], keep=False)
+    if dup.any():
+        cells = sorted(set(zip(sequences.loc[dup, 'Participant_ID'], sequences.loc[dup, 'Condition'])))
+        raise ValueError(f"같은 (Participant_ID, Condition) 의 순서 행이 여러 개입니다: {cells}")
+    df = df.drop(columns=['Session_Position', 'Prev_Condition'], errors='ignore')
+    return df.merge(sequences[['Participant_ID', 'Condition', 'Session_Position', 'Prev_Condition']],
+                     on=['Participant_ID', 'Condition'], how='left')
+
+
+def order_arrays(order_df, participants, conditions=CONDITIONS, participant_col='Participant'):
+    # (P, C) 진행 위치 배열과 직전 조건 인덱스 배열 (첫 조건은 -1)
+    cells = order_df.drop_duplicates([participant_col, 'Condition']).set_index([participant_col, 'Condition'])
+    idx = pd.MultiIndex.from_product([participants, conditions])
+    positions = cells['Session_Position'].reindex(idx).to_numpy(dtype=float).reshape(len(participants), -1)
+    cond_idx = {c: i for i, c in enumerate(conditions)}
+    prev = cells['Prev_Condition'].reindex(idx).map(cond_idx).fillna(-1).to_numpy(dtype=int)
+    return positions, prev.reshape(len(participants), -1)
+
+# ==========================================
+# 3. 역균형(counterbalancing) 점검
+# ==========================================
+def balance_tables(sequences, conditions=CONDITIONS):
+    seq = sequences.sort_values('Session_Position').groupby('Participant_ID', sort=False)['Condition'] \
+        .agg(' -> '.join).value_counts().rename_axis('Sequence').reset_index(name='N')
+
+    pos = pd.crosstab(sequences['Condition'], sequences['Session_Position']).reindex(conditions, fill_value=0)
+    # 위치마다 조건이 고르게 배정되었는지 (카이제곱 독립성 검정)
+    chi2, p, dof, _ = stats.chi2_contingency(pos)
+
+    carry = pd.crosstab(sequences['Prev_Condition'], sequences['Condition']) \
+        .reindex(index=conditions, columns=conditions, fill_value=0)
+    return seq, pos, carry, {'Chi2': chi2, 'dof': dof, 'p': p}
+
+# ==========================================
+# 4. 설계 행렬 (참가자 내 조건 / 위치 / 직전 조건 효과, 참가자 평균 제거)
+# ==========================================
+def design_names(conditions=CONDITIONS):
+    n = len(conditions)
+    return ([f'Condition[{c}]' for c in conditions[1:]] +
+            [f'Position[{k}]' for k in range(2, n + 1)] +
+            [f'Carryover[{c}]' for c in conditions[1:]])
+
+
+TERMS = {'Position': 'Position[', 'Carryover': 'Carryover['}
+
+
+def design_matrix(positions, prev, n_conditions):
+    # positions / prev: (..., P, C) -> X: (..., P, C, k)
+    # 기준: 첫 조건 / 1번째 위치 / 직전 조건이 첫 조건 (첫 위치는 직전 조건이 없으므로 carryover 0)
+    shape = positions.shape
+    cond = np.broadcast_to(np.eye(n_conditions)[:, 1:], shape + (n_conditions - 1,))
+    pos = (positions[..., None] == np.arange(2, n_conditions + 1)).astype(float)
+    carry = (prev[..., None] == np.arange(1, n_conditions)).astype(float)
+    return np.concatenate([cond, pos, carry], axis=-1)
+
+
+def _within(a):
+    # 참가자 고정효과 제거 (조건 축 평균을 빼면 참가자 더미를 넣은 회귀와 같은 계수)
+    return a - a.mean(axis=-2, keepdims=True)
+
+
+def fit_within(X, Y, keep=None):
+    # X: (..., P, C, k), Y: (P, C, M) -> 계수 (..., k', M), 잔차 제곱합 (..., M)
+    if keep is not None:
+        X = X[..., keep]
+    Xw = _within(X)
+    Xw = Xw.reshape(Xw.shape[:-3] + (-1, Xw.shape[-1]))
+    Yw = _within(Y).reshape(-1, Y.shape[-1])
+    XtX = np.einsum('...nk,...nj->...kj', Xw, Xw)
+    XtY = np.einsum('...nk,nm->...km', Xw, Yw)
+    coef = np.linalg.pinv(XtX) @ XtY
+    rss = (Yw ** 2).sum(axis=0) - np.einsum('...km,...km->...m', coef, XtY)
+    return coef, rss
+
+
+def _term_stats(X, Y, names):
+    # 항(term)별 통계량: 해당 항을 뺐을 때 늘어나는 잔차 제곱합 / 전체 모형 잔차 제곱합
+    coef, rss = fit_within(X, Y)
+    out = {}
+    for term, prefix in TERMS.items():
+        keep = [i for i, n in enumerate(names) if not n.startswith(prefix)]
+        _, rss_reduced = fit_within(X, Y, keep)
+        out[term] = (rss_reduced - rss) / rss
+    return coef, out
+
+# ==========================================
+# 5. 순열 검정 (관측된 실험 순서를 참가자 간에 재배정)
+# ==========================================
+def order_effects(arr, positions, prev, metrics, conditions=CONDITIONS, n_permutations=N_PERMUTATIONS, seed=SEED):
+    # arr: (P, C, M) 참가자 x 조건 평균. 결측 셀이 있는 참가자는 제외
+    complete = ~np.isnan(arr).any(axis=(1, 2)) & ~np.isnan(positions).any(axis=1)
+    if not complete.all():
+        print(f"⚠️ 경고: 조건 셀 또는 순서 정보가 빠진 참가자 {int((~complete).sum())}명은 제외합니다.")
+    Y, positions, prev = arr[complete], positions[complete], prev[complete]
+    P, C = positions.shape
+    names = design_names(conditions)
+
+    X = design_matrix(positions, prev, C)
+    if np.linalg.matrix_rank(_within(X).reshape(-1, X.shape[-1])) < X.shape[-1]:
+        print("⚠️ 경고: 관측된 순서 조합으로는 위치/직전 조건 효과를 모두 구분할 수 없습니다. (계수는 최소 노름 해)")
+    coef, term_obs = _term_stats(X, Y, names)
+
+    # 귀무가설(순서 효과 없음)에서는 어떤 참가자가 어떤 순서를 받았는지 교환 가능
+    rng = np.random.default_rng(seed)
+    batch = max(1, int(MAX_BATCH_CELLS // (P * C * len(names))))
+    exceed_coef = np.zeros_like(coef)
+    exceed_term = {t: np.zeros(len(metrics)) for t in TERMS}
+    for start in range(0, n_permutations, batch):
+        b = min(batch, n_permutations - start)
+        perm = np.argsort(rng.random((b, P)), axis=1)
+        Xb = design_matrix(positions[perm], prev[perm], C)
+        coef_b, term_b = _term_stats(Xb, Y, names)
+        exceed_coef += (np.abs(coef_b) >= np.abs(coef) - 1e-12).sum(axis=0)
+        for t in TERMS:
+            exceed_term[t] += (term_b[t] >= term_obs[t] - 1e-12).sum(axis=0)
+
+    p_coef = (exceed_coef + 1) / (n_permutations + 1)
+    # 순서 재배정은 조건 효과에 대한 귀무분포가 아니므로 조건 계수의 p값은 비움
+    p_coef[[i for i, n in enumerate(names) if n.startswith('Condition[')]] = np.nan
+    coef_rows = [{'Metric': m, 'Effect': n, 'Estimate': coef[ki, mi], 'p_perm': p_coef[ki, mi]}
+                 for mi, m in enumerate(metrics) for ki, n in enumerate(names)]
+    term_rows = [{'Metric': m, 'Term': t, 'N': P, 'Statistic': term_obs[t][mi],
+                  'p_perm': (exceed_term[t][mi] + 1) / (n_permutations + 1)}
+                 for mi, m in enumerate(metrics) for t in TERMS]
+    return pd.DataFrame(coef_rows), pd.DataFrame(term_rows)
+
+# ==========================================
+# 6. 주 분석용 공변량 보정 (위치 / 직전 조건 효과를 뺀 값)
+# ==========================================
+def order_adjusted(long_df, order_df, conditions=CONDITIONS):
+    # long_df: (Participant, Condition, Metric, Value) - 시행 단위도 가능 (셀 단위로 추정한 순서 효과를 행마다 뺌)
+    participants, arr, metrics = build_wide_array(long_df, conditions=conditions)
+    positions, prev = order_arrays(order_df, participants, conditions)
+    complete = ~np.isnan(arr).any(axis=(1, 2)) & ~np.isnan(positions).any(axis=1)
+
+    C = len(conditions)
+    X = design_matrix(np.nan_to_num(positions, nan=1), prev, C)
+    coef, _ = fit_within(X[complete], arr[complete])
+    # 조건 효과는 남기고 순서 관련 항의 기여만 제거
+    order_cols = slice(C - 1, None)
+    effect = np.einsum('pck,km->pcm', X[..., order_cols], coef[order_cols])
+
+    effect_df = pd.DataFrame(effect.reshape(-1, len(metrics)), columns=metrics,
+                             index=pd.MultiIndex.from_product([participants, conditions],
+                                                              names=['Participant', 'Condition'])) \
+        .stack().rename('Order_Effect').reset_index().rename(columns={'level_2': 'Metric'})
+    out = long_df.merge(effect_df, on=['Participant', 'Condition', 'Metric'], how='left')
+    out['Value'] = out['Value'] - out['Order_Effect'].fillna(0)
+    return out.drop(columns='Order_Effect')
+
+# ==========================================
+# 7. 실행
+# ==========================================
+if __name__ == "__main__":
+    import time
+
+    print("🔄 실험 순서 / 이월 효과 분석 시작...")
+    sequences = load_sequences(DATA_DIR)
+    if sequences.empty:
+        print(f"❌ '{DATA_DIR}'에서 실험 순서를 읽지 못했습니다.")
+        exit()
+
+    seq, pos, carry, balance = balance_tables(sequences)
+    pd.set_option('display.width', 200)
+    print("\n[실험 순서 조합]")
+    print(seq.to_string(index=False))
+    print("\n[조건 x 진행 위치 (참가자 수)]")
+    print(pos)
+    print(f"- 위치 균형 카이제곱: Chi2={balance['Chi2']:.3f}, dof={balance['dof']}, p={balance['p']:.4f}")
+    print("\n[직전 조건 -> 현재 조건 (참가자 수)]")
+    print(carry)
+
+    if not os.path.exists(PROCESS_PATH):
+        print(f"⚠️ '{PROCESS_PATH}' 파일이 없습니다. 01_data_loader.py를 먼저 실행하세요.")
+        exit()
+    df = attach_order(pd.read_csv(PROCESS_PATH, dtype={'Participant_ID': str}), sequences)
+
+    print("\n[진행 위치 x 조건별 평균]")
+    print(df.pivot_table(index='Session_Position', columns='Condition', values=ORDER_METRICS).round(2))
+
+    start = time.perf_counter()
+    long_df = trials_to_long(df, ORDER_METRICS, group_col='Condition')
+    participants, arr, metrics = build_wide_array(long_df, ORDER_METRICS)
+    positions, prev = order_arrays(df, participants)
+    coef_table, term_table = order_effects(arr, positions, prev, metrics)
+    print(f"\n[순서 효과 회귀 (참가자 고정효과, 순열 {N_PERMUTATIONS}회, {time.perf_counter() - start:.1f} s)]")
+    print(coef_table.to_string(index=False))
+    print("\n[항별 순열 검정 (잔차 제곱합 증가 비율)]")
+    print(term_table.to_string(index=False))
+
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    pos.to_csv(os.path.join(RESULT_DIR, 'order_balance.csv'), encoding='utf-8-sig')
+    coef_table.to_csv(os.path.join(RESULT_DIR, 'order_effects_coefficients.csv'), index=False, encoding='utf-8-sig')
+    term_table.to_csv(os.path.join(RESULT_DIR, 'order_effects_tests.csv'), index=False, encoding='utf-8-sig')
+    print(f"\n💾 순서 효과 분석 결과가 '{RESULT_DIR}'에 저장되었습니다.")
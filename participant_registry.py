@@ -0,0 +1,155 @@
+import pandas as pd
+import numpy as np
+import os
+import unicodedata
+from session_store import iter_sessions
+
+# ==========================================
+# 1. 설정
+# ==========================================
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+SURVEY_PATH = os.environ.get('HIM_SURVEY_PATH', './사후 설문 정리.csv')
+NAME_COL = '1. 성함'
+
+# 설문의 "첫 번째/두 번째/세 번째 방식" -> 실험 순서 인덱스
+ORDINAL_LABELS = ['첫 번째', '두 번째', '세 번째']
+ORDER_COLS = ['Order_1st', 'Order_2nd', 'Order_3rd']
+
+# ==========================================
+# 2. 이름 정규화
+# ==========================================
+# 같은 이름이라도 macOS(NFD)/Windows(NFC) 입력, 앞뒤·중간 공백 차이로 매칭이 깨지므로
+# NFC 정규화 + 공백 제거 + casefold 한 값을 조인 키로 사용
+def normalize_name(name):
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ''
+    return ''.join(unicodedata.normalize('NFC', str(name)).split()).casefold()
+
+
+def normalize_names(series):
+    s = series.astype('string').fillna('')
+    return s.str.normalize('NFC').str.replace(r'\s+', '', regex=True).str.casefold()
+
+
+def resolve_path(path):
+    # 파일명이 NFD로 저장된(macOS) 경우와 NFC 경우를 모두 찾아봄
+    for form in ('NFC', 'NFD'):
+        candidate = unicodedata.normalize(form, path)
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+# ==========================================
+# 3. 참가자 레지스트리 (Participant_ID = participant.studentId)
+# ==========================================
+def participant_key(participant):
+    # 세션의 participant -> (Participant_ID, 이름): studentId, 없으면 NFC 이름 (모든 테이블의 조인 키)
+    name = unicodedata.normalize('NFC', participant['name']).strip()
+    return str(participant.get('studentId') or name), name
+
+
+def build_registry(data_dir=DATA_DIR):
+    rows = []
+    for file_path, data in iter_sessions(data_dir, include_calibration=False):
+        p = data['participant']
+        participant_id, name = participant_key(p)
+        orders = [exp['condition'] for exp in data['experiments']]
+        row = {
+            'Participant_ID': participant_id,
+            'Participant': name,
+            'Name_Key': normalize_name(name),
+            'Handedness': p.get('handedness'),
+            'File': file_path,
+        }
+        row.update({col: orders[i] if i < len(orders) else None for i, col in enumerate(ORDER_COLS)})
+        rows.append(row)
+
+    registry = pd.DataFrame(rows).set_index('Participant_ID')
+    dup = registry.index.duplicated(keep=False)
+    if dup.any():
+        print(f"⚠️ 경고: 같은 studentId를 가진 세션이 있습니다: {sorted(set(registry.index[dup]))}")
+    return registry
+
+
+def build_join_index(registry):
+    # 이름 별칭 키와 studentId 키를 모두 하나의 해시 인덱스로 (키 -> 레지스트리 행 번호)
+    keys = pd.concat([
+        pd.Series(registry['Name_Key'].to_numpy()),
+        pd.Series(registry.index.str.casefold()),
+    ], ignore_index=True)
+    positions = np.concatenate([np.arange(len(registry))] * 2)
+    unique = ~keys.duplicated(keep=False)
+    clash = keys[~unique].unique()
+    if len(clash):
+        print(f"⚠️ 경고: 둘 이상의 참가자에 해당하는 키는 조인에서 제외합니다: {list(clash)}")
+    return pd.Index(keys[unique].to_numpy()), positions[unique.to_numpy()]
+
+# ==========================================
+# 4. 조인 (벡터화 해시 조회 1회)
+# ==========================================
+def attach_participant_id(df, name_col, registry, join_index=None):
+    if join_index is None:
+        join_index = build_join_index(registry)
+    index, positions = join_index
+
+    keys = normalize_names(df[name_col])
+    hit = index.get_indexer(keys.to_numpy())
+    matched = hit >= 0
+    rows = np.where(matched, positions[np.maximum(hit, 0)], -1)
+
+    out = df.copy()
+    out['Participant_ID'] = np.where(matched, registry.index.to_numpy()[np.maximum(rows, 0)], None)
+    # 이후 분석은 레지스트리의 표준 이름을 사용
+    out['Participant'] = np.where(matched, registry['Participant'].to_numpy()[np.maximum(rows, 0)], None)
+
+    unmatched = df.loc[~matched, [name_col]].copy()
+    unmatched['Reason'] = np.where(keys[~matched] == '', '빈 이름', '레지스트리에 없음')
+    return out[matched].reset_index(drop=True), unmatched
+
+
+def report_unmatched(unmatched, table_name):
+    if unmatched.empty:
+        print(f"✅ {table_name}: 모든 행이 참가자 레지스트리와 매칭되었습니다.")
+        return
+    blank = unmatched['Reason'] == '빈 이름'
+    print(f"⚠️ {table_name}: {len(unmatched)}개 행이 매칭되지 않았습니다. (빈 이름 {blank.sum()}개)")
+    for idx, row in unmatched[~blank].iterrows():
+        print(f"   - 행 {idx}: {row.iloc[0]!r} ({row['Reason']})")
+
+# ==========================================
+# 5. 설문 순서 표현 -> 실제 조건명 (벡터화)
+# ==========================================
+def ordinal_to_condition(values, orders):
+    # values: '첫 번째' 등의 응답 Series, orders: (행, 3) 실험 순서 배열
+    values = values.astype('string').fillna('')
+    idx = np.full(len(values), -1)
+    for i, label in enumerate(ORDINAL_LABELS):
+        idx[values.str.contains(label, regex=False).to_numpy()] = i
+    orders = np.asarray(orders, dtype=object)
+    picked = orders[np.arange(len(values)), np.maximum(idx, 0)]
+    return pd.Series(np.where(idx >= 0, picked, None), index=values.index)
+
+
+def load_survey(registry, survey_path=SURVEY_PATH, name_col=NAME_COL):
+    df_raw = pd.read_csv(resolve_path(survey_path))
+    df, unmatched = attach_participant_id(df_raw, name_col, registry)
+    # 레지스트리의 실험 순서를 ID로 붙임
+    df = df.merge(registry[ORDER_COLS], left_on='Participant_ID', right_index=True, how='left')
+    return df, unmatched
+
+# ==========================================
+# 6. 실행 (레지스트리 및 매칭 리포트)
+# ==========================================
+if __name__ == "__main__":
+    print("🔄 참가자 레지스트리 생성 중...")
+    registry = build_registry(DATA_DIR)
+    print(registry[['Participant'] + ORDER_COLS].to_string())
+
+    try:
+        df_survey, unmatched = load_survey(registry)
+        report_unmatched(unmatched, '설문')
+        missing = registry.index.difference(df_survey['Participant_ID'])
+        if len(missing):
+            print(f"⚠️ 설문 응답이 없는 참가자: {list(registry.loc[missing, 'Participant'])}")
+    except FileNotFoundError as e:
+        print(f"❌ 설문 CSV 파일을 찾을 수 없습니다: {e}")
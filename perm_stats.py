@@ -0,0 +1,230 @@
+import pandas as pd
+import numpy as np
+from scipy import stats
+from itertools import permutations, combinations
+import hashlib
+import os
+
+# ==========================================
+# 1. 설정
+# ==========================================
+# 귀무분포는 (검정, n, k, 동순위 패턴) 단위로 디스크에 캐싱
+CACHE_DIR = './.cache/null_dist'
+
+MAX_EXACT_STATES = 5_000_000   # 정확 분포(순위합 합성곱) 상태 수 상한
+N_RESAMPLES = 100_000          # 상한 초과 시 Monte Carlo 순열 수
+BATCH_SIZE = 10_000            # Monte Carlo 한 배치의 순열 수
+
+_memory_cache = {}
+
+# ==========================================
+# 2. 귀무분포 캐시
+# ==========================================
+def _cache_key(test, n, k, pattern, method):
+    digest = hashlib.sha1(repr(pattern).encode('utf-8')).hexdigest()[:16]
+    return f"{test}_{method}_n{n}_k{k}_{digest}"
+
+
+def _load_or_build(key, builder):
+    if key in _memory_cache:
+        return _memory_cache[key]
+
+    path = os.path.join(CACHE_DIR, key + '.npz')
+    if os.path.exists(path):
+        with np.load(path) as f:
+            dist = (f['values'], f['probs'])
+    else:
+        dist = builder()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # 여러 프로세스가 같은 키를 동시에 만들 수 있으므로 임시 파일에 쓴 뒤 교체
+        tmp_path = f"{path[:-4]}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, values=dist[0], probs=dist[1])
+        os.replace(tmp_path, path)
+
+    _memory_cache[key] = dist
+    return dist
+
+
+def _collapse(values, weights):
+    # 같은 통계량 값끼리 확률을 합쳐 (값, 확률) 형태로 압축
+    uniq, inv = np.unique(values, return_inverse=True)
+    probs = np.bincount(inv.ravel(), weights=weights.ravel())
+    return uniq, probs / probs.sum()
+
+# ==========================================
+# 3. Friedman: 참가자 내 조건 순열의 귀무분포
+# ==========================================
+# 순위는 동순위 평균 때문에 0.5 단위가 되므로 2배 한 정수 순위로 계산
+def _row_ranks2(data):
+    return (2 * stats.rankdata(data, axis=1)).astype(np.int64)
+
+
+def _friedman_pattern(ranks2):
+    # 모든 순위가 같은 행(완전 동순위)은 분포에 기여하지 않으므로 제외
+    rows = [tuple(sorted(r)) for r in ranks2.tolist() if len(set(r)) > 1]
+    return tuple(sorted(rows))
+
+
+def _friedman_exact(pattern, k):
+    # 행마다 k! 개 순열을 동일 확률로 더하는 순위합 합성곱 (k-1 차원)
+    n_rows = len(pattern)
+    size = 2 * k * n_rows + 1
+    dist = np.zeros((size,) * (k - 1))
+    dist[(0,) * (k - 1)] = 1.0
+
+    for row in pattern:
+        new = np.zeros_like(dist)
+        perms = list(permutations(row))
+        for perm in perms:
+            shift = perm[:k - 1]
+            dst = tuple(slice(s, None) for s in shift)
+            src = tuple(slice(0, size - s) for s in shift)
+            new[dst] += dist[src]
+        dist = new / len(perms)
+
+    total = sum(sum(row) for row in pattern)
+    grids = np.indices(dist.shape)
+    last = total - grids.sum(axis=0)
+    ssbn2 = (grids ** 2).sum(axis=0) + last ** 2
+
+    mask = (dist > 0) & (last >= 0)
+    return _collapse(ssbn2[mask], dist[mask])
+
+
+def _friedman_monte_carlo(pattern, k, n_resamples, seed=0):
+    rng = np.random.default_rng(seed)
+    ranks2 = np.array(pattern, dtype=np.int64)
+    values = []
+    for start in range(0, n_resamples, BATCH_SIZE):
+        b = min(BATCH_SIZE, n_resamples - start)
+        # 배치 단위로 참가자별 조건 순열을 한꺼번에 생성
+        perm = np.argsort(rng.random((b, len(ranks2), k)), axis=2)
+        shuffled = np.take_along_axis(np.broadcast_to(ranks2, perm.shape), perm, axis=2)
+        values.append((shuffled.sum(axis=1) ** 2).sum(axis=1))
+    values = np.concatenate(values)
+    return _collapse(values, np.ones(len(values)))
+
+
+def friedman_permutation(data, n_resamples=N_RESAMPLES):
+    # data: (참가자 n, 조건 k). 결측이 있는 참가자는 제외
+    data = np.asarray(data, dtype=float)
+    data = data[~np.isnan(data).any(axis=1)]
+    n, k = data.shape
+    if n == 0:
+        return np.nan, np.nan
+
+    ranks2 = _row_ranks2(data)
+    ranks2 = ranks2[(ranks2 != ranks2[:, :1]).any(axis=1)]
+    pattern = _friedman_pattern(ranks2)
+    if not pattern:
+        return np.nan, np.nan
+
+    n_states = (2 * k * len(pattern) + 1) ** (k - 1)
+    if n_states <= MAX_EXACT_STATES:
+        method = 'exact'
+        builder = lambda: _friedman_exact(pattern, k)
+    else:
+        method = f'mc{n_resamples}'
+        builder = lambda: _friedman_monte_carlo(pattern, k, n_resamples)
+
+    values, probs = _load_or_build(_cache_key('friedman', n, k, pattern, method), builder)
+
+    ssbn2 = (ranks2.sum(axis=0) ** 2).sum()
+    p = probs[values >= ssbn2].sum()
+    if method != 'exact':
+        # Monte Carlo p값은 관측값 자신을 포함하도록 보정
+        p = (p * n_resamples + 1) / (n_resamples + 1)
+
+    stat = stats.friedmanchisquare(*data.T)[0] if k >= 3 else np.nan
+    return stat, min(p, 1.0)
+
+# ==========================================
+# 4. Wilcoxon: 부호 뒤집기(sign-flip)의 정확 귀무분포
+# ==========================================
+def _wilcoxon_exact(pattern):
+    total = sum(pattern)
+    dist = np.zeros(total + 1)
+    dist[0] = 1.0
+    for r2 in pattern:
+        shifted = np.zeros_like(dist)
+        shifted[r2:] = dist[:total + 1 - r2]
+        dist = 0.5 * (dist + shifted)
+    values = np.arange(total + 1)
+    mask = dist > 0
+    return values[mask], dist[mask]
+
+
+def wilcoxon_permutation(x, y=None):
+    d = np.asarray(x, dtype=float)
+    if y is not None:
+        d = d - np.asarray(y, dtype=float)
+    d = d[~np.isnan(d)]
+    d = d[d != 0]  # zero_method='wilcox'와 동일하게 0 차이는 제외
+    n = len(d)
+    if n == 0:
+        return np.nan, np.nan
+
+    ranks2 = (2 * stats.rankdata(np.abs(d))).astype(np.int64)
+    pattern = tuple(sorted(ranks2.tolist()))
+    values, probs = _load_or_build(_cache_key('wilcoxon', n, 2, pattern, 'exact'),
+                                   lambda: _wilcoxon_exact(pattern))
+
+    total = ranks2.sum()
+    t_plus2 = ranks2[d > 0].sum()
+    # 양측 검정: 귀무분포 중심(total/2)에서 관측값만큼 이상 떨어질 확률
+    p = probs[np.abs(2 * values - total) >= abs(2 * t_plus2 - total)].sum()
+
+    stat = min(t_plus2, total - t_plus2) / 2
+    return stat, min(p, 1.0)
+
+# ==========================================
+# 5. 지표 일괄 처리 (batch_stats.build_wide_array 결과 사용)
+# ==========================================
+def run_permutation_tests(arr, metrics, conditions, pairs=None, n_resamples=N_RESAMPLES):
+    # arr: (참가자, 조건, 지표)
+    if pairs is None:
+        pairs = list(combinations(conditions, 2))
+    cond_idx = {c: i for i, c in enumerate(conditions)}
+
+    rows = []
+    for mi, metric in enumerate(metrics):
+        stat, p = friedman_permutation(arr[:, :, mi], n_resamples)
+        rows.append({'Metric': metric, 'Test': 'friedman_perm', 'Condition_1': None,
+                     'Condition_2': None, 'Statistic': stat, 'p': p})
+        for c1, c2 in pairs:
+            stat, p = wilcoxon_permutation(arr[:, cond_idx[c1], mi], arr[:, cond_idx[c2], mi])
+            rows.append({'Metric': metric, 'Test': 'wilcoxon_perm', 'Condition_1': c1,
+                         'Condition_2': c2, 'Statistic': stat, 'p': p})
+    return pd.DataFrame(rows)
+
+# ==========================================
+# 6. 실행 (모든 지표의 정확 p값)
+# ==========================================
+if __name__ == "__main__":
+    from batch_stats import (trials_to_long, mapped_to_long, build_wide_array, adjust_pvalues,
+                             PROCESS_PATH, MAPPED_PATH, RESULT_DIR, CONDITIONS)
+
+    print("🔄 순열 검정 (정확 귀무분포) 시작...")
+    frames = []
+    if os.path.exists(PROCESS_PATH):
+        frames.append(trials_to_long(pd.read_csv(PROCESS_PATH)))
+    if os.path.exists(MAPPED_PATH):
+        frames.append(mapped_to_long(pd.read_csv(MAPPED_PATH)))
+    if not frames:
+        print("❌ 분석할 데이터가 없습니다. 01_data_loader.py / test.py를 먼저 실행하세요.")
+        exit()
+
+    _, arr, metrics = build_wide_array(pd.concat(frames, ignore_index=True))
+    results = run_permutation_tests(arr, metrics, CONDITIONS)
+
+    # 지표별 Wilcoxon 쌍에 Holm 보정
+    wx = results['Test'] == 'wilcoxon_perm'
+    p_wx = results.loc[wx, 'p'].to_numpy().reshape(len(metrics), -1)
+    results.loc[wx, 'p_holm'] = adjust_pvalues(p_wx, 'holm').ravel()
+
+    pd.set_option('display.width', 200)
+    print(results.to_string(index=False))
+
+    save_path = os.path.join(RESULT_DIR, 'stats_results_permutation.csv')
+    results.to_csv(save_path, index=False, encoding='utf-8-sig')
+    print(f"\n💾 순열 검정 결과가 '{save_path}'에 저장되었습니다.")
@@ -0,0 +1,229 @@
+import pandas as pd
+import numpy as np
+import os
+import argparse
+from scipy import stats
+from batch_stats import (trials_to_long, mapped_to_long, build_wide_array, adjust_pvalues,
+                         CONDITIONS, CONDITION_PAIRS, TRIAL_METRICS, SURVEY_METRICS,
+                         PROCESS_PATH, MAPPED_PATH, RESULT_DIR)
+
+# ==========================================
+# 1. 설정
+# ==========================================
+N_SIMS = 2000
+N_GRID = list(range(10, 201, 10))
+ALPHA = 0.05
+TARGET_POWER = 0.8
+CHUNK_VALUES = 4_000_000  # 한 번에 생성할 (시뮬레이션 x 참가자 x 조건) 값 수 상한
+
+# 생성 값의 척도: 리커트(반올림 + 범위 제한) / 순위(행 내 순위) / 비율(0~1) / 연속
+SCALES = {
+    'Physical_Effort': ('likert', 1, 7),
+    'Accessibility': ('likert', 1, 7),
+    'Grip_Instability': ('likert', 1, 7),
+    'Rank': ('rank',),
+    'Error': ('rate', 0, 1),
+}
+
+# ==========================================
+# 2. 분산 성분 추정 (참가자 x 조건, 반복 없는 이원 분산분석)
+# ==========================================
+def estimate_components(arr, metrics, conditions=CONDITIONS):
+    # arr: (P, C, M) -> 지표별 조건 평균, 참가자 분산 σ_u², 잔차 분산 σ_e²
+    rows = []
+    for mi, metric in enumerate(metrics):
+        y = arr[:, :, mi]
+        y = y[~np.isnan(y).any(axis=1)]
+        P, C = y.shape
+        grand = y.mean()
+        ss_subj = C * ((y.mean(axis=1) - grand) ** 2).sum()
+        ss_cond = P * ((y.mean(axis=0) - grand) ** 2).sum()
+        ss_err = ((y - grand) ** 2).sum() - ss_subj - ss_cond
+        ms_subj = ss_subj / (P - 1)
+        ms_err = ss_err / ((P - 1) * (C - 1))
+        row = {'Metric': metric, 'N_Pilot': P,
+               'Var_Participant': max((ms_subj - ms_err) / C, 0.0), 'Var_Residual': ms_err}
+        row.update({f'Mean_{c}': m for c, m in zip(conditions, y.mean(axis=0))})
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('Metric')
+
+# ==========================================
+# 3. 일괄 순위 검정 (시뮬레이션 축으로 벡터화, 정규 근사)
+# ==========================================
+def _rank_rows(a):
+    # 행별 평균 순위(NaN 제외)와 Σ(t³ - t) 를 정렬 한 번으로 (t = 같은 값의 개수)
+    R, K = a.shape
+    order = np.argsort(a, axis=1)
+    flat = np.take_along_axis(a, order, axis=1).ravel()
+    row = np.repeat(np.arange(R), K)
+    new_run = np.ones(flat.size, dtype=bool)
+    new_run[1:] = (flat[1:] != flat[:-1]) | (row[1:] != row[:-1])
+    run_id = np.cumsum(new_run) - 1
+    counts = np.bincount(run_id)
+    run_start = np.tile(np.arange(K), R)[new_run]
+    avg = run_start[run_id] + (counts[run_id] - 1) / 2 + 1
+
+    ranks = np.empty_like(a, dtype=float)
+    np.put_along_axis(ranks, order, avg.reshape(R, K), axis=1)
+    ranks[np.isnan(a)] = np.nan
+    valid = np.bincount(run_id, weights=~np.isnan(flat))
+    ties = np.bincount(row[new_run], weights=valid ** 3 - valid, minlength=R)
+    return ranks, ties
+
+
+def _rank_small(y):
+    # 조건 축(C가 작음)은 쌍별 비교로 순위와 동률 개수를 한 번에 (정렬 불필요)
+    C = y.shape[-1]
+    ranks = np.ones(y.shape)
+    equal = np.ones(y.shape)
+    for i in range(C):
+        for j in range(i + 1, C):
+            gt = (y[..., i] > y[..., j]).astype(float)
+            eq = (y[..., i] == y[..., j]).astype(float)
+            ranks[..., i] += gt + 0.5 * eq
+            ranks[..., j] += (1 - gt - eq) + 0.5 * eq
+            equal[..., i] += eq
+            equal[..., j] += eq
+    return ranks, (equal ** 2 - 1).sum(axis=-1)
+
+
+def friedman_batch(y):
+    # y: (S, N, C) -> (통계량, p)  scipy.stats.friedmanchisquare 와 같은 동률 보정 + 카이제곱 근사
+    S, N, C = y.shape
+    ranks, ties = _rank_small(y)
+    rank_sums = ranks.sum(axis=1)
+    chi2 = 12.0 / (N * C * (C + 1)) * (rank_sums ** 2).sum(axis=1) - 3.0 * N * (C + 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        chi2 = chi2 / (1 - ties.sum(axis=1) / (N * (C ** 3 - C)))
+    return chi2, stats.chi2.sf(chi2, C - 1)
+
+
+def wilcoxon_batch(d):
+    # d: (S, N) 대응 차이 -> (T+, p)  0 차이는 제외 ('wilcox'), 동률 보정 정규 근사 (scipy 'approx')
+    a = np.where(d == 0, np.nan, np.abs(d))
+    ranks, ties = _rank_rows(a)
+    n = (~np.isnan(a)).sum(axis=1).astype(float)
+    t_plus = np.where(d > 0, ranks, 0.0).sum(axis=1)
+    mean = n * (n + 1) / 4
+    var = n * (n + 1) * (2 * n + 1) / 24 - ties / 48
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (t_plus - mean) / np.sqrt(var)
+    return t_plus, 2 * stats.norm.sf(np.abs(z))
+
+# ==========================================
+# 4. 합성 연구 생성 및 검정력
+# ==========================================
+def simulate(components, metric, n, n_sims, rng, conditions=CONDITIONS, effect_scale=1.0):
+    comp = components.loc[metric]
+    mu = np.array([comp[f'Mean_{c}'] for c in conditions])
+    mu = mu.mean() + effect_scale * (mu - mu.mean())
+    u = rng.normal(0, np.sqrt(comp['Var_Participant']), size=(n_sims, n, 1))
+    e = rng.normal(0, np.sqrt(comp['Var_Residual']), size=(n_sims, n, len(conditions)))
+    y = mu + u + e
+
+    scale = SCALES.get(metric, ('continuous',))
+    if scale[0] == 'likert':
+        y = np.clip(np.rint(y), scale[1], scale[2])
+    elif scale[0] == 'rate':
+        y = np.clip(y, scale[1], scale[2])
+    elif scale[0] == 'rank':
+        # 값이 작을수록 선호 (1순위)
+        y = _rank_small(y)[0]
+    return y
+
+
+def power_curves(components, metrics=None, n_grid=N_GRID, n_sims=N_SIMS, alpha=ALPHA,
+                 effect_scale=1.0, seed=0, conditions=CONDITIONS, pairs=CONDITION_PAIRS):
+    metrics = list(components.index) if metrics is None else metrics
+    rng = np.random.default_rng(seed)
+    idx = {c: i for i, c in enumerate(conditions)}
+    i1 = [idx[a] for a, _ in pairs]
+    i2 = [idx[b] for _, b in pairs]
+
+    rows = []
+    for metric in metrics:
+        for n in n_grid:
+            sig_fr, sig_wx = 0, np.zeros(len(pairs))
+            chunk = max(1, CHUNK_VALUES // (n * len(conditions)))
+            for start in range(0, n_sims, chunk):
+                s = min(chunk, n_sims - start)
+                y = simulate(components, metric, n, s, rng, conditions, effect_scale)
+                _, p_fr = friedman_batch(y)
+                sig_fr += np.sum(p_fr < alpha)
+
+                # 사후 검정: 쌍 전체를 (S*쌍, N) 로 한 번에, 보정은 연구(시뮬레이션)마다 Holm
+                d = (y[:, :, i1] - y[:, :, i2]).transpose(0, 2, 1).reshape(s * len(pairs), n)
+                _, p_wx = wilcoxon_batch(d)
+                p_holm = adjust_pvalues(p_wx.reshape(s, len(pairs)), 'holm')
+                sig_wx += np.sum(p_holm < alpha, axis=0)
+
+            rows.append({'Metric': metric, 'Test': 'friedman', 'Comparison': 'omnibus', 'N': n,
+                         'Power': sig_fr / n_sims})
+            for (a, b), k in zip(pairs, sig_wx):
+                rows.append({'Metric': metric, 'Test': 'wilcoxon_holm', 'Comparison': f'{a} vs {b}', 'N': n,
+                             'Power': k / n_sims})
+    return pd.DataFrame(rows)
+
+
+def required_n(curves, target=TARGET_POWER):
+    # 목표 검정력에 처음 도달하는 N (도달 못 하면 NaN)
+    reached = curves[curves['Power'] >= target]
+    out = reached.groupby(['Metric', 'Test', 'Comparison'])['N'].min()
+    return out.reindex(curves.groupby(['Metric', 'Test', 'Comparison']).size().index)
+
+
+def load_components(metrics=None):
+    frames = []
+    if os.path.exists(PROCESS_PATH):
+        frames.append(trials_to_long(pd.read_csv(PROCESS_PATH), TRIAL_METRICS))
+    if os.path.exists(MAPPED_PATH):
+        frames.append(mapped_to_long(pd.read_csv(MAPPED_PATH), SURVEY_METRICS))
+    long_df = pd.concat(frames, ignore_index=True)
+    _, arr, metric_names = build_wide_array(long_df, metrics)
+    return estimate_components(arr, metric_names)
+
+# ==========================================
+# 5. 실행
+# ==========================================
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description='Wilcoxon/Friedman 설계 시뮬레이션 검정력 분석')
+    parser.add_argument('--metrics', nargs='+', default=None)
+    parser.add_argument('--n-min', type=int, default=N_GRID[0])
+    parser.add_argument('--n-max', type=int, default=N_GRID[-1])
+    parser.add_argument('--step', type=int, default=10)
+    parser.add_argument('--sims', type=int, default=N_SIMS)
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--effect-scale', type=float, default=1.0, help='파일럿 효과 크기 배율 (보수적 가정용)')
+    args = parser.parse_args()
+
+    print("🔄 파일럿 데이터에서 분산 성분 추정 중...")
+    components = load_components(args.metrics)
+    print(components.round(3).to_string())
+
+    n_grid = list(range(args.n_min, args.n_max + 1, args.step))
+    start = time.perf_counter()
+    curves = power_curves(components, n_grid=n_grid, n_sims=args.sims, alpha=args.alpha,
+                          effect_scale=args.effect_scale)
+    print(f"\n⚡ {len(components)}개 지표 x {len(n_grid)}개 N x {args.sims}회 시뮬레이션 "
+          f"({time.perf_counter() - start:.1f} s)")
+
+    save_path = os.path.join(RESULT_DIR, 'power_curves.csv')
+    curves.to_csv(save_path, index=False, encoding='utf-8-sig')
+    print(f"💾 검정력 곡선 저장 완료: {save_path}")
+
+    print(f"\n[검정력 {TARGET_POWER:.0%} 달성에 필요한 최소 N (범위 내 미달성은 NaN)]")
+    print(required_n(curves).to_string())
+
+    import seaborn as sns
+
+    sns.set(style="whitegrid", font_scale=1.0)
+    g = sns.relplot(data=curves, x='N', y='Power', hue='Comparison', col='Metric', col_wrap=4,
+                    kind='line', height=3, aspect=1.2)
+    for ax in g.axes.flat:
+        ax.axhline(TARGET_POWER, color='gray', ls='--', lw=0.8)
+        ax.set_ylim(0, 1.02)
+    g.fig.suptitle('Simulated Power (Friedman omnibus / Holm-corrected Wilcoxon)', y=1.02, fontweight='bold')
+    g.savefig(os.path.join(RESULT_DIR, 'Fig13_Power_Curves.png'), dpi=200, bbox_inches='tight')
+    print("✅ Fig13_Power_Curves.png 저장 완료")
@@ -0,0 +1,396 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+import time
+import sqlite3
+import argparse
+from session_store import SessionArchive, TRIAL_FIELDS, resolve_source, iter_sessions
+from participant_registry import build_registry, load_survey, participant_key, SURVEY_PATH
+from device_norm import device_signature, signature_key
+
+# ==========================================
+# 1. 설정 및 테이블 스키마
+# ==========================================
+DATA_DIR = os.environ.get('HIM_DATA_DIR', './data')
+
+# trials 테이블 컬럼: (쿼리 컬럼명 -> 원본 JSON 시행 딕셔너리 내 경로)
+TRIAL_COLUMNS = {
+    'Trial': ('trial',),
+    'Target': ('targetString',),
+    'Input': ('userInput',),
+    'CompletionTime': ('completionTime',),
+    'TypingTime': ('typingTime',),
+    'Error': ('error',),
+    'Button_X': ('buttonPosition', 'x'),
+    'Button_Y': ('buttonPosition', 'y'),
+    'Zone': ('buttonPosition', 'zone'),
+    'Touch_X': ('buttonTouchPosition', 'x'),
+    'Touch_Y': ('buttonTouchPosition', 'y'),
+    'Generation_Method': ('buttonPosition', 'generationMethod'),
+    'Selected_Angle': ('buttonPosition', 'details', 'selectedPointAngle'),
+    'Selected_Distance': ('buttonPosition', 'details', 'selectedPointDistance'),
+}
+# 아카이브에서 별도 컬럼 블록으로 저장된 경로 (나머지는 '_extra' 블록에 있음)
+_ARCHIVE_COL = {path: col for col, path in TRIAL_FIELDS}
+
+CALIBRATION_COLUMNS = {'X': 'x', 'Y': 'y', 'Timestamp': 'timestamp', 'Reachable': 'reachable'}
+
+# 읽는 단계에서 바로 거를 수 있는 등호 조건 컬럼 (참가자는 세션 단위, 조건은 시행 단위)
+PUSHDOWN_COLUMNS = {
+    'trials': ['Participant_ID', 'Participant', 'Condition'],
+    'calibration': ['Participant_ID'],
+}
+
+# 항상 함께 로드되는 키 컬럼 (인덱스 대상 포함)
+KEY_COLUMNS = {
+    'trials': ['Participant_ID', 'Participant', 'Condition', 'Exp_Order', 'Trial', 'Zone'],
+    'calibration': ['Participant_ID', 'Seq'],
+}
+TABLES = ['trials', 'calibration', 'circles', 'survey']
+
+# B-tree 인덱스 (등호·범위 조건 모두 사용 가능)
+INDEXES = {
+    'trials': [('Participant_ID',), ('Condition',), ('Zone',), ('Condition', 'Zone')],
+    'calibration': [('Participant_ID',)],
+    'circles': [('Participant_ID',)],
+    'survey': [('Participant_ID',)],
+}
+
+_IDENT = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+def _get(d, path):
+    for key in path:
+        if not isinstance(d, dict) or key not in d:
+            return None
+        d = d[key]
+    return d
+
+
+def _participant_keys(meta):
+    return participant_key(meta['participant'])
+
+
+def _tokens(text):
+    return {t.casefold() for t in _IDENT.findall(text or '')}
+
+
+def _values(value):
+    # 등호 조건 값 -> 집합 (리스트면 IN)
+    if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)):
+        return set(value)
+    return {value}
+
+
+def _session_match(meta, filters):
+    # 참가자 조건은 세션 메타만 보고 판단 (맞지 않는 세션은 시행 블록을 읽지 않음)
+    if not filters:
+        return True
+    pid, name = _participant_keys(meta)
+    return pid in filters.get('Participant_ID', {pid}) and name in filters.get('Participant', {name})
+
+
+def _filter_rows(df, filters):
+    if filters and 'Condition' in filters and len(df):
+        df = df[df['Condition'].isin(filters['Condition'])].reset_index(drop=True)
+    return df
+
+
+class _Percentile:
+    # SQL 집계 함수 percentile(값, q)  예) SELECT percentile(Radius, 25) FROM circles
+    def __init__(self):
+        self.values, self.q = [], 50.0
+
+    def step(self, value, q):
+        if value is not None:
+            self.values.append(value)
+        self.q = q
+
+    def finalize(self):
+        return float(np.percentile(self.values, self.q)) if self.values else None
+
+# ==========================================
+# 2. 테이블 로더 (필요한 컬럼 블록만 읽고, filters 의 참가자/조건에 맞는 행만 남김)
+# ==========================================
+def _trial_frame(meta, conditions, exp_index, data):
+    pid, name = _participant_keys(meta)
+    orders = np.array([exp.get('order') for exp in meta['experiments']], dtype=object)
+    df = pd.DataFrame(data, index=range(len(conditions)))
+    df.insert(0, 'Participant_ID', pid)
+    df.insert(1, 'Participant', name)
+    df.insert(2, 'Condition', list(conditions))
+    df.insert(3, 'Exp_Order', orders[np.asarray(exp_index, dtype=int)] if len(orders) else None)
+    return df
+
+
+def load_trials(data_dir=DATA_DIR, columns=None, filters=None):
+    # filters: {'Participant_ID' / 'Participant' / 'Condition': 값 집합}
+    columns = [c for c in (columns or TRIAL_COLUMNS) if c in TRIAL_COLUMNS]
+    paths = {c: TRIAL_COLUMNS[c] for c in columns}
+    frames = []
+    source = resolve_source(data_dir)
+
+    if os.path.isfile(source):
+        need = {'condition', 'exp_index'} | {_ARCHIVE_COL.get(p, '_extra') for p in paths.values()}
+        with SessionArchive(source) as archive:
+            for i in range(len(archive)):
+                meta = archive.read_meta(i)
+                if not _session_match(meta, filters):
+                    continue
+                if filters and 'Condition' in filters:
+                    conditions = archive.read_trials(i, ['condition'])['condition']
+                    if not set(conditions) & filters['Condition']:
+                        continue
+                cols = archive.read_trials(i, need)
+                data = {}
+                for c, p in paths.items():
+                    if p in _ARCHIVE_COL:
+                        data[c] = cols[_ARCHIVE_COL[p]]
+                    else:
+                        data[c] = [_get(extra, p) for extra in cols['_extra']]
+                frames.append(_filter_rows(_trial_frame(meta, cols['condition'], cols['exp_index'], data), filters))
+    else:
+        for _, session in iter_sessions(source, include_calibration=False):
+            if not _session_match(session, filters):
+                continue
+            conditions, exp_index, data = [], [], {c: [] for c in paths}
+            for k, exp in enumerate(session['experiments']):
+                for trial in exp['trials']:
+                    conditions.append(exp['condition'])
+                    exp_index.append(k)
+                    for c, p in paths.items():
+                        data[c].append(_get(trial, p))
+            frames.append(_filter_rows(_trial_frame(session, conditions, exp_index, data), filters))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def load_calibration(data_dir=DATA_DIR, columns=None, filters=None):
+    columns = [c for c in (columns or CALIBRATION_COLUMNS) if c in CALIBRATION_COLUMNS]
+    frames = []
+    source = resolve_source(data_dir)
+
+    def frame(meta, arrays):
+        pid, _ = _participant_keys(meta)
+        n = len(next(iter(arrays.values()))) if arrays else len(meta['calibration'].get('points', []))
+        df = pd.DataFrame({c: np.asarray(arrays[CALIBRATION_COLUMNS[c]]) for c in columns}, index=range(n))
+        df.insert(0, 'Participant_ID', pid)
+        df.insert(1, 'Seq', np.arange(n))
+        return df
+
+    if os.path.isfile(source):
+        with SessionArchive(source) as archive:
+            for i in range(len(archive)):
+                meta = archive.read_meta(i)
+                if not _session_match(meta, filters):
+                    continue
+                arrays = archive.read_calibration(i, [CALIBRATION_COLUMNS[c] for c in columns] or ['x'])
+                frames.append(frame(meta, arrays))
+    else:
+        for _, session in iter_sessions(source):
+            if not _session_match(session, filters):
+                continue
+            points = session.get('calibration', {}).get('points', [])
+            arrays = {k: [p.get(k) for p in points] for k in CALIBRATION_COLUMNS.values()}
+            frames.append(frame(session, arrays))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def load_circles(data_dir=DATA_DIR):
+    rows = []
+    for file_path, data in iter_sessions(data_dir, include_calibration=False):
+        pid, name = _participant_keys(data)
+        circle = data.get('circleData') or {}
+        rows.append({
+            'Participant_ID': pid,
+            'Participant': name,
+            'Handedness': data['participant'].get('handedness'),
+            'Device': signature_key(device_signature(data.get('deviceInfo'))),
+            'Center_X': _get(circle, ('circleCenter', 'x')),
+            'Center_Y': _get(circle, ('circleCenter', 'y')),
+            'Center_Type': circle.get('circleCenterType'),
+            'Radius': circle.get('radius'),
+            'Max_Distance': circle.get('maxDistance'),
+            'Border_Threshold': circle.get('borderThreshold'),
+            'Centroid_X': _get(circle, ('centroid', 'x')),
+            'Centroid_Y': _get(circle, ('centroid', 'y')),
+            'File': file_path,
+        })
+    return pd.DataFrame(rows)
+
+
+def load_survey_table(data_dir=DATA_DIR, survey_path=SURVEY_PATH):
+    df, _ = load_survey(build_registry(data_dir), survey_path)
+    return df
+
+# ==========================================
+# 3. 쿼리 레이어 (SQLite 인메모리 + 지연 로딩)
+# ==========================================
+class QueryLayer:
+    def __init__(self, data_dir=DATA_DIR, survey_path=SURVEY_PATH, db_path=':memory:'):
+        self.data_dir = data_dir
+        self.survey_path = survey_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.create_aggregate('percentile', 2, _Percentile)
+        self._loaded = {}  # 테이블 -> 로드된 컬럼 집합
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _available(self, table):
+        if table == 'trials':
+            return KEY_COLUMNS['trials'] + [c for c in TRIAL_COLUMNS if c not in KEY_COLUMNS['trials']]
+        if table == 'calibration':
+            return KEY_COLUMNS['calibration'] + list(CALIBRATION_COLUMNS)
+        return None  # circles / survey 는 작으므로 전체 로드
+
+    def _ensure(self, table, tokens=None):
+        # tokens: 쿼리에 등장한 식별자 (None 이면 전체 컬럼)
+        available = self._available(table)
+        if available is None:
+            if table in self._loaded:
+                return
+            df = load_circles(self.data_dir) if table == 'circles' else load_survey_table(self.data_dir, self.survey_path)
+            self._store(table, df, set(df.columns))
+            return
+
+        wanted = self._wanted(table, tokens)
+        loaded = self._loaded.get(table, set())
+        if wanted <= loaded:
+            return
+        columns = sorted(wanted | loaded, key=available.index)
+        self._store(table, self._load(table, columns), set(columns))
+
+    def _wanted(self, table, tokens):
+        available = self._available(table)
+        if tokens is None:
+            return set(available)
+        return set(KEY_COLUMNS[table]) | {c for c in available if c.casefold() in tokens}
+
+    def _load(self, table, columns, filters=None):
+        if table == 'trials':
+            df = load_trials(self.data_dir, columns, filters)
+        else:
+            df = load_calibration(self.data_dir, columns, filters)
+        return df[columns] if len(df) else pd.DataFrame(columns=columns)
+
+    def _store(self, table, df, columns):
+        df.to_sql(table, self.conn, if_exists='replace', index=False)
+        for cols in INDEXES.get(table, []):
+            if set(cols) <= columns:
+                name = f"idx_{table}_{'_'.join(c.lower() for c in cols)}"
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(cols)})')
+        self.conn.commit()
+        self._loaded[table] = columns
+
+    def table(self, name, columns=None):
+        self._ensure(name, None if columns is None else {c.casefold() for c in columns})
+        return self
+
+    # ---------- SQL ----------
+    def _prepare(self, query):
+        # 쿼리에 등장한 테이블만, 등장한 컬럼만 로드 ('*' 가 있으면 전체 컬럼)
+        tokens = _tokens(query)
+        full = '*' in query
+        for table in TABLES:
+            if table in tokens:
+                self._ensure(table, None if full else tokens)
+
+    def sql(self, query, params=()):
+        self._prepare(query)
+        return pd.read_sql_query(query, self.conn, params=[_py(v) for v in params])
+
+    def explain(self, query, params=()):
+        self._prepare(query)
+        return [row[-1] for row in self.conn.execute(f'EXPLAIN QUERY PLAN {query}', [_py(v) for v in params])]
+
+    # ---------- 표현식 API ----------
+    def select(self, table, columns=None, where=None, params=(), order_by=None, **eq):
+        # eq: 컬럼=값 (리스트면 IN) 조건은 파라미터 바인딩으로 인덱스를 그대로 사용
+        clauses, args = [], []
+        for col, value in eq.items():
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)):
+                values = list(value)
+                clauses.append(f'"{col}" IN ({", ".join("?" * len(values))})')
+                args.extend(values)
+            else:
+                clauses.append(f'"{col}" = ?')
+                args.append(value)
+        if where:
+            clauses.append(f'({where})')
+            args.extend(params)
+
+        tokens = None if columns is None else ({c.casefold() for c in columns} | {c.casefold() for c in eq}
+                                                | _tokens(where) | _tokens(order_by))
+        source = table
+        filters = {c: _values(v) for c, v in eq.items() if c in PUSHDOWN_COLUMNS.get(table, [])}
+        if filters and not self._wanted(table, tokens) <= self._loaded.get(table, set()):
+            # 아직 캐시에 없으면 테이블 전체 대신 참가자/조건이 맞는 행만 읽어 임시 테이블에서 조회
+            # (캐시는 그대로 두고, 나머지 조건은 SQLite 에서 평가)
+            available = self._available(table)
+            df = self._load(table, sorted(self._wanted(table, tokens), key=available.index), filters)
+            df.to_sql('_pushdown', self.conn, if_exists='replace', index=False)
+            source = '_pushdown'
+        else:
+            self._ensure(table, tokens)
+
+        projection = ', '.join(f'"{c}"' for c in columns) if columns else '*'
+        query = f'SELECT {projection} FROM {source}'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        if order_by:
+            query += f' ORDER BY {order_by}'
+        return pd.read_sql_query(query, self.conn, params=[_py(v) for v in args])
+
+
+def _py(value):
+    # numpy 스칼라는 sqlite3 바인딩이 안 되므로 파이썬 기본형으로
+    return value.item() if isinstance(value, np.generic) else value
+
+# ==========================================
+# 4. 실행 (예시 쿼리 또는 임의 SQL)
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='시행/캘리브레이션/원/설문 테이블 SQL 조회')
+    parser.add_argument('query', nargs='?', default=None, help='실행할 SQL (생략 시 예시 쿼리)')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--explain', action='store_true', help='쿼리 실행 계획 출력')
+    args = parser.parse_args()
+
+    with QueryLayer(args.data_dir) as q:
+        if args.query:
+            if args.explain:
+                print('\n'.join(q.explain(args.query)))
+            print(q.sql(args.query).to_string(index=False))
+        else:
+            examples = [
+                ("adaptive 조건, 선택 각도 > 240°, 오류 없음",
+                 "SELECT Participant, Trial, Selected_Angle, CompletionTime FROM trials "
+                 "WHERE Condition = 'adaptive' AND Selected_Angle > 240 AND Error = 0 "
+                 "ORDER BY Selected_Angle DESC"),
+                ("반경이 하위 25% 미만인 참가자",
+                 "SELECT Participant, Radius FROM circles "
+                 "WHERE Radius < (SELECT percentile(Radius, 25) FROM circles) ORDER BY Radius"),
+                ("조건 x 영역별 평균 완료 시간",
+                 "SELECT Condition, Zone, COUNT(*) AS N, AVG(CompletionTime) AS Mean_Time "
+                 "FROM trials GROUP BY Condition, Zone ORDER BY Condition, Zone"),
+            ]
+            for title, query in examples:
+                start = time.perf_counter()
+                result = q.sql(query)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"\n🔎 {title} ({len(result)}행, {elapsed:.1f} ms)")
+                print(result.to_string(index=False))
+
+            start = time.perf_counter()
+            q.select('trials', ['Participant', 'Zone', 'CompletionTime'], Condition='adaptive', Zone='adaptive-circle-border-angle')
+            print(f"\n⚡ 캐시된 테이블 인덱스 조회: {(time.perf_counter() - start) * 1000:.2f} ms")
+            print("📋 실행 계획:", q.explain("SELECT * FROM trials WHERE Condition = 'fixed' AND Zone = 'top-right-fixed'"))
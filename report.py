@@ -0,0 +1,320 @@
+import pandas as pd
+import os
+import io
+import json
+import glob
+import html
+import base64
+import hashlib
+import argparse
+import warnings
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats
+from batch_stats import trials_to_long, run_batch_tests, CONDITIONS, TRIAL_METRICS
+
+# ==========================================
+# 1. 설정
+# ==========================================
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+REPORT_NAME = 'report.html'
+CACHE_DIR = './.cache/report'   # 결과 폴더별 하위 폴더에 섹션별 HTML 조각 + 입력 해시
+
+PREVIEW_WIDTH = 900             # 미리보기 최대 폭 (px)
+PREVIEW_QUALITY = 80            # 미리보기 JPEG 품질
+
+# 보고서 그림을 만드는 분석 단계 (cohort_runner 의 단계 이름)
+FIGURE_STAGES = ['01', '02', '03', '04', '05', 'test.py', '06']
+
+# ==========================================
+# 2. 섹션별 테이블 (결과 CSV에서 계산)
+# ==========================================
+def _read(result_dir, name):
+    path = os.path.join(result_dir, name)
+    return pd.read_csv(path) if os.path.exists(path) else None
+
+
+def descriptive_tables(result_dir):
+    # 02 perform_stats 의 기술 통계 (시행 단위 조건별 평균 / 표준편차 / 중앙값)
+    df = _read(result_dir, 'processed_data.csv')
+    if df is None:
+        return []
+    desc = df.groupby('Condition')[TRIAL_METRICS].agg(['count', 'mean', 'std', 'median'])
+    desc = desc.stack(level=0, future_stack=True).rename_axis(['Condition', 'Metric']).reset_index()
+    desc['Condition'] = pd.Categorical(desc['Condition'], categories=CONDITIONS, ordered=True)
+    desc = desc.sort_values(['Metric', 'Condition'])[['Metric', 'Condition', 'count', 'mean', 'std', 'median']]
+    desc.columns = ['Metric', 'Condition', 'N_Trials', 'Mean', 'SD', 'Median']
+    return [('조건별 시행 지표 (시행 단위)', desc)]
+
+
+def trial_test_tables(result_dir):
+    # 02 에서 저장한 일괄 검정 결과 (없으면 processed_data.csv 로 다시 계산)
+    tests = _read(result_dir, 'stats_results_trials.csv')
+    if tests is None:
+        df = _read(result_dir, 'processed_data.csv')
+        if df is None:
+            return []
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            tests = run_batch_tests(trials_to_long(df, TRIAL_METRICS))
+    cols = ['Metric', 'Test', 'Condition_1', 'Condition_2', 'N', 'Statistic', 'p', 'p_holm', 'Significance']
+    return [('Friedman / Wilcoxon (Holm 보정)', tests[tests['Test'] != 'shapiro'][cols]),
+            ('정규성 검정 (Shapiro-Wilk)', tests[tests['Test'] == 'shapiro'][['Metric', 'Condition_1', 'N',
+                                                                             'Statistic', 'p']])]
+
+
+def learning_tables(result_dir):
+    fits = _read(result_dir, 'learning_curve_fits.csv')
+    if fits is None:
+        return []
+    summary = fits.groupby(['Model', 'Condition'])[['Asymptote', 'Gain', 'Learning_Rate', 'Stable_Trial', 'R2']] \
+        .median().reset_index()
+    return [('학습 곡선 적합 (참가자별 중앙값)', summary)]
+
+
+def personalization_tables(result_dir):
+    # 02 의 RQ3: Reachable Radius 와 고정 배치 대비 이득의 상관
+    df = _read(result_dir, 'processed_data.csv')
+    if df is None:
+        return []
+    perf = df.pivot_table(index=['Participant', 'Reachable_Radius'], columns='Condition',
+                          values=['SearchTime', 'Offset']).reset_index()
+    rows = []
+    for label, metric in [('Time_Saving', 'SearchTime'), ('Accuracy_Gain', 'Offset')]:
+        gain = perf[(metric, 'fixed')] - perf[(metric, 'adaptive')]
+        r, p = stats.pearsonr(perf['Reachable_Radius'], gain)
+        rows.append({'Comparison': f'Radius vs {label}', 'N': len(gain), 'r': r, 'p': p})
+    return [('Reachable Radius 와 성능 이득의 상관 (Pearson)', pd.DataFrame(rows))]
+
+
+def preference_tables(result_dir):
+    tests = _read(result_dir, 'preference_tests.csv')
+    return [('선호 순위 Friedman / 사후 Wilcoxon (Holm 보정)', tests)] if tests is not None else []
+
+
+def tlx_tables(result_dir):
+    tests = _read(result_dir, 'tlx_tests.csv')
+    return [('주관 평가 Friedman / 사후 Wilcoxon (Holm 보정)', tests)] if tests is not None else []
+
+
+def touch_tables(result_dir):
+    ellipses = _read(result_dir, 'touch_offset_ellipses.csv')
+    if ellipses is None:
+        return []
+    by_cond = ellipses.groupby('Condition')[['Bias_X', 'Bias_Y', 'Bias_Norm', 'Ellipse_Major', 'Ellipse_Minor',
+                                             'We_2D']].median().reset_index()
+    return [('터치 편향 / 95% 타원 (참가자별 중앙값, mm)', by_cond)]
+
+# ==========================================
+# 3. 섹션 정의
+# ==========================================
+# inputs: 섹션 내용이 의존하는 결과 파일 (내용 해시가 같으면 이전 빌드의 HTML 조각을 재사용)
+SECTIONS = [
+    {'id': 'descriptive', 'title': '1. 기술 통계', 'tables': descriptive_tables,
+     'inputs': ['processed_data.csv'], 'figures': ['Fig1_Efficiency.png', 'Fig4_Offset_Distribution.png']},
+    {'id': 'trial_tests', 'title': '2. 시행 지표 검정', 'tables': trial_test_tables,
+     'inputs': ['stats_results_trials.csv', 'processed_data.csv'], 'figures': []},
+    {'id': 'learning', 'title': '3. 학습 효과', 'tables': learning_tables,
+     'inputs': ['learning_curve_fits.csv'], 'figures': ['Fig2_LearningCurve.png', 'Fig9_Learning_Curve_Fit.png']},
+    {'id': 'personalization', 'title': '4. 개인화 필요성', 'tables': personalization_tables,
+     'inputs': ['processed_data.csv'], 'figures': ['Fig3_Personalization.png']},
+    {'id': 'preference', 'title': '5. 선호 순위', 'tables': preference_tables,
+     'inputs': ['preference_tests.csv'], 'figures': ['Fig8_Preference_Ranks.png', 'Fig6_Mapped_Preference.png']},
+    {'id': 'tlx', 'title': '6. 주관 평가 (TLX)', 'tables': tlx_tables,
+     'inputs': ['tlx_tests.csv'], 'figures': ['Fig_TLX_Radar_Chart.png', 'Fig_TLX_Physical_Effort.png',
+                                              'Fig_TLX_Accessibility.png', 'Fig_TLX_Grip_Instability.png',
+                                              'Fig7_Mapped_Ratings.png']},
+    {'id': 'touch', 'title': '7. 터치 히트맵', 'tables': touch_tables,
+     'inputs': ['touch_offset_ellipses.csv'],
+     'figures': ['Fig5_Touch_Heatmap.png', 'Fig10_Spatial_Performance.png', 'Fig11_Polar_Performance.png']},
+]
+
+
+def other_figures(result_dir, sections=SECTIONS):
+    # 섹션에 배정되지 않은 나머지 그림 (추가 분석 스크립트 결과)
+    used = {f for s in sections for f in s['figures']}
+    return [os.path.basename(p) for p in sorted(glob.glob(os.path.join(result_dir, 'Fig*.png')))
+            if os.path.basename(p) not in used]
+
+
+def _file_hash(path, h):
+    if not os.path.exists(path):
+        h.update(b'missing')
+        return
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+
+
+def section_key(section, result_dir, report_dir):
+    h = hashlib.sha1()
+    _file_hash(os.path.abspath(__file__), h)  # 보고서 코드가 바뀌면 모든 섹션을 다시 생성
+    # 그림 링크는 보고서 위치 기준 상대 경로이므로 두 폴더 경로도 키에 포함
+    h.update(json.dumps([section['id'], section['title'], section['inputs'], section['figures'],
+                         os.path.abspath(result_dir), report_dir]).encode('utf-8'))
+    for name in section['inputs'] + section['figures']:
+        h.update(name.encode('utf-8'))
+        _file_hash(os.path.join(result_dir, name), h)
+    return h.hexdigest()
+
+
+def cache_dir_for(result_dir, cache_dir=CACHE_DIR):
+    # 결과 폴더마다 별도 캐시 (코호트별 보고서가 서로의 조각/인덱스를 덮어쓰지 않도록)
+    tag = hashlib.sha1(os.path.abspath(result_dir).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, tag)
+
+
+def _write_atomic(path, text):
+    # 임시 파일에 쓴 뒤 교체 (중간에 끊기거나 동시에 빌드해도 반쯤 쓴 파일이 남지 않음)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+# ==========================================
+# 4. 그림 미리보기 (축소 JPEG, 프로세스 풀에서 병렬 생성)
+# ==========================================
+def make_preview(path, width=PREVIEW_WIDTH, quality=PREVIEW_QUALITY):
+    from PIL import Image
+
+    with Image.open(path) as img:
+        full_size = img.size
+        img = img.convert('RGBA')
+        # 투명 배경은 흰색으로 합성한 뒤 JPEG로
+        canvas = Image.new('RGB', img.size, 'white')
+        canvas.paste(img, mask=img.split()[-1])
+        canvas.thumbnail((width, width * 4))
+        buf = io.BytesIO()
+        canvas.save(buf, 'JPEG', quality=quality, optimize=True)
+    return base64.b64encode(buf.getvalue()).decode('ascii'), full_size
+
+
+def build_previews(paths, max_workers=None):
+    paths = [p for p in paths if os.path.exists(p)]
+    if not paths:
+        return {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(paths, pool.map(make_preview, paths)))
+
+# ==========================================
+# 5. HTML 조립
+# ==========================================
+def table_html(df):
+    return df.to_html(index=False, border=0, classes='table', na_rep='',
+                      float_format=lambda v: f'{v:.4g}', escape=True)
+
+
+def figure_html(name, preview, report_dir, result_dir):
+    data, (w, h) = preview
+    href = os.path.relpath(os.path.join(result_dir, name), report_dir).replace(os.sep, '/')
+    return (f'<figure><a href="{html.escape(href)}"><img src="data:image/jpeg;base64,{data}" '
+            f'alt="{html.escape(name)}"></a><figcaption>{html.escape(name)} '
+            f'(원본 {w}x{h}px, 클릭하면 원본)</figcaption></figure>')
+
+
+def section_html(section, result_dir, report_dir, previews):
+    parts = [f'<section id="{section["id"]}"><h2>{html.escape(section["title"])}</h2>']
+    tables = section['tables'](result_dir) if section.get('tables') else []
+    for caption, df in tables:
+        parts.append(f'<h3>{html.escape(caption)}</h3>')
+        parts.append(table_html(df))
+    for name in section['figures']:
+        path = os.path.join(result_dir, name)
+        if path in previews:
+            parts.append(figure_html(name, previews[path], report_dir, result_dir))
+    if len(parts) == 1:
+        parts.append('<p class="missing">결과 파일이 없습니다. 해당 분석 스크립트를 먼저 실행하세요.</p>')
+    parts.append('</section>')
+    return '\n'.join(parts)
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="ko"><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: -apple-system, 'Malgun Gothic', sans-serif; max-width: 1100px; margin: 2em auto; color: #222; }}
+nav a {{ margin-right: 1em; }}
+.table {{ border-collapse: collapse; font-size: 0.85em; margin: 0.5em 0 1.5em; }}
+.table th, .table td {{ padding: 0.25em 0.6em; border-bottom: 1px solid #ddd; text-align: right; }}
+.table th {{ background: #f4f4f4; }}
+figure {{ display: inline-block; margin: 0.5em; vertical-align: top; }}
+figure img {{ max-width: 100%; border: 1px solid #eee; }}
+figcaption {{ font-size: 0.8em; color: #666; }}
+.missing {{ color: #a00; }}
+</style></head><body>
+<h1>{title}</h1>
+<p>생성 시각: {built} · 결과 폴더: {result_dir}</p>
+<nav>{nav}</nav>
+{body}
+</body></html>
+"""
+
+
+def build_report(result_dir=RESULT_DIR, out_path=None, max_workers=None, force=False):
+    out_path = out_path or os.path.join(result_dir, REPORT_NAME)
+    report_dir = os.path.dirname(os.path.abspath(out_path))
+    sections = SECTIONS + [{'id': 'other', 'title': '8. 기타 그림', 'tables': None, 'inputs': [],
+                            'figures': other_figures(result_dir)}]
+
+    cache_dir = cache_dir_for(result_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = os.path.join(cache_dir, 'index.json')
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+    keys = {s['id']: section_key(s, result_dir, report_dir) for s in sections}
+    fragment_path = {s['id']: os.path.join(cache_dir, s['id'] + '.html') for s in sections}
+    stale = [s for s in sections if force or index.get(s['id']) != keys[s['id']]
+             or not os.path.exists(fragment_path[s['id']])]
+
+    # 바뀐 섹션의 그림만 한 번에 병렬로 축소
+    previews = build_previews([os.path.join(result_dir, f) for s in stale for f in s['figures']], max_workers)
+
+    body = []
+    for s in sections:
+        if s in stale:
+            fragment = section_html(s, result_dir, report_dir, previews)
+            _write_atomic(fragment_path[s['id']], fragment)
+            index[s['id']] = keys[s['id']]
+        else:
+            with open(fragment_path[s['id']], 'r', encoding='utf-8') as f:
+                fragment = f.read()
+        body.append(fragment)
+
+    _write_atomic(index_path, json.dumps(index, indent=2))
+
+    nav = ''.join(f'<a href="#{s["id"]}">{html.escape(s["title"])}</a>' for s in sections)
+    page = PAGE.format(title='원핸드 키보드 버튼 배치 실험 결과 보고서', built=datetime.now().strftime('%Y-%m-%d %H:%M'),
+                       result_dir=html.escape(os.path.abspath(result_dir)), nav=nav, body='\n'.join(body))
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return out_path, [s['id'] for s in stale]
+
+# ==========================================
+# 6. 실행
+# ==========================================
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description='분석 결과(테이블 + 그림)를 HTML 보고서 하나로')
+    parser.add_argument('--out', default=None, help=f'보고서 경로 (기본: {RESULT_DIR}/{REPORT_NAME})')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-run', action='store_true', help='분석 스크립트를 실행하지 않고 기존 결과만 모음')
+    parser.add_argument('--force', action='store_true', help='이전 빌드의 섹션을 재사용하지 않음')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if not args.no_run:
+        # 그림/테이블을 만드는 스크립트를 병렬 실행 (입력이 그대로인 단계는 cohort_runner 가 건너뜀)
+        from cohort_runner import run_cohorts, default_cohorts
+        print("🔄 분석 단계 확인 중...")
+        report, _ = run_cohorts(default_cohorts(), args.workers, stages=FIGURE_STAGES)
+        print(report[['Stage', 'Status', 'Seconds']].to_string(index=False))
+        for _, r in report[report['Status'].isin(['failed', 'blocked'])].iterrows():
+            print(f"⚠️ 경고: {r['Stage']} {r['Status']} - 기존 결과 파일로 보고서를 만듭니다.")
+
+    out_path, rebuilt = build_report(RESULT_DIR, args.out, args.workers, args.force)
+    print(f"🧩 다시 만든 섹션: {', '.join(rebuilt) if rebuilt else '없음 (모두 이전 빌드 재사용)'}")
+    print(f"💾 보고서 저장 완료: {out_path} ({os.path.getsize(out_path) / 1024:.0f} KB, "
+          f"{time.perf_counter() - start:.1f} s)")
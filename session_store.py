@@ -0,0 +1,676 @@
+import numpy as np
+import pandas as pd
+import os
+import io
+import json
+import glob
+import zlib
+import struct
+import argparse
+from calib_codec import encode_points, decode_arrays, to_python
+from json_stream import iter_events
+
+# ==========================================
+# 1. 아카이브 포맷
+# ==========================================
+# [MAGIC][블록 ...][인덱스 JSON (zlib)][푸터: 인덱스 오프셋(8B), 인덱스 길이(8B), MAGIC]
+#
+# - 참가자마다 meta / trials / calibration 블록을 연속해서 기록
+# - trials 는 컬럼 단위 하위 블록으로 나눠 각각 압축
+# - calibration 은 calib_codec 델타/비트 인코딩 블록 하나 (인코딩할 수 없는 세션만 컬럼 단위)
+# - 인덱스(오프셋 테이블)만 읽으면 필요한 참가자·컬럼만 골라서 seek 가능
+# - 스트리밍 pack 은 긴 세션을 고정 크기 청크로 나눠 기록 ('{블록}@{청크 번호}', 0번 청크는 접미사 없음)
+MAGIC = b'HIMPACK1'
+FOOTER = struct.Struct('<QQ8s')
+ARCHIVE_EXT = '.himpack'
+
+# 시행(trial) 딕셔너리에서 컬럼으로 분리할 필드 (컬럼명, JSON 경로)
+TRIAL_FIELDS = [
+    ('trial', ('trial',)),
+    ('targetString', ('targetString',)),
+    ('userInput', ('userInput',)),
+    ('completionTime', ('completionTime',)),
+    ('typingTime', ('typingTime',)),
+    ('error', ('error',)),
+    ('button_x', ('buttonPosition', 'x')),
+    ('button_y', ('buttonPosition', 'y')),
+    ('zone', ('buttonPosition', 'zone')),
+    ('touch_x', ('buttonTouchPosition', 'x')),
+    ('touch_y', ('buttonTouchPosition', 'y')),
+]
+TRIAL_COLUMNS = ['condition', 'exp_index'] + [c for c, _ in TRIAL_FIELDS] + ['_extra']
+# 숫자 컬럼 (청크 안의 값이 모두 결측이면 None 만 모여 object dtype 이 되므로 float 로 맞춤)
+NUMERIC_TRIAL_COLUMNS = ['exp_index', 'trial', 'completionTime', 'typingTime',
+                         'button_x', 'button_y', 'touch_x', 'touch_y']
+CALIBRATION_FIELDS = ['x', 'y', 'timestamp', 'reachable']
+# 세션 컬럼(context)이 읽는 최상위 필드 (스트리밍 시 첫 시행 시점에 모두 읽혔는지 확인)
+SESSION_META_KEYS = ['participant', 'deviceInfo', 'circleData']
+
+_MISSING = object()
+
+# ==========================================
+# 2. 컬럼 인코딩 / 디코딩
+# ==========================================
+def _encode_column(values):
+    present = [v for v in values if v is not _MISSING]
+    is_bool = all(isinstance(v, bool) for v in present)
+    is_num = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present)
+
+    if present and is_bool and len(present) == len(values):
+        arr, attrs = np.array(values, dtype=bool), {}
+    elif present and is_num:
+        all_int = all(isinstance(v, int) for v in present)
+        if all_int and len(present) == len(values):
+            arr, attrs = np.array(values, dtype=np.int64), {}
+        else:
+            # 결측은 NaN, 정수 컬럼이었는지는 속성으로 기록해 복원 시 int로 되돌림
+            arr = np.array([np.nan if v is _MISSING else v for v in values], dtype=float)
+            attrs = {'int': all_int}
+            if not all_int:
+                # 정수/실수가 섞인 컬럼은 정수였던 행을 기록 (299 와 299.0 을 구분해서 복원)
+                int_rows = [i for i, v in enumerate(values) if isinstance(v, int)]
+                if int_rows:
+                    attrs['int_rows'] = int_rows
+    else:
+        payload = [None if v is _MISSING else v for v in values]
+        missing = [i for i, v in enumerate(values) if v is _MISSING]
+        return zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8')), \
+            {'codec': 'json', 'missing': missing}
+
+    buf = io.BytesIO()
+    np.save(buf, arr, allow_pickle=False)
+    return zlib.compress(buf.getvalue()), dict(attrs, codec='npy')
+
+
+def _decode_column(raw, attrs):
+    raw = zlib.decompress(raw)
+    if attrs['codec'] == 'hcal':
+        return decode_arrays(raw)
+    if attrs['codec'] == 'json':
+        return json.loads(raw.decode('utf-8'))
+    return np.load(io.BytesIO(raw), allow_pickle=False)
+
+
+def _column_to_python(arr, attrs):
+    # 복원용: 결측은 _MISSING, 정수 컬럼은 int로
+    if attrs['codec'] == 'json':
+        missing = set(attrs.get('missing', []))
+        return [_MISSING if i in missing else v for i, v in enumerate(arr)]
+    if arr.dtype.kind == 'f':
+        as_int = attrs.get('int', False)
+        int_rows = set(attrs.get('int_rows', []))
+        return [_MISSING if np.isnan(v) else (int(v) if as_int or i in int_rows else float(v))
+                for i, v in enumerate(arr)]
+    return arr.tolist()
+
+
+def _pop_path(d, path):
+    parent = d
+    for key in path[:-1]:
+        parent = parent.get(key) if isinstance(parent, dict) else None
+    if not isinstance(parent, dict) or path[-1] not in parent:
+        return _MISSING
+    value = parent.pop(path[-1])
+    # 비어버린 상위 딕셔너리는 제거 (복원 시 다시 생성)
+    if len(path) > 1 and not parent:
+        d.pop(path[0])
+    return value
+
+
+def _set_path(d, path, value):
+    if value is _MISSING:
+        return
+    for key in path[:-1]:
+        d = d.setdefault(key, {})
+    d[path[-1]] = value
+
+# ==========================================
+# 3. 세션 <-> 블록 분해
+# ==========================================
+def _trial_row(exp, exp_idx, trial):
+    # 시행 하나를 컬럼 값으로 분리 (trial 딕셔너리에는 컬럼으로 빠지지 않은 나머지 필드만 남음)
+    row = {'condition': exp.get('condition', _MISSING), 'exp_index': exp_idx}
+    for col, path in TRIAL_FIELDS:
+        row[col] = _pop_path(trial, path)
+    row['_extra'] = trial
+    return row
+
+
+def _split_session(data):
+    data = json.loads(json.dumps(data))  # 원본 변경 방지용 깊은 복사
+
+    trial_rows = []
+    for exp_idx, exp in enumerate(data.get('experiments', [])):
+        for trial in exp.pop('trials', []):
+            trial_rows.append(_trial_row(exp, exp_idx, trial))
+
+    points = data.get('calibration', {}).pop('points', [])
+    trials = {c: [r[c] for r in trial_rows] for c in TRIAL_COLUMNS}
+    return data, trials, points
+
+
+def _join_session(meta, trials, calibration):
+    data = json.loads(json.dumps(meta))
+    experiments = data.get('experiments', [])
+    for exp in experiments:
+        exp['trials'] = []
+
+    n_trials = len(trials.get('_extra', []))
+    for i in range(n_trials):
+        trial = trials['_extra'][i]
+        for col, path in TRIAL_FIELDS:
+            _set_path(trial, path, trials[col][i])
+        experiments[int(trials['exp_index'][i])]['trials'].append(trial)
+
+    if calibration is not None and 'calibration' in data:
+        key_order = calibration.get('_key_order', CALIBRATION_FIELDS)
+        n_points = len(calibration['x'])
+        data['calibration']['points'] = [
+            {c: calibration[c][i] for c in key_order if calibration[c][i] is not _MISSING}
+            for i in range(n_points)
+        ]
+    return data
+
+# ==========================================
+# 4. 스트리밍 읽기 (파일 전체를 메모리에 올리지 않음)
+# ==========================================
+# 캘리브레이션 포인트와 시행 배열만 원소 단위로 읽고, 나머지(참가자/기기/circleData 등)는 그대로 조립
+STREAM_PATHS = [('calibration', 'points'), ('experiments', '*', 'trials')]
+CHUNK_POINTS = 4096
+CHUNK_TRIALS = 1024
+
+
+def stream_session(file_path):
+    # (종류, 메타, 실험, 값) 을 파일 순서대로 반환
+    # - ('point', 메타, None, 포인트) / ('trial', 메타, 실험 딕셔너리, 시행)
+    # - 마지막에 ('meta', 메타, None, None): trials / points 가 빠진 _split_session 의 meta 와 같은 모양
+    # 메타는 읽는 중에 계속 채워지므로, 시행 시점에는 그보다 앞에 기록된 필드(participant, circleData 등)만 들어 있음
+    stack, meta = [], None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for kind, path, value in iter_events(f, STREAM_PATHS):
+            if kind == 'item':
+                if path[0] == 'calibration':
+                    yield 'point', stack[0][1], None, value
+                else:
+                    yield 'trial', stack[0][1], stack[-1][1], value
+            elif kind == 'value':
+                _insert(stack[-1][1], path[-1], value)
+            elif kind == 'start' and value is not None:
+                if stack:
+                    _insert(stack[-1][1], path[-1], value)
+                stack.append((path, value))
+            elif kind == 'end' and stack and stack[-1][0] == path:
+                meta = stack.pop()[1]
+    yield 'meta', meta, None, None
+
+
+def _insert(container, key, value):
+    if isinstance(container, list):
+        container.append(value)
+    else:
+        container[key] = value
+
+# ==========================================
+# 5. Pack / Unpack
+# ==========================================
+def _block_name(group, col, chunk):
+    return f'{group}/{col}' if chunk == 0 else f'{group}/{col}@{chunk}'
+
+
+def _write_meta(write_block, entry, meta):
+    entry['blocks']['meta'] = write_block(
+        zlib.compress(json.dumps(meta, ensure_ascii=False).encode('utf-8'))) + [{'codec': 'json'}]
+
+
+def _write_trials(write_block, entry, trials, chunk=0):
+    for col, values in trials.items():
+        raw, attrs = _encode_column(values)
+        entry['blocks'][_block_name('trials', col, chunk)] = write_block(raw) + [attrs]
+
+
+def _write_points(write_block, entry, points, chunk=0):
+    try:
+        raw = zlib.compress(encode_points(points))
+        entry['blocks'][_block_name('calibration', '_packed', chunk)] = write_block(raw) + [{'codec': 'hcal'}]
+    except ValueError:
+        # 키가 빠졌거나 타입이 다른 포인트가 있으면 컬럼 단위로 저장
+        for col in CALIBRATION_FIELDS:
+            raw, attrs = _encode_column([p.get(col, _MISSING) for p in points])
+            entry['blocks'][_block_name('calibration', col, chunk)] = write_block(raw) + [attrs]
+
+
+def _source_stats(file_list):
+    # 원본 JSON 파일명 -> [크기, 수정 시각(ns)] (아카이브가 폴더와 같은 내용인지 확인용)
+    stats = {}
+    for file_path in file_list:
+        st = os.stat(file_path)
+        stats[os.path.basename(file_path)] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def pack(data_dir, archive_path):
+    file_list = sorted(glob.glob(os.path.join(data_dir, '*.json')))
+    if not file_list:
+        print(f"❌ 오류: '{data_dir}' 폴더에 .json 파일이 없습니다.")
+        return None
+
+    index = {'version': 2, 'participants': [], 'sources': _source_stats(file_list)}
+    with open(archive_path, 'wb') as out:
+        out.write(MAGIC)
+
+        def write_block(raw):
+            offset = out.tell()
+            out.write(raw)
+            return [offset, len(raw)]
+
+        for file_path in file_list:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 경고: {file_path} 처리 중 오류 발생 - {e}")
+                continue
+
+            meta, trials, points = _split_session(data)
+            entry = {
+                'name': meta['participant']['name'],
+                'studentId': meta['participant'].get('studentId'),
+                'file': os.path.basename(file_path),
+                'n_trials': len(trials['_extra']),
+                'n_points': len(points),
+                'blocks': {},
+            }
+            _write_meta(write_block, entry, meta)
+            _write_trials(write_block, entry, trials)
+            _write_points(write_block, entry, points)
+            index['participants'].append(entry)
+
+        index_raw = zlib.compress(json.dumps(index, ensure_ascii=False).encode('utf-8'))
+        index_offset = out.tell()
+        out.write(index_raw)
+        out.write(FOOTER.pack(index_offset, len(index_raw), MAGIC))
+
+    return index
+
+
+def pack_stream(data_dir, archive_path, chunk_points=CHUNK_POINTS, chunk_trials=CHUNK_TRIALS):
+    # pack 과 같은 아카이브를 파일을 통째로 읽지 않고 생성
+    # (캘리브레이션 포인트/시행은 chunk 크기만큼 모이면 바로 인코딩해서 기록하므로 메모리 사용량이 세션 길이와 무관)
+    file_list = sorted(glob.glob(os.path.join(data_dir, '*.json')))
+    if not file_list:
+        print(f"❌ 오류: '{data_dir}' 폴더에 .json 파일이 없습니다.")
+        return None
+
+    index = {'version': 3, 'participants': [], 'sources': _source_stats(file_list)}
+    with open(archive_path, 'wb') as out:
+        out.write(MAGIC)
+
+        def write_block(raw):
+            offset = out.tell()
+            out.write(raw)
+            return [offset, len(raw)]
+
+        for file_path in file_list:
+            entry = {'file': os.path.basename(file_path), 'n_trials': 0, 'n_points': 0, 'blocks': {}}
+            points, rows = [], []
+            point_chunk, trial_chunk = 0, 0
+
+            def flush_trials():
+                nonlocal rows, trial_chunk
+                _write_trials(write_block, entry, {c: [r[c] for r in rows] for c in TRIAL_COLUMNS}, trial_chunk)
+                rows, trial_chunk = [], trial_chunk + 1
+
+            def flush_points():
+                nonlocal points, point_chunk
+                _write_points(write_block, entry, points, point_chunk)
+                points, point_chunk = [], point_chunk + 1
+
+            try:
+                for kind, meta, exp, value in stream_session(file_path):
+                    if kind == 'point':
+                        points.append(value)
+                        entry['n_points'] += 1
+                        if len(points) >= chunk_points:
+                            flush_points()
+                    elif kind == 'trial':
+                        rows.append(_trial_row(exp, len(meta['experiments']) - 1, value))
+                        entry['n_trials'] += 1
+                        if len(rows) >= chunk_trials:
+                            flush_trials()
+                # 마지막 청크 (비어 있어도 0번 청크는 기록해서 pack 결과와 같은 블록 구성을 유지)
+                if rows or trial_chunk == 0:
+                    flush_trials()
+                if points or point_chunk == 0:
+                    flush_points()
+            except Exception as e:
+                # 이미 기록된 블록은 인덱스에 올리지 않으므로 읽히지 않음
+                print(f"⚠️ 경고: {file_path} 처리 중 오류 발생 - {e}")
+                continue
+
+            entry = {'name': meta['participant']['name'], 'studentId': meta['participant'].get('studentId'),
+                     **entry}
+            _write_meta(write_block, entry, meta)
+            index['participants'].append(entry)
+
+        index_raw = zlib.compress(json.dumps(index, ensure_ascii=False).encode('utf-8'))
+        index_offset = out.tell()
+        out.write(index_raw)
+        out.write(FOOTER.pack(index_offset, len(index_raw), MAGIC))
+
+    return index
+
+
+def unpack(archive_path, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    with SessionArchive(archive_path) as archive:
+        for i, entry in enumerate(archive.index['participants']):
+            data = archive.read_session(i)
+            with open(os.path.join(out_dir, entry['file']), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+    return out_dir
+
+# ==========================================
+# 6. 랜덤 액세스 리더
+# ==========================================
+class SessionArchive:
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, 'rb')
+        if self._f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}'는 세션 아카이브 파일이 아닙니다.")
+        self._f.seek(-FOOTER.size, os.SEEK_END)
+        index_offset, index_len, magic = FOOTER.unpack(self._f.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' 아카이브의 푸터가 손상되었습니다.")
+        self._f.seek(index_offset)
+        self.index = json.loads(zlib.decompress(self._f.read(index_len)).decode('utf-8'))
+        self._by_name = {e['name']: i for i, e in enumerate(self.index['participants'])}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._f.close()
+
+    def __len__(self):
+        return len(self.index['participants'])
+
+    @property
+    def participants(self):
+        return [e['name'] for e in self.index['participants']]
+
+    def _entry(self, key):
+        return self.index['participants'][self._by_name[key] if isinstance(key, str) else key]
+
+    def _read_block(self, entry, block):
+        offset, length, attrs = entry['blocks'][block]
+        self._f.seek(offset)
+        return _decode_column(self._f.read(length), attrs), attrs
+
+    def _read_chunk(self, entry, blocks, columns=None, python=False):
+        # blocks: {컬럼명: 블록 이름} (청크 하나)
+        if '_packed' in blocks:
+            # 델타 인코딩된 캘리브레이션 블록: 한 번에 디코딩 후 필요한 컬럼만 반환
+            arrays, _ = self._read_block(entry, blocks['_packed'])
+            key_order = arrays['key_order']
+            out = {c: (to_python(arrays, c) if python else arrays[c]) for c in CALIBRATION_FIELDS
+                   if columns is None or c in columns}
+            if python:
+                out['_key_order'] = key_order
+            return out
+
+        out = {}
+        for col, block in blocks.items():
+            if columns is not None and col not in columns:
+                continue
+            values, attrs = self._read_block(entry, block)
+            out[col] = _column_to_python(values, attrs) if python else values
+        return out
+
+    def _read_group(self, entry, group, columns=None, python=False):
+        prefix = group + '/'
+        chunks = {}
+        for block in entry['blocks']:
+            if block.startswith(prefix):
+                col, _, chunk = block[len(prefix):].partition('@')
+                chunks.setdefault(int(chunk or 0), {})[col] = block
+
+        parts = [self._read_chunk(entry, chunks[i], columns, python) for i in sorted(chunks)]
+        if len(parts) <= 1:
+            return parts[0] if parts else {}
+
+        # 스트리밍 pack 으로 나뉜 청크를 컬럼별로 이어 붙임
+        out = {}
+        for part in parts:
+            for col, values in part.items():
+                if col == '_key_order':
+                    out.setdefault(col, values)
+                elif col not in out:
+                    out[col] = values
+                elif python or not isinstance(values, np.ndarray):
+                    out[col] = list(out[col]) + list(values)
+                else:
+                    out[col] = np.concatenate([out[col], values])
+        return out
+
+    def read_meta(self, key):
+        return self._read_block(self._entry(key), 'meta')[0]
+
+    def read_trials(self, key, columns=None):
+        # 요청한 컬럼의 하위 블록만 읽음 (캘리브레이션 블록은 건드리지 않음)
+        return self._read_group(self._entry(key), 'trials', columns)
+
+    def read_calibration(self, key, columns=None):
+        return self._read_group(self._entry(key), 'calibration', columns)
+
+    def read_session(self, key, include_calibration=True):
+        entry = self._entry(key)
+        meta = self._read_block(entry, 'meta')[0]
+        trials = self._read_group(entry, 'trials', python=True)
+        calibration = self._read_group(entry, 'calibration', python=True) if include_calibration else None
+        return _join_session(meta, trials, calibration)
+
+# ==========================================
+# 7. 분석 스크립트용 로딩 헬퍼
+# ==========================================
+_REPORTED_SOURCES = set()
+
+
+def archive_is_current(archive_path, data_dir):
+    # 아카이브에 기록된 원본 파일 목록/크기/수정 시각이 지금 폴더와 같은지 (폴더가 없으면 아카이브만 있는 배포로 봄)
+    if not os.path.isdir(data_dir):
+        return True
+    try:
+        with SessionArchive(archive_path) as archive:
+            recorded = archive.index.get('sources')
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 경고: {archive_path} 처리 중 오류 발생 - {e}")
+        return False
+    return recorded == _source_stats(sorted(glob.glob(os.path.join(data_dir, '*.json'))))
+
+
+def resolve_source(data_dir):
+    # './data' 옆에 './data.himpack' 이 있고 폴더와 내용이 같으면 아카이브를 사용
+    # (폴더의 JSON 이 추가/삭제/수정됐으면 폴더로 대체하고, 어느 쪽을 읽는지 경로마다 한 번 출력)
+    if os.path.isfile(data_dir):
+        return data_dir
+    archive_path = data_dir.rstrip('/\\') + ARCHIVE_EXT
+    if not os.path.isfile(archive_path):
+        return data_dir
+    current = archive_is_current(archive_path, data_dir)
+    if (archive_path, current) not in _REPORTED_SOURCES:
+        _REPORTED_SOURCES.add((archive_path, current))
+        if current:
+            print(f"📦 세션 아카이브 '{archive_path}'에서 읽습니다.")
+        else:
+            print(f"⚠️ 경고: '{archive_path}'가 '{data_dir}' 폴더와 다릅니다 (파일 목록/크기/수정 시각). "
+                  f"JSON 폴더에서 읽습니다. (다시 pack 하면 아카이브 사용)")
+    return archive_path if current else data_dir
+
+
+def iter_sessions(data_dir, include_calibration=True):
+    # (파일명, 세션 딕셔너리) 를 순서대로 반환
+    source = resolve_source(data_dir)
+    if os.path.isfile(source):
+        with SessionArchive(source) as archive:
+            for i, entry in enumerate(archive.index['participants']):
+                yield entry['file'], archive.read_session(i, include_calibration)
+        return
+
+    for file_path in sorted(glob.glob(os.path.join(source, '*.json'))):
+        try:
+            if include_calibration:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            else:
+                # 캘리브레이션 포인트는 읽는 즉시 버리고 시행만 다시 붙임
+                for kind, meta, exp, value in stream_session(file_path):
+                    if kind == 'trial':
+                        exp.setdefault('trials', []).append(value)
+                data = meta
+                for exp in data.get('experiments', []):
+                    exp.setdefault('trials', [])
+        except Exception as e:
+            print(f"⚠️ 경고: {file_path} 처리 중 오류 발생 - {e}")
+            continue
+        yield os.path.basename(file_path), data
+
+
+def session_info(meta):
+    # iter_trial_chunks 의 기본 세션 컬럼
+    circle = meta.get('circleData') or {}
+    return {'Participant': meta['participant']['name'],
+            'Student_ID': meta['participant'].get('studentId'),
+            'Radius': circle.get('radius', np.nan)}
+
+
+def _rechunk(frames, chunk_size):
+    # 길이가 제각각인 DataFrame 들을 chunk_size 행씩 다시 묶음 (마지막 청크만 짧을 수 있음)
+    buf, n = [], 0
+    for df in frames:
+        while len(df):
+            part, df = df.iloc[:chunk_size - n], df.iloc[chunk_size - n:]
+            buf.append(part)
+            n += len(part)
+            if n == chunk_size:
+                yield pd.concat(buf, ignore_index=True)
+                buf, n = [], 0
+    if n:
+        yield pd.concat(buf, ignore_index=True)
+
+
+def _session_frames(source, chunk_size, context):
+    # 세션(또는 chunk_size 행) 단위 시행 DataFrame: context(meta) 컬럼 + condition / exp_index + TRIAL_FIELDS 컬럼
+    columns = [c for c in TRIAL_COLUMNS if c != '_extra']
+
+    def frame(ctx, cols):
+        df = pd.DataFrame(cols, columns=columns)
+        for c in NUMERIC_TRIAL_COLUMNS:
+            if df[c].dtype == object:
+                df[c] = pd.to_numeric(df[c])
+        for i, (key, value) in enumerate(ctx.items()):
+            df.insert(i, key, [value] * len(df))
+        return df
+
+    if os.path.isfile(source):
+        with SessionArchive(source) as archive:
+            for i, entry in enumerate(archive.index['participants']):
+                try:
+                    ctx = context(archive.read_meta(i))
+                    cols = archive.read_trials(i, columns)  # 결측은 NaN / None
+                except Exception as e:
+                    print(f"⚠️ 경고: {entry['file']} 처리 중 오류 발생 - {e}")
+                    continue
+                yield frame(ctx, cols)
+        return
+
+    for file_path in sorted(glob.glob(os.path.join(source, '*.json'))):
+        ctx, rows = None, []
+        try:
+            for kind, meta, exp, value in stream_session(file_path):
+                if kind == 'trial':
+                    ctx = _stream_context(file_path, meta, context) if ctx is None else ctx
+                    rows.append(_trial_row(exp, len(meta['experiments']) - 1, value))
+                    if len(rows) == chunk_size:
+                        yield frame(ctx, {c: [None if r[c] is _MISSING else r[c] for r in rows] for c in columns})
+                        rows = []
+                elif kind == 'meta' and ctx is None:
+                    ctx = context(meta)  # 시행이 없는 세션도 context 는 한 번 호출
+        except Exception as e:
+            print(f"⚠️ 경고: {file_path} 처리 중 오류 발생 - {e}")
+            continue
+        if rows:
+            yield frame(ctx, {c: [None if r[c] is _MISSING else r[c] for r in rows] for c in columns})
+
+
+def _stream_context(file_path, meta, context):
+    # 세션 컬럼은 첫 시행 시점까지 읽은 메타로 계산
+    # 세션 필드 중 아직 읽히지 않은 것이 있으면 (키가 정렬된 JSON 등 experiments 뒤에 기록된 파일이거나 필드가 없는 세션)
+    # context 가 .get 으로 기본값을 쓰지 않도록 메타만 한 번 더 훑어서 전체 메타로 계산
+    if all(key in meta for key in SESSION_META_KEYS):
+        try:
+            return context(meta)
+        except KeyError:
+            pass
+    for kind, full, _, _ in stream_session(file_path):
+        pass
+    return context(full)
+
+
+def iter_trial_chunks(data_dir, chunk_size=CHUNK_TRIALS, context=session_info):
+    # 전체 세션의 시행을 chunk_size 행짜리 컬럼형 DataFrame 으로 순서대로 반환
+    # (JSON 폴더는 스트리밍으로 읽으므로 캘리브레이션 포인트가 아무리 많아도 메모리는 청크 크기만큼만 사용)
+    # context: 세션 메타 -> 모든 행에 붙일 세션 컬럼 딕셔너리 (세션마다 한 번 호출)
+    yield from _rechunk(_session_frames(resolve_source(data_dir), chunk_size, context), chunk_size)
+
+
+def read_trial_table(archive_path, columns=None, participants=None):
+    # 참가자 x 시행 컬럼을 하나의 DataFrame으로 (필요한 컬럼 블록만 읽음)
+    frames = []
+    with SessionArchive(archive_path) as archive:
+        keys = participants if participants is not None else range(len(archive))
+        for key in keys:
+            cols = archive.read_trials(key, columns)
+            cols.pop('_extra', None)
+            df = pd.DataFrame(cols)
+            df.insert(0, 'Participant', archive._entry(key)['name'])
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+# ==========================================
+# 8. 실행 (pack / unpack / ls)
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='세션 JSON <-> 단일 아카이브 변환')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_pack = sub.add_parser('pack', help='JSON 폴더를 아카이브 하나로 묶기')
+    p_pack.add_argument('data_dir', nargs='?', default='./data')
+    p_pack.add_argument('archive', nargs='?', default=None)
+    p_pack.add_argument('--stream', action='store_true', help='파일을 통째로 읽지 않고 청크 단위로 기록 (대용량 세션용)')
+    p_pack.add_argument('--chunk-points', type=int, default=CHUNK_POINTS)
+    p_unpack = sub.add_parser('unpack', help='아카이브를 JSON 폴더로 풀기')
+    p_unpack.add_argument('archive')
+    p_unpack.add_argument('out_dir')
+    p_ls = sub.add_parser('ls', help='아카이브 목차 보기')
+    p_ls.add_argument('archive')
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        archive_path = args.archive or args.data_dir.rstrip('/\\') + ARCHIVE_EXT
+        if args.stream:
+            index = pack_stream(args.data_dir, archive_path, chunk_points=args.chunk_points)
+        else:
+            index = pack(args.data_dir, archive_path)
+        if index:
+            print(f"📦 {len(index['participants'])}명의 세션을 '{archive_path}'에 저장했습니다. "
+                  f"({os.path.getsize(archive_path) / 1024:.1f} KB)")
+    elif args.command == 'unpack':
+        unpack(args.archive, args.out_dir)
+        print(f"📂 '{args.archive}'를 '{args.out_dir}'에 풀었습니다.")
+    elif args.command == 'ls':
+        with SessionArchive(args.archive) as archive:
+            for e in archive.index['participants']:
+                print(f"👤 {e['name']} ({e['file']}): 시행 {e['n_trials']}건, 캘리브레이션 {e['n_points']}점")
@@ -0,0 +1,254 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import hashlib
+from batch_stats import CONDITIONS
+
+# ==========================================
+# 1. 설정 및 고정 구간(bin) 경계
+# ==========================================
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
+PROCESS_PATH = os.path.join(RESULT_DIR, 'processed_data.csv')
+STATE_PATH = os.path.join(RESULT_DIR, '.spatial_maps.npz')  # 결과 폴더(코호트)별 누적 상태
+
+METRICS = ['SearchTime', 'Offset_mm', 'Error']
+
+# 구간 경계는 데이터와 무관하게 고정 -> 새 데이터가 들어와도 같은 격자에 누적 가능
+# cartesian: 버튼 위치 (뷰포트 좌상단 기준 mm, 기준 기기 393x695 CSS px ≈ 65 x 115 mm)
+# polar: circleCenter 기준 각도(화면 좌표, 180-270° = 9-12시)와 거리(mm)
+BIN_LAYOUTS = {
+    'cartesian': {
+        'x_col': 'Button_X_mm', 'y_col': 'Button_Y_mm',
+        'x_edges': np.arange(0, 72, 8.0), 'y_edges': np.arange(0, 130, 10.0),
+    },
+    'polar': {
+        'x_col': 'Button_Angle', 'y_col': 'Button_Distance_mm',
+        'x_edges': np.arange(180, 285, 15.0), 'y_edges': np.arange(0, 130, 10.0),
+    },
+}
+# 이미 누적된 시행을 다시 더하지 않기 위한 키 + 행 내용 해시 (값이 바뀐 시행을 찾기 위함)
+TRIAL_KEY = ['Participant_ID', 'Condition', 'Trial_Order']
+
+
+def add_polar_coords(df):
+    # 원 중심 -> 버튼 벡터 (화면 좌표는 y가 아래로 증가하므로 9-12시 방향이 180-270°)
+    dx = df['Button_X'] - df['Circle_X']
+    dy = df['Button_Y'] - df['Circle_Y']
+    out = df.copy()
+    out['Button_Angle'] = np.degrees(np.arctan2(dy, dx)) % 360
+    out['Button_Distance_mm'] = np.hypot(dx, dy) * df['mm_per_px']
+    return out
+
+
+def bin_index(values, edges):
+    # 마지막 경계값은 마지막 구간에 포함, 범위 밖은 -1
+    idx = np.searchsorted(edges, values, side='right') - 1
+    idx[values == edges[-1]] = len(edges) - 2
+    idx[(idx < 0) | (idx >= len(edges) - 1) | np.isnan(values)] = -1
+    return idx
+
+
+def layouts_fingerprint(layouts=BIN_LAYOUTS):
+    spec = {k: {c: (v.tolist() if isinstance(v, np.ndarray) else v) for c, v in lay.items()}
+            for k, lay in layouts.items()}
+    return hashlib.sha1(json.dumps([spec, METRICS, CONDITIONS], sort_keys=True).encode()).hexdigest()
+
+# ==========================================
+# 2. 누적 통계 (개수 / 합 / 제곱합 -> 증분 갱신 가능)
+# ==========================================
+class SpatialMaps:
+    def __init__(self, layouts=BIN_LAYOUTS, metrics=METRICS, conditions=CONDITIONS):
+        self.layouts = layouts
+        self.metrics = list(metrics)
+        self.conditions = list(conditions)
+        # 레이아웃별 (통계 3종, 조건, 지표, x구간, y구간)
+        self.stats = {
+            name: np.zeros((3, len(self.conditions), len(self.metrics),
+                            len(lay['x_edges']) - 1, len(lay['y_edges']) - 1))
+            for name, lay in layouts.items()
+        }
+        self.seen = {}  # 시행 키 -> 행 내용 해시
+        self.dropped = {name: 0 for name in layouts}
+        self.rebuilt = False
+
+    def _reset(self):
+        self.stats = {k: np.zeros_like(v) for k, v in self.stats.items()}
+        self.seen = {}
+        self.dropped = {name: 0 for name in self.layouts}
+
+    def row_hashes(self, df):
+        # 지도에 들어가는 컬럼만으로 행 해시 (재생성된 CSV라도 값이 같으면 같은 해시)
+        cols = ['Condition'] + self.metrics + [c for lay in self.layouts.values() for c in (lay['x_col'], lay['y_col'])]
+        return pd.util.hash_pandas_object(df[list(dict.fromkeys(cols))], index=False).to_numpy()
+
+    def update(self, df):
+        # df: 현재 전체 시행 테이블. 새 시행만 더하고,
+        # 누적된 시행이 빠졌거나 값이 바뀌었으면 (CSV 재생성 / 참가자 제외 등) 처음부터 다시 누적
+        if 'Button_Angle' not in df.columns:
+            df = add_polar_coords(df)
+        keys = list(df[TRIAL_KEY].astype(str).itertuples(index=False, name=None))
+        hashes = self.row_hashes(df)
+        current = dict(zip(keys, hashes.tolist()))
+        self.rebuilt = any(current.get(k) != h for k, h in self.seen.items())
+        if self.rebuilt:
+            self._reset()
+        new = np.array([k not in self.seen for k in keys], dtype=bool)
+        df, keys, hashes = df[new], [k for k, is_new in zip(keys, new) if is_new], hashes[new]
+        if df.empty:
+            return 0
+
+        cond = pd.Categorical(df['Condition'], categories=self.conditions).codes
+        values = df[self.metrics].to_numpy(dtype=float)  # (N, M)
+        C, M = len(self.conditions), len(self.metrics)
+
+        for name, lay in self.layouts.items():
+            ix = bin_index(df[lay['x_col']].to_numpy(dtype=float), lay['x_edges'])
+            iy = bin_index(df[lay['y_col']].to_numpy(dtype=float), lay['y_edges'])
+            nx, ny = len(lay['x_edges']) - 1, len(lay['y_edges']) - 1
+            valid = (ix >= 0) & (iy >= 0) & (cond >= 0)
+            self.dropped[name] += int((~valid).sum())
+
+            # (조건, 지표, x, y) 를 하나의 평탄 인덱스로 -> 지표 전체를 bincount 한 번씩
+            cell = (cond * M)[:, None] + np.arange(M)[None, :]
+            flat = (cell * nx + ix[:, None]) * ny + iy[:, None]
+            ok = valid[:, None] & ~np.isnan(values)
+            flat, v = flat[ok], values[ok]
+            size = C * M * nx * ny
+            shape = (C, M, nx, ny)
+            self.stats[name][0] += np.bincount(flat, minlength=size).reshape(shape)
+            self.stats[name][1] += np.bincount(flat, weights=v, minlength=size).reshape(shape)
+            self.stats[name][2] += np.bincount(flat, weights=v * v, minlength=size).reshape(shape)
+
+        self.seen.update(zip(keys, hashes.tolist()))
+        return len(df)
+
+    def summary(self, layout):
+        # 평균 / 표준편차 / 개수 배열 (C, M, nx, ny)
+        n, s, ss = self.stats[layout]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s / n
+            var = (ss - n * mean ** 2) / (n - 1)
+        return mean, np.sqrt(np.clip(var, 0, None)), n
+
+    def to_frame(self):
+        rows = []
+        for name, lay in self.layouts.items():
+            mean, sd, n = self.summary(name)
+            c, m, i, j = np.nonzero(n)
+            rows.append(pd.DataFrame({
+                'Layout': name,
+                'Condition': np.array(self.conditions)[c],
+                'Metric': np.array(self.metrics)[m],
+                'X_Col': lay['x_col'],
+                'X_Lo': lay['x_edges'][i], 'X_Hi': lay['x_edges'][i + 1],
+                'Y_Col': lay['y_col'],
+                'Y_Lo': lay['y_edges'][j], 'Y_Hi': lay['y_edges'][j + 1],
+                'N': n[c, m, i, j].astype(int),
+                'Mean': mean[c, m, i, j],
+                'SD': sd[c, m, i, j],
+            }))
+        return pd.concat(rows, ignore_index=True)
+
+    # ---------- 저장 / 불러오기 (구간 경계가 같을 때만 이어서 누적) ----------
+    def save(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {f'stats_{k}': v for k, v in self.stats.items()}
+        keys = sorted(self.seen)
+        np.savez_compressed(path, fingerprint=layouts_fingerprint(self.layouts),
+                            seen=np.array(keys, dtype=str).reshape(-1, len(TRIAL_KEY)),
+                            hashes=np.array([self.seen[k] for k in keys], dtype=np.uint64),
+                            dropped=json.dumps(self.dropped), **arrays)
+
+    @classmethod
+    def load(cls, path=STATE_PATH, layouts=BIN_LAYOUTS):
+        maps = cls(layouts)
+        if not os.path.exists(path):
+            return maps
+        with np.load(path) as state:
+            if str(state['fingerprint']) != layouts_fingerprint(layouts) or 'hashes' not in state:
+                print("⚠️ 경고: 구간 경계(또는 상태 형식)가 바뀌어 저장된 누적 통계를 사용하지 않습니다.")
+                return maps
+            maps.stats = {k: state[f'stats_{k}'].copy() for k in layouts}
+            maps.seen = dict(zip((tuple(row) for row in state['seen'].tolist()), state['hashes'].tolist()))
+            maps.dropped = json.loads(str(state['dropped']))
+        return maps
+
+# ==========================================
+# 3. 시각화
+# ==========================================
+def plot_maps(maps, layout, save_path):
+    import matplotlib.pyplot as plt
+
+    lay = maps.layouts[layout]
+    mean, _, n = maps.summary(layout)
+    polar = layout == 'polar'
+    C, M = len(maps.conditions), len(maps.metrics)
+    fig, axes = plt.subplots(M, C, figsize=(4.2 * C, 3.8 * M) if polar else (3.6 * C, 4.6 * M),
+                             subplot_kw={'projection': 'polar'} if polar else None, squeeze=False)
+    cmaps = {'SearchTime': 'YlOrRd', 'Offset_mm': 'PuBu', 'Error': 'Reds'}
+
+    for m, metric in enumerate(maps.metrics):
+        # 같은 지표는 조건 간 색 범위를 통일
+        vmin, vmax = np.nanmin(mean[:, m]), np.nanmax(mean[:, m])
+        for c, cond in enumerate(maps.conditions):
+            ax = axes[m, c]
+            data = np.ma.masked_where(n[c, m] == 0, mean[c, m]).T
+            if polar:
+                theta = np.radians(lay['x_edges'])
+                mesh = ax.pcolormesh(theta, lay['y_edges'], data, cmap=cmaps.get(metric, 'viridis'),
+                                     vmin=vmin, vmax=vmax, shading='flat')
+                # 화면 좌표 각도: 시계 방향 증가, 270° 가 화면 위쪽
+                ax.set_theta_zero_location('E')
+                ax.set_theta_direction(-1)
+                ax.set_thetamin(lay['x_edges'][0])
+                ax.set_thetamax(lay['x_edges'][-1])
+            else:
+                mesh = ax.pcolormesh(lay['x_edges'], lay['y_edges'], data, cmap=cmaps.get(metric, 'viridis'),
+                                     vmin=vmin, vmax=vmax, shading='flat')
+                ax.set_aspect('equal')
+                ax.invert_yaxis()  # 화면처럼 위쪽이 y=0
+                ax.set_xlabel('Button X (mm)')
+                ax.set_ylabel('Button Y (mm)')
+            ax.set_title(f'{cond} - {metric}', fontsize=11)
+            fig.colorbar(mesh, ax=ax, shrink=0.7)
+
+    title = 'Polar (Angle x Distance from Circle Center)' if polar else 'Button Position (mm)'
+    fig.suptitle(f'Spatial Performance Maps: {title}', fontsize=15, fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(save_path, dpi=200)
+    plt.close(fig)
+
+# ==========================================
+# 4. 실행
+# ==========================================
+if __name__ == "__main__":
+    print("🔄 위치별 성능 지도 생성 중...")
+    df = pd.read_csv(PROCESS_PATH)
+
+    maps = SpatialMaps.load(STATE_PATH)
+    added = maps.update(df)
+    maps.save(STATE_PATH)
+    if maps.rebuilt:
+        print("🔁 누적된 시행이 바뀌었거나 빠져서 처음부터 다시 누적했습니다.")
+    print(f"➕ 새로 누적된 시행: {added}건 (누적 {len(maps.seen)}건)")
+    for name, count in maps.dropped.items():
+        if count:
+            print(f"⚠️ 경고: {name} 구간 범위를 벗어난 시행 {count}건은 제외되었습니다.")
+
+    table = maps.to_frame()
+    save_path = os.path.join(RESULT_DIR, 'spatial_performance_bins.csv')
+    table.to_csv(save_path, index=False, encoding='utf-8-sig')
+    print(f"💾 구간별 통계 저장 완료: {save_path}")
+
+    # Target_Y 활용: 화면 상/중/하단 (버튼 y, mm) 별 조건 평균
+    df_pos = add_polar_coords(df)
+    df_pos['Y_Band'] = pd.cut(df_pos['Button_Y_mm'], bins=[0, 40, 80, 130], labels=['top', 'middle', 'bottom'],
+                              include_lowest=True)
+    print("\n[화면 상/중/하단별 평균]")
+    print(df_pos.pivot_table(index='Y_Band', columns='Condition', values=METRICS, aggfunc='mean',
+                             observed=True).round(2).to_string())
+
+    plot_maps(maps, 'cartesian', os.path.join(RESULT_DIR, 'Fig10_Spatial_Performance.png'))
+    plot_maps(maps, 'polar', os.path.join(RESULT_DIR, 'Fig11_Polar_Performance.png'))
+    print("✅ Fig10_Spatial_Performance.png, Fig11_Polar_Performance.png 저장 완료")
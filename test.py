@@ -1,54 +1,39 @@
 import pandas as pd
 import os
-import json
-import glob
-import numpy as np
+from participant_registry import build_registry, load_survey, report_unmatched, resolve_path, ORDER_COLS
 
 # ==========================================
 # 1. 설정 및 데이터 로드
 # ==========================================
-SURVEY_PATH = './사후 설문 정리.csv'
-JSON_DIR = './data'
-RESULT_DIR = './results'
+# 파일명 리터럴은 원래(NFD) 그대로 두고, 디스크의 NFC/NFD 이름 중 실제로 있는 쪽으로 해석
+SURVEY_PATH = resolve_path(os.environ.get('HIM_SURVEY_PATH', './사후 설문 정리.csv'))
+JSON_DIR = os.environ.get('HIM_DATA_DIR', './data')
+RESULT_DIR = os.environ.get('HIM_RESULT_DIR', './results')
 
 if not os.path.exists(RESULT_DIR):
     os.makedirs(RESULT_DIR)
 
 # ==========================================
-# 2. JSON에서 참가자별 실험 순서 추출
+# 2. 참가자 레지스트리 (studentId 기준, 실험 순서 포함)
 # ==========================================
 print("🔄 실험 순서 데이터 추출 중...")
 
-participant_orders = {}
+registry = build_registry(JSON_DIR)
 
-json_files = glob.glob(os.path.join(JSON_DIR, '*.json'))
-for jf in json_files:
-    try:
-        with open(jf, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            name = data['participant']['name'].strip()
-
-            # experiments 리스트에 저장된 순서가 실제 수행 순서입니다.
-            # 예: ['fixed', 'bottom-right', 'adaptive']
-            orders = []
-            for exp in data['experiments']:
-                orders.append(exp['condition'])
-
-            participant_orders[name] = orders
-    except Exception as e:
-        print(f"⚠️ JSON 로드 에러 ({jf}): {e}")
-
-print(f"✅ 총 {len(participant_orders)}명의 순서 정보 확보")
+print(f"✅ 총 {len(registry)}명의 순서 정보 확보")
 
 # ==========================================
 # 3. 설문 데이터 로드 및 정밀 매핑
 # ==========================================
 try:
-    df_raw = pd.read_csv(SURVEY_PATH)
+    # 이름은 NFC/공백 정규화 후 레지스트리와 한 번에 조인, 미매칭 행은 보고
+    df_raw, unmatched = load_survey(registry, SURVEY_PATH)
 except Exception as e:
     print(f"❌ 설문 CSV 파일을 찾을 수 없습니다: {e}")
     exit()
 
+report_unmatched(unmatched, '설문')
+
 mapped_data = []
 
 # 설문 문항 키워드 (CSV 컬럼명에 포함된 단어)
@@ -64,16 +49,12 @@ ordinal_map_q = {4: 0, 5: 1, 6: 2}
 print("🔄 설문 데이터 매핑 및 검증 중...")
 
 for idx, row in df_raw.iterrows():
-    name = str(row.get('1. 성함', '')).strip()
-
-    # JSON 로그가 없는 참가자는 제외 (순서를 모르므로)
-    if not name or name not in participant_orders:
-        continue
-
-    order = participant_orders[name] # 예: ['fixed', 'adaptive', 'bottom-right']
+    name = row['Participant']
+    order = [row[c] for c in ORDER_COLS] # 예: ['fixed', 'adaptive', 'bottom-right']
 
     # 1. 기본 정보 저장
     p_data = {
+        'Participant_ID': row['Participant_ID'],
         'Participant': name,
         'Order_1st': order[0],
         'Order_2nd': order[1],
@@ -114,6 +95,11 @@ for idx, row in df_raw.iterrows():
         if '[2순위]' in col: p_data['Second_Choice'] = clean_pref(row[col])
         if '[3순위]' in col: p_data['Third_Choice'] = clean_pref(row[col])
 
+    # 4. 조건별 순위 컬럼 (1=가장 선호, batch_stats.py 일괄 검정용)
+    for rank, key in enumerate(['Best_Choice', 'Second_Choice', 'Third_Choice'], start=1):
+        if p_data.get(key) in order:
+            p_data[f'{p_data[key]}_Rank'] = rank
+
     mapped_data.append(p_data)
 
 # 데이터프레임 생성
@@ -123,9 +109,9 @@ df_mapped = pd.DataFrame(mapped_data)
 # 4. 검증용 CSV 저장 및 요약 출력
 # ==========================================
 # 컬럼 순서 보기 좋게 정렬 (Participant, Best_Choice, Fixed_..., Adaptive_..., Bottom_...)
-cols = ['Participant', 'Best_Choice']
+cols = ['Participant_ID', 'Participant', 'Best_Choice']
 for cond in ['fixed', 'adaptive', 'bottom-right']:
-    for met in ['Physical_Effort', 'Accessibility', 'Grip_Instability']:
+    for met in ['Physical_Effort', 'Accessibility', 'Grip_Instability', 'Rank']:
         col_name = f'{cond}_{met}'
         if col_name in df_mapped.columns:
             cols.append(col_name)
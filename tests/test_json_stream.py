@@ -0,0 +1,58 @@
+import io
+import json
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from json_stream import iter_events  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def _rebuild(text, stream_paths, chunk_chars):
+    # 이벤트 스트림을 다시 조립해 json.loads 결과와 비교
+    stack, root = [], None
+    for kind, path, value in iter_events(io.StringIO(text), stream_paths, chunk_chars):
+        if kind == 'start':
+            node = [] if value is None else value  # 원소 단위로 내보내는 배열은 None
+            if stack:
+                parent = stack[-1]
+                if isinstance(parent, dict):
+                    parent[path[-1]] = node
+                else:
+                    parent.append(node)
+            else:
+                root = node
+            stack.append(node)
+        elif kind == 'end':
+            stack.pop()
+        else:
+            if not stack:
+                root = value
+                continue
+            parent = stack[-1]
+            if isinstance(parent, dict):
+                parent[path[-1]] = value
+            else:
+                parent.append(value)
+    return root
+
+
+def test_numbers_split_at_buffer_boundary():
+    text = '{"a":[1.5, 2.25, 3e5, 10.75, -0.125, 7E-3, 12]}'
+    for chunk_chars in range(1, len(text) + 2):
+        items = [v for kind, _, v in iter_events(io.StringIO(text), [('a',)], chunk_chars) if kind == 'item']
+        assert items == [1.5, 2.25, 3e5, 10.75, -0.125, 7e-3, 12], chunk_chars
+
+
+def test_session_file_chunk_sweep():
+    files = sorted(glob.glob(os.path.join(DATA_DIR, '*.json')))
+    if not files:
+        return
+    with open(files[0], 'r', encoding='utf-8') as f:
+        text = f.read()
+    expected = json.loads(text)
+    paths = [('calibration', 'points'), ('experiments', '*', 'trials')]
+    for chunk_chars in range(50, 400):
+        assert _rebuild(text, paths, chunk_chars) == expected, chunk_chars
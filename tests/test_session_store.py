@@ -0,0 +1,67 @@
+import json
+import glob
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from session_store import iter_trial_chunks  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def _session_files():
+    return sorted(glob.glob(os.path.join(DATA_DIR, '*.json')))
+
+
+def _write(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def test_session_without_any_touch(tmp_path):
+    # 세션 전체에 buttonTouchPosition 이 없어도 터치 좌표는 NaN 인 float 컬럼
+    files = _session_files()[:3]
+    if not files:
+        return
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            _write(tmp_path / os.path.basename(file_path), json.load(f))
+    with open(files[0], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['participant']['name'] += '_notouch'
+    data['participant'].pop('studentId', None)
+    for exp in data['experiments']:
+        for trial in exp['trials']:
+            trial.pop('buttonTouchPosition', None)
+    _write(tmp_path / 'zz_notouch.json', data)
+
+    for chunk_size in (7, 70, 1000):
+        chunks = list(iter_trial_chunks(str(tmp_path), chunk_size=chunk_size))
+        assert all(c[col].dtype.kind in 'if' for c in chunks for col in ('touch_x', 'touch_y'))
+        df = pd.concat(chunks, ignore_index=True)
+        offset = np.sqrt((df['button_x'] - df['touch_x']) ** 2 + (df['button_y'] - df['touch_y']) ** 2)
+        missing = df['Participant'].str.endswith('_notouch')
+        assert missing.any() and offset[missing].isna().all()
+        assert offset[~missing].notna().any()
+
+
+def test_session_fields_after_experiments(tmp_path):
+    # circleData / deviceInfo 가 experiments 뒤에 기록돼도 세션 컬럼은 전체 메타 기준
+    files = _session_files()
+    if not files:
+        return
+    with open(files[0], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    tail = ['experiments', 'circleData', 'deviceInfo']
+    _write(tmp_path / 'late.json', {**{k: v for k, v in data.items() if k not in tail}, **{k: data[k] for k in tail}})
+
+    def context(meta):
+        return {'Radius': (meta.get('circleData') or {}).get('radius', np.nan),
+                'Width': (meta.get('deviceInfo') or {}).get('screenWidth')}
+
+    df = pd.concat(iter_trial_chunks(str(tmp_path), chunk_size=7, context=context), ignore_index=True)
+    assert (df['Radius'] == data['circleData']['radius']).all()
+    assert (df['Width'] == data['deviceInfo'].get('screenWidth')).all()
@@ -0,0 +1,82 @@
+import pandas as pd
+import numpy as np
+
+# ==========================================
+# 1. 문자열 열 -> 패딩된 코드 배열
+# ==========================================
+def encode_strings(strings):
+    # (N, L) uint32 유니코드 코드포인트 배열과 길이 (패딩은 0)
+    strings = ['' if s is None or (isinstance(s, float) and np.isnan(s)) else str(s) for s in strings]
+    lengths = np.array([len(s) for s in strings], dtype=np.int64)
+    width = max(int(lengths.max()) if len(lengths) else 0, 1)
+    raw = ''.join(s.ljust(width, '\0') for s in strings).encode('utf-32-le')
+    codes = np.frombuffer(raw, dtype=np.uint32).reshape(len(strings), width)
+    return codes, lengths
+
+# ==========================================
+# 2. 일괄 Levenshtein 거리 (행 방향 DP를 전체 시행에 대해 동시에)
+# ==========================================
+def levenshtein_batch(targets, inputs):
+    a, len_a = encode_strings(targets)
+    b, len_b = encode_strings(inputs)
+    N, Lb = len(a), b.shape[1]
+
+    prev = np.broadcast_to(np.arange(Lb + 1), (N, Lb + 1)).copy()
+    dist = np.where(len_a == 0, len_b, 0)
+    rows = np.arange(N)
+
+    for i in range(1, a.shape[1] + 1):
+        cur = np.empty_like(prev)
+        cur[:, 0] = i
+        ai = a[:, i - 1:i]
+        # 대체/삭제는 이전 행에서 한 번에, 삽입은 같은 행의 왼쪽 값이 필요하므로 열 순서대로
+        sub_del = np.minimum(prev[:, :-1] + (ai != b), prev[:, 1:] + 1)
+        for j in range(1, Lb + 1):
+            cur[:, j] = np.minimum(sub_del[:, j - 1], cur[:, j - 1] + 1)
+        done = len_a == i
+        dist[done] = cur[rows[done], len_b[done]]
+        prev = cur
+    return dist
+
+# ==========================================
+# 3. 시행별 타이핑 지표
+# ==========================================
+def typing_metrics(df, target_col='Target_String', input_col='User_Input', time_col='TypingTime'):
+    # 로그에는 최종 입력만 있고 키 입력 기록(백스페이스 등)이 없으므로
+    # 수정된 오류(corrected error)는 관측 불가 -> 남은 오류(MSD 기반)만 계산
+    target = df[target_col].fillna('').astype(str)
+    typed = df[input_col].fillna('').astype(str)
+    edit = levenshtein_batch(target.tolist(), typed.tolist())
+    len_t = target.str.len().to_numpy()
+    len_p = typed.str.len().to_numpy()
+
+    out = df.copy()
+    out['Edit_Distance'] = edit
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Soukoreff & MacKenzie 의 MSD 오류율: MSD / max(|T|, |P|)
+        out['Uncorrected_Error_Rate'] = np.where(np.maximum(len_t, len_p) > 0,
+                                                 edit / np.maximum(len_t, len_p), 0.0)
+        # 초당 입력 문자 수 (타이핑 시간 기준)
+        time_s = df[time_col].to_numpy(dtype=float) / 1000
+        out['Chars_Per_Second'] = np.where(time_s > 0, len_p / time_s, np.nan)
+        out['Typing_ms_Per_Char'] = np.where(len_p > 0, df[time_col].to_numpy(dtype=float) / len_p, np.nan)
+    return out
+
+# ==========================================
+# 4. 실행 (처리된 데이터 요약)
+# ==========================================
+if __name__ == "__main__":
+    import os
+
+    PROCESS_PATH = os.path.join(os.environ.get('HIM_RESULT_DIR', './results'), 'processed_data.csv')
+    df = pd.read_csv(PROCESS_PATH, keep_default_na=False, na_values=[''])
+    if 'Edit_Distance' not in df.columns:
+        df = typing_metrics(df)
+
+    print("[조건별 타이핑 지표 평균]")
+    cols = ['Edit_Distance', 'Uncorrected_Error_Rate', 'Chars_Per_Second', 'Typing_ms_Per_Char', 'Error']
+    print(df.groupby('Condition')[cols].mean().round(3).to_string())
+
+    typo = df[df['Edit_Distance'] > 0]
+    print(f"\n✏️ 입력 오류 시행: {len(typo)}건")
+    print(typo[['Participant', 'Condition', 'Target_String', 'User_Input', 'Edit_Distance']].to_string(index=False))